@@ -2,15 +2,47 @@
 """
 Secure local drop server for Agent Mode
 - POST /save   -> save a file to disk (and optionally mirror into a git repo + commit/push)
-- GET  /health -> health check
+- POST /save-batch -> save many files as one unit (one commit, one push)
+- GET  /jobs/<id> -> progress of a queued git mirror job
+- PUT  /upload/<path> -> save a raw (or chunked) request body, streamed to disk
+- POST /uploads, PATCH/HEAD /uploads/<id> -> resumable chunked uploads with offsets and checksums
+  (sessions left unfinished for UPLOAD_TTL seconds are removed)
+Saves are deduplicated by SHA-256 (src/drop/content_index.py): content that is
+already on disk (and already queued for the branch) is not rewritten or
+committed, and clients may send If-None-Match: "<sha256>" to skip the upload.
+Git mirroring runs in a background worker (src/drop/mirror.py): saves return
+202 with a job id, saves to a branch within MIRROR_DEBOUNCE seconds share one
+commit, and failed pushes are retried with backoff.
+Production (SERVE_MODE=production, or `gunicorn -w 4 --threads 8 server:app`):
+several worker processes share REPO_DIR through file locks (src/drop/locking.py).
+With BRANCH_WORKTREES=1 (the production default) every branch is committed in
+its own worktree, so saves to different branches run in parallel while saves
+to one branch are serialized; job status is shared through JOB_STORE_PATH
+and kept for JOB_MAX_AGE seconds.
+- GET  /health -> health check (including the active framework config version)
+Lanes (AGENTIC_CONFIG, hot-reloaded by src/framework_config.py): when the
+config defines lanes, git saves must target a lane's branch and stay inside
+that lane's allowedPaths.
+- GET  /metrics -> Prometheus metrics: per-phase latency histograms (decode,
+  write, workspace, checkout, add, commit, push), request/byte counters per
+  status code, git failures and mirror queue depth (src/drop/metrics.py)
 Security:
 - Bearer token auth (DROP_TOKEN env or config)
 - Path normalization + allow-list enforcement (glob patterns)
 - Optional mirroring into a git repo with branch protections
 """
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from pathlib import Path
-import os, base64, subprocess
+from concurrent.futures import ThreadPoolExecutor
+import os, base64, hashlib, subprocess, tempfile, time
+
+from src.drop.content_index import ContentIndex, normalize_etag
+from src.drop.locking import BranchWorkspaces
+from src.drop.metrics import Metrics
+from src.drop.mirror import JobStore, MirrorQueue
+from src.drop.uploads import UploadError, UploadStore, stream_to_file
+from src.framework_config import shared_store
+from src.subprocess_runner import run as run_process
 
 app = Flask(__name__)
 
@@ -24,6 +56,25 @@ ALLOWED_BRANCH_PREFIXES = [p.strip() for p in os.getenv("ALLOWED_BRANCH_PREFIXES
 PROTECTED_BRANCHES = [b.strip() for b in os.getenv("PROTECTED_BRANCHES", "main,master,develop").split(",") if b.strip()]
 DISABLE_GIT = os.getenv("DISABLE_GIT", "") == "1"
 ALLOW_LOCALHOST_NO_TOKEN = os.getenv("ALLOW_LOCALHOST_NO_TOKEN", "") == "1"
+GIT_TIMEOUT = float(os.getenv("GIT_TIMEOUT", "120"))
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "500"))
+WRITE_WORKERS = int(os.getenv("WRITE_WORKERS", "8"))
+MIRROR_DEBOUNCE = float(os.getenv("MIRROR_DEBOUNCE", "0.5"))
+PUSH_MAX_RETRIES = int(os.getenv("PUSH_MAX_RETRIES", "5"))
+PUSH_RETRY_BACKOFF = float(os.getenv("PUSH_RETRY_BACKOFF", "2"))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(5 * 1024**3)))
+CONTENT_INDEX_PATH = Path(os.getenv("CONTENT_INDEX_PATH", str(SAVE_BASE_DIR / ".drop_index.sqlite"))).resolve()
+UPLOAD_STATE_DIR = Path(os.getenv("UPLOAD_STATE_DIR", str(SAVE_BASE_DIR / ".uploads"))).resolve()
+UPLOAD_TTL = float(os.getenv("UPLOAD_TTL", str(24 * 3600)))
+UPLOAD_SWEEP_INTERVAL = float(os.getenv("UPLOAD_SWEEP_INTERVAL", "600"))
+JOB_STORE_PATH = Path(os.getenv("JOB_STORE_PATH", str(SAVE_BASE_DIR / ".drop_jobs.sqlite"))).resolve()
+JOB_MAX_AGE = float(os.getenv("JOB_MAX_AGE", str(7 * 24 * 3600)))
+SERVE_MODE = os.getenv("SERVE_MODE", "development")
+BRANCH_WORKTREES = os.getenv("BRANCH_WORKTREES", "1" if SERVE_MODE == "production" else "0") == "1"
+MIRROR_WORKERS = int(os.getenv("MIRROR_WORKERS", "4"))
+METRICS_DIR = Path(os.getenv("METRICS_DIR", str(SAVE_BASE_DIR / ".metrics"))).resolve()
+FRAMEWORK_CONFIG = Path(os.getenv("AGENTIC_CONFIG", "agentic.config.yaml")).resolve()
+FRAMEWORK_CONFIG_POLL = float(os.getenv("AGENTIC_CONFIG_POLL", "2"))
 
 SAVE_BASE_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -44,8 +95,27 @@ def _match_allowed(rel_path: Path) -> bool:
     unix = rel_path.as_posix()
     return any(fnmatch(unix, pat) for pat in ALLOW_PATTERNS)
 
+# git subcommands reported as phases in drop_phase_seconds.
+GIT_PHASES = {"checkout": "checkout", "worktree": "checkout", "fetch": "fetch", "add": "add", "commit": "commit", "push": "push"}
+
 def _git(*args, cwd=None, check=True):
-    return subprocess.run(["git", *args], cwd=cwd, check=check, capture_output=True, text=True)
+    # Streams output with a bounded buffer and kills hung git processes
+    # (e.g. a push waiting on credentials) after GIT_TIMEOUT seconds.
+    # A timeout is reported like any other git failure so callers only need
+    # to handle CalledProcessError.
+    start = time.perf_counter()
+    result = run_process(["git", *args], cwd=cwd, timeout=GIT_TIMEOUT)
+    metrics = _metrics()
+    if args[0] in GIT_PHASES:
+        metrics.observe("drop_phase_seconds", time.perf_counter() - start, phase=GIT_PHASES[args[0]])
+    # Unchecked rev-parse/commit exit non-zero as an answer ("no such ref",
+    # "nothing to commit"), not as a failure.
+    expected = not check and args[0] in ("rev-parse", "commit")
+    if result.timed_out or (result.returncode != 0 and not expected):
+        metrics.inc("drop_git_failures_total", command=args[0], reason="timeout" if result.timed_out else "exit")
+    if check and (result.timed_out or result.returncode != 0):
+        raise subprocess.CalledProcessError(result.returncode, result.args, result.stdout, result.stderr)
+    return result
 
 def _ensure_git_identity(cwd):
     name = os.getenv("GIT_USER_NAME")
@@ -53,14 +123,218 @@ def _ensure_git_identity(cwd):
     if name:  _git("config", "user.name", name, cwd=cwd, check=False)
     if email: _git("config", "user.email", email, cwd=cwd, check=False)
 
-def _ensure_branch(cwd, branch):
+_MIRROR = None
+
+def _mirror():
+    # Created on first use so the worker threads only start when git mirroring is on.
+    global _MIRROR
+    if _MIRROR is None or _MIRROR.repo_dir != REPO_DIR:
+        _ensure_git_identity(REPO_DIR)
+        workspaces = BranchWorkspaces(REPO_DIR, _git, default_branch=DEFAULT_BRANCH, per_branch=BRANCH_WORKTREES)
+        _MIRROR = MirrorQueue(
+            workspaces, _git,
+            debounce=MIRROR_DEBOUNCE, max_retries=PUSH_MAX_RETRIES, retry_backoff=PUSH_RETRY_BACKOFF,
+            branch_workers=MIRROR_WORKERS, store=JobStore(JOB_STORE_PATH), job_max_age=JOB_MAX_AGE,
+            on_failed=_mirror_failed,
+            on_phase=lambda phase, seconds: _metrics().observe("drop_phase_seconds", seconds, phase=phase),
+        )
+    return _MIRROR
+
+def _mirror_failed(job):
+    _index().forget_mirrored(job.branch, job.paths)
+    _metrics().inc("drop_mirror_failed_jobs_total")
+
+_METRICS = None
+
+def _metrics():
+    global _METRICS
+    if _METRICS is None or _METRICS.shared_dir != METRICS_DIR:
+        m = Metrics(shared_dir=METRICS_DIR)
+        m.describe("drop_phase_seconds", "histogram", "Time spent per save phase (decode, write, workspace, checkout, add, commit, push).")
+        m.describe("drop_request_seconds", "histogram", "Request latency by endpoint.")
+        m.describe("drop_requests_total", "counter", "Requests by endpoint, method and status code.")
+        m.describe("drop_request_bytes_total", "counter", "Request body bytes by endpoint and status code.")
+        m.describe("drop_response_bytes_total", "counter", "Response body bytes by endpoint and status code.")
+        m.describe("drop_git_failures_total", "counter", "Failed or timed out git commands by subcommand.")
+        m.describe("drop_mirror_failed_jobs_total", "counter", "Mirror jobs that ended as failed.")
+        m.gauge("drop_mirror_queue_depth", lambda: _MIRROR.depth() if _MIRROR is not None else 0,
+                "Saves waiting to be committed or pushed.")
+        _METRICS = m
+    return _METRICS
+
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def _record_request(resp):
+    metrics = _metrics()
+    endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    status = str(resp.status_code)
+    metrics.inc("drop_requests_total", endpoint=endpoint, method=request.method, status=status)
+    metrics.inc("drop_request_bytes_total", request.content_length or 0, endpoint=endpoint, status=status)
+    if not resp.is_streamed:
+        metrics.inc("drop_response_bytes_total", resp.calculate_content_length() or 0, endpoint=endpoint, status=status)
+    if "request_start" in g:
+        metrics.observe("drop_request_seconds", time.perf_counter() - g.request_start, endpoint=endpoint)
+    metrics.flush()
+    return resp
+
+_INDEX = None
+
+def _index():
+    global _INDEX
+    if _INDEX is None or _INDEX.db_path != CONTENT_INDEX_PATH:
+        _INDEX = ContentIndex(CONTENT_INDEX_PATH)
+    return _INDEX
+
+def _unchanged_response(saved, sha, status=200):
+    if status == 304:
+        resp = app.response_class(status=304)
+    else:
+        resp = jsonify({"ok": True, "saved": saved, "unchanged": True, "sha256": sha, "git": None})
+        resp.status_code = status
+    resp.headers["ETag"] = f'"{sha}"'
+    return resp
+
+def _is_current(rel, dest, branch, use_git, sha):
+    """True if ``sha`` is on disk at ``dest`` and (with git) already queued for ``branch``."""
+    index = _index()
+    return bool(sha) and index.current(rel, dest) == sha and (not use_git or index.mirrored(branch, rel) == sha)
+
+def _queued(job, saved):
+    return jsonify({"ok": True, "saved": saved, "job": job.id, "status_url": f"/jobs/{job.id}"}), 202
+
+_UPLOADS = None
+_LAST_UPLOAD_SWEEP = 0.0
+
+def _uploads():
+    global _UPLOADS
+    if _UPLOADS is None or _UPLOADS.state_dir != UPLOAD_STATE_DIR or _UPLOADS.ttl != UPLOAD_TTL:
+        _UPLOADS = UploadStore(UPLOAD_STATE_DIR, ttl=UPLOAD_TTL, max_bytes=MAX_UPLOAD_BYTES)
+    return _UPLOADS
+
+def _sweep_uploads():
+    # Abandoned sessions are removed (with their part files) when new ones
+    # start, at most every UPLOAD_SWEEP_INTERVAL seconds per process.
+    global _LAST_UPLOAD_SWEEP
+    now = time.monotonic()
+    if now - _LAST_UPLOAD_SWEEP >= UPLOAD_SWEEP_INTERVAL:
+        _LAST_UPLOAD_SWEEP = now
+        _uploads().cleanup()
+
+def _upload_error(e):
+    return jsonify({"ok": False, "error": str(e), **e.extra}), e.status
+
+def _config():
+    # One polling store per file and process, shared with the engine.
+    return shared_store(FRAMEWORK_CONFIG, FRAMEWORK_CONFIG_POLL).current
+
+def _lane_error(rel, branch):
+    """Error dict if the lane config forbids saving ``rel`` on ``branch``, else None."""
+    config = _config()
+    if not config.lanes:
+        return None
+    lane = config.lane_for(branch)
+    if lane is None:
+        return {"ok": False, "error": f"branch '{branch}' is not in a configured lane"}
+    if not lane.allows(rel.as_posix()):
+        return {"ok": False, "error": f"path not allowed in lane '{lane.name}'", "allowed": list(lane.allowed_paths)}
+    return None
+
+def _check_target(rel, branch, use_git):
+    """Validate a destination; return ``(rel_path, dest, None)`` or ``(None, None, error_response)``."""
+    rel_path = _sanitize_rel_path(rel)
+    if not rel_path or not rel_path.parts:
+        return None, None, (jsonify({"ok": False, "error": "invalid path"}), 400)
+    if not _match_allowed(rel_path):
+        return None, None, (jsonify({"ok": False, "error": "path not allowed", "allowed": ALLOW_PATTERNS}), 403)
+    if use_git and branch in PROTECTED_BRANCHES:
+        return None, None, (jsonify({"ok": False, "error": f"branch '{branch}' is protected"}), 403)
+    lane_error = _lane_error(rel_path, branch) if use_git else None
+    if lane_error:
+        return None, None, (jsonify(lane_error), 403)
+    dest = _resolve_dest(SAVE_BASE_DIR, rel_path)
+    if dest is None:
+        return None, None, (jsonify({"ok": False, "error": "path escapes base dir"}), 400)
+    return rel_path, dest, None
+
+def _resolve_dest(base, rel_path):
+    dest = (base / rel_path).resolve()
+    if base not in dest.parents and dest != base:
+        return None
+    return dest
+
+def _write_temp(dest, raw):
+    # Write next to the destination so the final rename is atomic.
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=dest.parent, prefix=f".{dest.name}.", suffix=".tmp")
     try:
-        _git("rev-parse", "--verify", branch, cwd=cwd)
-    except subprocess.CalledProcessError:
-        _git("fetch", "origin", DEFAULT_BRANCH, cwd=cwd, check=False)
-        _git("checkout", "-B", branch, f"origin/{DEFAULT_BRANCH}", cwd=cwd, check=True)
-        return
-    _git("checkout", branch, cwd=cwd, check=True)
+        with os.fdopen(fd, "wb") as f:
+            f.write(raw)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return tmp
+
+def _write_all(pairs):
+    """Write ``[(dest, raw), ...]`` as a unit.
+
+    Every file is first written to a temp file in parallel; only when all
+    writes succeeded are they renamed into place. On failure the temp files
+    are removed and no destination is touched.
+    """
+    with _metrics().time("drop_phase_seconds", phase="write"):
+        _write_parallel(pairs)
+
+def _write_parallel(pairs):
+    with ThreadPoolExecutor(max_workers=max(1, min(WRITE_WORKERS, len(pairs)))) as pool:
+        futures = [pool.submit(_write_temp, dest, raw) for dest, raw in pairs]
+    temps, error = [], None
+    for fut in futures:
+        try:
+            temps.append(fut.result())
+        except OSError as e:
+            error = error or e
+    if error is not None:
+        for tmp in temps:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+        raise error
+    for (dest, _), tmp in zip(pairs, temps):
+        os.replace(tmp, dest)
+
+def _parse_batch(data):
+    """Validate a batch request; return ``(items, None)`` or ``(None, (error, status))``."""
+    files = data.get("files")
+    if not isinstance(files, list) or not files:
+        return None, ({"ok": False, "error": "files must be a non-empty list"}, 400)
+    if len(files) > MAX_BATCH_FILES:
+        return None, ({"ok": False, "error": f"too many files (max {MAX_BATCH_FILES})"}, 413)
+    items, seen = [], set()
+    for i, entry in enumerate(files):
+        if not isinstance(entry, dict):
+            return None, ({"ok": False, "error": "invalid entry", "index": i}, 400)
+        rel_path = _sanitize_rel_path((entry.get("path") or "").strip())
+        if not rel_path or not rel_path.parts:
+            return None, ({"ok": False, "error": "invalid path", "index": i}, 400)
+        if not _match_allowed(rel_path):
+            return None, ({"ok": False, "error": "path not allowed", "index": i, "allowed": ALLOW_PATTERNS}, 403)
+        if rel_path.as_posix() in seen:
+            return None, ({"ok": False, "error": "duplicate path", "index": i}, 400)
+        seen.add(rel_path.as_posix())
+        try:
+            with _metrics().time("drop_phase_seconds", phase="decode"):
+                raw = base64.b64decode((entry.get("content_b64") or "").strip().encode("utf-8"), validate=True)
+        except Exception:
+            return None, ({"ok": False, "error": "content_b64 invalid", "index": i}, 400)
+        dest = _resolve_dest(SAVE_BASE_DIR, rel_path)
+        if dest is None:
+            return None, ({"ok": False, "error": "path escapes base dir", "index": i}, 400)
+        items.append((rel_path, dest, raw))
+    return items, None
 
 @app.get("/health")
 def health():
@@ -70,7 +344,8 @@ def health():
         "repo_dir": str(REPO_DIR) if REPO_DIR else None,
         "allow_patterns": ALLOW_PATTERNS,
         "allowed_branch_prefixes": ALLOWED_BRANCH_PREFIXES,
-        "protected_branches": PROTECTED_BRANCHES
+        "protected_branches": PROTECTED_BRANCHES,
+        "config_version": _config().version or None,
     })
 
 @app.post("/save")
@@ -83,51 +358,227 @@ def save():
     b64 = (data.get("content_b64") or "").strip()
     message = (data.get("message") or "agent: add file").strip()
     branch = (data.get("branch") or "lane/agent-drop").strip()
+    use_git = bool(REPO_DIR) and not DISABLE_GIT
 
-    rel_path = _sanitize_rel_path(rel)
-    if not rel_path:
-        return jsonify({"ok": False, "error": "invalid path"}), 400
-    if not _match_allowed(rel_path):
-        return jsonify({"ok": False, "error": "path not allowed", "allowed": ALLOW_PATTERNS}), 403
+    rel_path, dest, error = _check_target(rel, branch, use_git)
+    if error:
+        return error
+    rel = rel_path.as_posix()
+
+    # A matching If-None-Match hash means the client need not send content at all.
+    if_none_match = normalize_etag(request.headers.get("If-None-Match"))
+    if _is_current(rel, dest, branch, use_git, if_none_match):
+        return _unchanged_response(str(dest), if_none_match, 304)
+    if if_none_match and "content_b64" not in data:
+        return jsonify({"ok": False, "error": "content changed; content_b64 required"}), 412
 
     try:
-        raw = base64.b64decode(b64.encode("utf-8"), validate=True)
+        with _metrics().time("drop_phase_seconds", phase="decode"):
+            raw = base64.b64decode(b64.encode("utf-8"), validate=True)
     except Exception:
         return jsonify({"ok": False, "error": "content_b64 invalid"}), 400
 
-    dest = (SAVE_BASE_DIR / rel_path).resolve()
-    if SAVE_BASE_DIR not in dest.parents and dest != SAVE_BASE_DIR:
-        return jsonify({"ok": False, "error": "path escapes base dir"}), 400
-    dest.parent.mkdir(parents=True, exist_ok=True)
-    dest.write_bytes(raw)
+    sha = hashlib.sha256(raw).hexdigest()
+    index = _index()
+    if index.current(rel, dest) != sha:
+        _write_all([(dest, raw)])
+        index.record(rel, dest, sha)
+    elif not use_git or index.mirrored(branch, rel) == sha:
+        return _unchanged_response(str(dest), sha)
 
-    git_result = None
-    if REPO_DIR and not DISABLE_GIT:
-        if branch in PROTECTED_BRANCHES:
-            return jsonify({"ok": False, "error": f"branch '{branch}' is protected"}), 403
-        if not any(branch.startswith(p) for p in ALLOWED_BRANCH_PREFIXES):
-            # not fatal, but you can enforce if desired
-            pass
+    if use_git and index.mirrored(branch, rel) != sha:
+        index.record_mirrored(branch, rel, sha)
+        resp, status = _queued(_mirror().submit(branch, [(rel, raw)], message), str(dest))
+    else:
+        resp, status = jsonify({"ok": True, "saved": str(dest), "sha256": sha, "git": None}), 201
+    resp.headers["ETag"] = f'"{sha}"'
+    return resp, status
 
-        _ensure_git_identity(REPO_DIR)
-        _ensure_branch(REPO_DIR, branch)
-        repo_target = (REPO_DIR / rel_path)
-        repo_target.parent.mkdir(parents=True, exist_ok=True)
-        repo_target.write_bytes(raw)
+@app.post("/save-batch")
+def save_batch():
+    if not _token_ok():
+        return jsonify({"ok": False, "error": "unauthorized"}), 401
 
-        _git("add", ".", cwd=REPO_DIR, check=True)
-        try:
-            _git("commit", "-m", message, cwd=REPO_DIR, check=True)
-        except subprocess.CalledProcessError:
-            git_result = {"commit": "no-op"}
-        try:
-            _git("push", "origin", branch, cwd=REPO_DIR, check=True)
-            git_result = {"push": "ok", "branch": branch}
-        except subprocess.CalledProcessError as e:
-            git_result = {"push": "failed", "stderr": e.stderr}
+    data = request.get_json(silent=True) or {}
+    message = (data.get("message") or "agent: add files").strip()
+    branch = (data.get("branch") or "lane/agent-drop").strip()
+    use_git = bool(REPO_DIR) and not DISABLE_GIT
+
+    # Validate everything before touching the disk so the batch is all-or-nothing.
+    items, error = _parse_batch(data)
+    if error:
+        return jsonify(error[0]), error[1]
+    if use_git and branch in PROTECTED_BRANCHES:
+        return jsonify({"ok": False, "error": f"branch '{branch}' is protected"}), 403
+    for i, (rel, _, _) in enumerate(items if use_git else []):
+        lane_error = _lane_error(rel, branch)
+        if lane_error:
+            return jsonify({**lane_error, "index": i}), 403
+
+    index = _index()
+    hashed = [(rel.as_posix(), dest, raw, hashlib.sha256(raw).hexdigest()) for rel, dest, raw in items]
+    to_write = [(rel, dest, raw, sha) for rel, dest, raw, sha in hashed if index.current(rel, dest) != sha]
+    to_mirror = [(rel, raw, sha) for rel, _, raw, sha in hashed if use_git and index.mirrored(branch, rel) != sha]
+    try:
+        _write_all([(dest, raw) for _, dest, raw, _ in to_write])
+    except OSError as e:
+        return jsonify({"ok": False, "error": f"write failed: {e}"}), 500
+    for rel, dest, _, sha in to_write:
+        index.record(rel, dest, sha)
+
+    saved = [str(dest) for _, dest, _ in items]
+    written = {rel for rel, _, _, _ in to_write} | {rel for rel, _, _ in to_mirror}
+    unchanged = [rel for rel, _, _, _ in hashed if rel not in written]
+    if to_mirror:
+        for rel, _, sha in to_mirror:
+            index.record_mirrored(branch, rel, sha)
+        # One job, so the whole batch lands in a single commit.
+        job = _mirror().submit(branch, [(rel, raw) for rel, raw, _ in to_mirror], message)
+        return jsonify({"ok": True, "saved": saved, "unchanged": unchanged, "job": job.id, "status_url": f"/jobs/{job.id}"}), 202
+    status = 201 if to_write else 200
+    return jsonify({"ok": True, "saved": saved, "unchanged": unchanged, "git": None}), status
+
+@app.get("/metrics")
+def metrics():
+    if not _token_ok():
+        return jsonify({"ok": False, "error": "unauthorized"}), 401
+    return app.response_class(_metrics().render(), mimetype="text/plain; version=0.0.4")
+
+@app.get("/jobs/<job_id>")
+def job_status(job_id):
+    if not _token_ok():
+        return jsonify({"ok": False, "error": "unauthorized"}), 401
+    # Any worker process can answer: status is shared through the job store.
+    job = _mirror().status(job_id) if REPO_DIR and not DISABLE_GIT else None
+    if job is None:
+        return jsonify({"ok": False, "error": "unknown job"}), 404
+    return jsonify({"ok": True, **job})
+
+@app.put("/upload/<path:rel>")
+def upload_raw(rel):
+    """Stream the raw request body to ``rel``; no base64, no in-memory copy."""
+    if not _token_ok():
+        return jsonify({"ok": False, "error": "unauthorized"}), 401
+    branch = (request.args.get("branch") or "lane/agent-drop").strip()
+    message = (request.args.get("message") or "agent: upload file").strip()
+    use_git = bool(REPO_DIR) and not DISABLE_GIT
+    rel_path, dest, error = _check_target(rel, branch, use_git)
+    if error:
+        return error
+    rel = rel_path.as_posix()
+    if_none_match = normalize_etag(request.headers.get("If-None-Match"))
+    if _is_current(rel, dest, branch, use_git, if_none_match):
+        return _unchanged_response(str(dest), if_none_match, 304)
+    if request.content_length is not None and request.content_length > MAX_UPLOAD_BYTES:
+        return jsonify({"ok": False, "error": f"upload exceeds {MAX_UPLOAD_BYTES} bytes"}), 413
+    index = _index()
+    current = index.current(rel, dest)
+    try:
+        with _metrics().time("drop_phase_seconds", phase="write"):
+            size, sha, replaced = stream_to_file(
+                request.stream, dest, MAX_UPLOAD_BYTES, request.headers.get("X-Content-SHA256"), unless_sha256=current,
+            )
+    except UploadError as e:
+        return _upload_error(e)
+    if replaced:
+        index.record(rel, dest, sha)
+    if use_git and index.mirrored(branch, rel) != sha:
+        index.record_mirrored(branch, rel, sha)
+        job = _mirror().submit(branch, [(rel, dest)], message, shas={rel: sha})
+        return jsonify({"ok": True, "saved": str(dest), "size": size, "sha256": sha, "job": job.id, "status_url": f"/jobs/{job.id}"}), 202
+    if not replaced:
+        return _unchanged_response(str(dest), sha)
+    return jsonify({"ok": True, "saved": str(dest), "size": size, "sha256": sha, "git": None}), 201
+
+@app.post("/uploads")
+def upload_start():
+    if not _token_ok():
+        return jsonify({"ok": False, "error": "unauthorized"}), 401
+    data = request.get_json(silent=True) or {}
+    branch = (data.get("branch") or "lane/agent-drop").strip()
+    use_git = bool(REPO_DIR) and not DISABLE_GIT
+    rel_path, dest, error = _check_target((data.get("path") or "").strip(), branch, use_git)
+    if error:
+        return error
+    _sweep_uploads()
+    try:
+        size = int(data.get("size"))
+        session = _uploads().create(
+            rel_path.as_posix(), dest, size, data.get("sha256"),
+            branch=branch, message=(data.get("message") or "agent: upload file").strip(),
+        )
+    except (TypeError, ValueError):
+        return jsonify({"ok": False, "error": "size must be an integer"}), 400
+    except UploadError as e:
+        return _upload_error(e)
+    return jsonify({"ok": True, "id": session["id"], "offset": 0, "size": size, "upload_url": f"/uploads/{session['id']}"}), 201
+
+@app.route("/uploads/<upload_id>", methods=["HEAD", "GET"])
+def upload_status(upload_id):
+    if not _token_ok():
+        return jsonify({"ok": False, "error": "unauthorized"}), 401
+    try:
+        session = _uploads().get(upload_id)
+    except UploadError as e:
+        return _upload_error(e)
+    resp = jsonify({"ok": True, "id": upload_id, "offset": session["offset"], "size": session["size"], "complete": session["complete"]})
+    resp.headers["Upload-Offset"] = str(session["offset"])
+    return resp
+
+@app.patch("/uploads/<upload_id>")
+def upload_chunk(upload_id):
+    """Append the body at the ``Upload-Offset`` header; the last chunk completes the upload."""
+    if not _token_ok():
+        return jsonify({"ok": False, "error": "unauthorized"}), 401
+    try:
+        offset = int(request.headers.get("Upload-Offset", ""))
+    except ValueError:
+        return jsonify({"ok": False, "error": "Upload-Offset header required"}), 400
+    try:
+        session = _uploads().append(upload_id, offset, request.stream, request.headers.get("X-Chunk-SHA256"))
+    except UploadError as e:
+        return _upload_error(e)
+    body = {"ok": True, "id": upload_id, "offset": session["offset"], "size": session["size"], "complete": session["complete"]}
+    status = 200
+    if session["complete"]:
+        body.update({"saved": session["dest"], "sha256": session["sha256"]})
+        _index().record(session["path"], Path(session["dest"]), session["sha256"])
+        meta = session["meta"]
+        if REPO_DIR and not DISABLE_GIT and _index().mirrored(meta["branch"], session["path"]) != session["sha256"]:
+            _index().record_mirrored(meta["branch"], session["path"], session["sha256"])
+            job = _mirror().submit(
+                meta["branch"], [(session["path"], Path(session["dest"]))], meta["message"],
+                shas={session["path"]: session["sha256"]},
+            )
+            body.update({"job": job.id, "status_url": f"/jobs/{job.id}"})
+            status = 202
+        else:
+            status = 201
+    resp = jsonify(body)
+    resp.headers["Upload-Offset"] = str(session["offset"])
+    return resp, status
+
+def serve_production(host, port, workers, threads):
+    """Run under gunicorn: ``workers`` processes with ``threads`` threads each."""
+    from gunicorn.app.base import BaseApplication
+
+    class _Server(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("threads", threads)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("timeout", int(GIT_TIMEOUT) + 30)
+
+        def load(self):
+            return app
 
-    return jsonify({"ok": True, "saved": str(dest), "git": git_result}), 201
+    _Server().run()
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "5055"))
-    app.run(host="127.0.0.1", port=port)
+    host = os.getenv("HOST", "127.0.0.1")
+    if SERVE_MODE == "production":
+        serve_production(host, port, int(os.getenv("WORKERS", str(os.cpu_count() or 1))), int(os.getenv("THREADS", "8")))
+    else:
+        app.run(host=host, port=port)
@@ -0,0 +1,66 @@
+"""Pydantic model behind :class:`src.config.Settings`.
+
+Kept apart from :mod:`src.config` so that importing the config module
+does not import pydantic; see that module for details.
+"""
+
+from __future__ import annotations
+
+from typing import Dict
+
+from pydantic import BaseSettings, Field
+
+
+class Settings(BaseSettings):
+    """Configuration settings loaded from environment variables or a .env file."""
+
+    # API keys for external services
+    anthropic_api_key: str = Field("", env="ANTHROPIC_API_KEY")
+    gemini_api_key: str = Field("", env="GEMINI_API_KEY")
+    github_token: str = Field("", env="GITHUB_TOKEN")
+
+    # Local service configuration
+    ollama_api_base: str = Field("http://localhost:11434", env="OLLAMA_API_BASE")
+    aider_cli_path: str = Field("aider", env="AIDER_CLI_PATH")
+
+    # Aider worker pool
+    aider_pool_size: int = Field(4, env="AIDER_POOL_SIZE")
+    aider_worker_max_tasks: int = Field(50, env="AIDER_WORKER_MAX_TASKS")
+    aider_worker_max_rss_mb: int = Field(1024, env="AIDER_WORKER_MAX_RSS_MB")
+    aider_worker_python: str = Field("", env="AIDER_WORKER_PYTHON")
+    aider_task_timeout: float = Field(600.0, env="AIDER_TASK_TIMEOUT")
+
+    # Context packing: prompt token budgets per service (JSON in the env var)
+    context_token_budgets: Dict[str, int] = Field(
+        default_factory=lambda: {"anthropic": 100_000, "gemini": 200_000, "ollama": 4_000, "aider": 16_000},
+        env="CONTEXT_TOKEN_BUDGETS",
+    )
+    context_default_budget: int = Field(8_000, env="CONTEXT_DEFAULT_BUDGET")
+
+    # Task scheduler in front of the workflow engine (queue limits as JSON)
+    scheduler_workers: int = Field(4, env="SCHEDULER_WORKERS")
+    scheduler_queue_limits: Dict[str, int] = Field(
+        default_factory=lambda: {"interactive": 64, "normal": 256, "batch": 1024},
+        env="SCHEDULER_QUEUE_LIMITS",
+    )
+
+    # Database configuration
+    db_url: str = Field("agentic.db", env="AGENTIC_DB")
+
+    # Redis configuration (for quota and caching)
+    redis_url: str = Field("redis://localhost:6379/0", env="REDIS_URL")
+
+    # Quota management
+    max_daily_cost: float = Field(10.0, env="MAX_DAILY_COST")
+
+    # Git configuration
+    default_branch: str = Field("main", env="DEFAULT_BRANCH")
+    lanes_config_path: str = Field("lanes.yaml", env="LANES_CONFIG_PATH")
+
+    # Routing and lane config (validated against config.schema.json, hot-reloaded)
+    framework_config_path: str = Field("agentic.config.yaml", env="AGENTIC_CONFIG")
+    framework_config_poll: float = Field(2.0, env="AGENTIC_CONFIG_POLL")
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
\ No newline at end of file
@@ -3,10 +3,18 @@ Command-line interface for the ``cli_multi_rapid`` package.
 
 This module exposes a :func:`main` function which is intended to be used as
 the entry point when this package is installed as a console script. It
-provides two simple subcommands:
+provides these subcommands:
 
 * ``greet`` – prints a friendly greeting to the supplied name.
 * ``sum`` – computes the sum of two integers.
+* ``run`` – streams JSONL tasks from a file or stdin through the workflow
+  engine, writing JSONL results (see :mod:`cli_multi_rapid.runner`). The
+  runner and the engine are only imported when ``run`` is used. With
+  ``--daemon`` (or ``CLI_MULTI_RAPID_DAEMON=1``) the tasks go to a resident
+  daemon that keeps the engine warm, so the CLI itself stays a thin client.
+* ``daemon`` – ``start``, ``stop``, ``status`` or ``serve`` (in the
+  foreground) the daemon for the current directory (see
+  :mod:`cli_multi_rapid.daemon`).
 
 These functions are intentionally simple so that they can be easily tested
 without additional dependencies beyond the Python standard library. They
@@ -18,6 +26,7 @@ complex behaviour as the multi-agent CLI evolves.
 from __future__ import annotations
 
 import argparse
+import os
 import sys
 from dataclasses import dataclass
 from typing import List, Optional
@@ -72,6 +81,17 @@ class CLIArgs:
     name: Optional[str] = None
     a: Optional[int] = None
     b: Optional[int] = None
+    input: Optional[str] = None
+    output: str = "-"
+    concurrency: int = 4
+    checkpoint: Optional[str] = None
+    resume: bool = False
+    progress_interval: float = 2.0
+    daemon: bool = False
+    priority: Optional[str] = None
+    action: Optional[str] = None
+    socket: Optional[str] = None
+    idle_timeout: float = 900.0
 
 
 def parse_args(argv: Optional[List[str]] = None) -> CLIArgs:
@@ -117,7 +137,53 @@ def parse_args(argv: Optional[List[str]] = None) -> CLIArgs:
         help="Second integer operand",
     )
 
+    # run subcommand
+    run_parser = subparsers.add_parser("run", help="Run JSONL tasks through the workflow engine")
+    run_parser.add_argument("input", help="JSONL file with one task per line, or - for stdin")
+    run_parser.add_argument("-o", "--output", default="-", help="JSONL results file, or - for stdout (default)")
+    run_parser.add_argument("-j", "--concurrency", type=int, default=4, help="Tasks to run at once (default 4)")
+    run_parser.add_argument("--checkpoint", help="Checkpoint file (default <output>.ckpt for file output)")
+    run_parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint of an interrupted run")
+    run_parser.add_argument(
+        "--progress-interval", type=float, default=2.0, help="Seconds between progress lines on stderr (default 2)"
+    )
+    run_parser.add_argument(
+        "--daemon",
+        action=argparse.BooleanOptionalAction,
+        default=os.environ.get("CLI_MULTI_RAPID_DAEMON", "") not in ("", "0"),
+        help="Send tasks to the resident daemon, starting it if needed (default from CLI_MULTI_RAPID_DAEMON)",
+    )
+    run_parser.add_argument("--socket", help="Daemon socket path (default per working directory)")
+    run_parser.add_argument(
+        "--priority",
+        choices=["interactive", "normal", "batch"],
+        help="Scheduling class for tasks that do not set one (default: their lane's, else normal)",
+    )
+
+    # daemon subcommand
+    daemon_parser = subparsers.add_parser("daemon", help="Manage the resident workflow engine daemon")
+    daemon_parser.add_argument("action", choices=["start", "stop", "status", "serve"])
+    daemon_parser.add_argument("--socket", help="Socket path (default: CLI_MULTI_RAPID_SOCKET or per working directory)")
+    daemon_parser.add_argument(
+        "--idle-timeout", type=float, default=900.0, help="Seconds without clients before the daemon exits (default 900, 0: never)"
+    )
+
     parsed = parser.parse_args(argv)
+    if parsed.command == "run":
+        return CLIArgs(
+            command="run",
+            input=parsed.input,
+            output=parsed.output,
+            concurrency=parsed.concurrency,
+            checkpoint=parsed.checkpoint,
+            resume=parsed.resume,
+            progress_interval=parsed.progress_interval,
+            daemon=parsed.daemon,
+            socket=parsed.socket,
+            priority=parsed.priority,
+        )
+    if parsed.command == "daemon":
+        return CLIArgs(command="daemon", action=parsed.action, socket=parsed.socket, idle_timeout=parsed.idle_timeout)
     return CLIArgs(command=parsed.command, name=getattr(parsed, "name", None), a=getattr(parsed, "a", None), b=getattr(parsed, "b", None))
 
 
@@ -151,6 +217,26 @@ def main(argv: Optional[List[str]] = None) -> int:
             result = sum_numbers(args.a, args.b)
             print(result)
             return 0
+        elif args.command == "run":
+            from .runner import run_jsonl
+
+            assert args.input is not None
+            return run_jsonl(
+                args.input,
+                args.output,
+                concurrency=args.concurrency,
+                checkpoint=args.checkpoint,
+                resume=args.resume,
+                progress_interval=args.progress_interval,
+                daemon=args.daemon,
+                socket=args.socket,
+                priority=args.priority,
+            )
+        elif args.command == "daemon":
+            from .daemon import daemon_command
+
+            assert args.action is not None
+            return daemon_command(args.action, args.socket, args.idle_timeout)
         else:
             # This branch should be unreachable because of argparse's required subcommand
             print(f"Unknown command: {args.command}", file=sys.stderr)
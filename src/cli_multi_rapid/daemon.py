@@ -0,0 +1,634 @@
+"""Resident daemon behind ``cli-multi-rapid run --daemon``.
+
+Building the workflow engine (settings, routing config, database, service
+clients) costs far more than the tasks git hooks and editor integrations
+usually send. The daemon builds it once and keeps it warm; the CLI then
+becomes a thin client that sends tasks over a Unix domain socket.
+
+Protocol: one JSON object per line in each direction, several requests
+per connection. Requests carry an ``op``:
+
+* ``hello`` – daemon pid, working directory and environment fingerprint;
+* ``execute`` – run ``task`` (a task context) and return its ``result``;
+* ``stats`` – uptime and request counters;
+* ``shutdown`` – stop after answering; with ``if_idle`` refused while a
+  task is running.
+
+Replies always carry ``ok``; failures carry ``error`` (and ``task_error``
+when the task itself raised).
+
+There is one daemon per working directory, so ``.env`` files and the
+routing config resolve as they would in-process; the ``.env`` content is
+part of the environment fingerprint. The socket, its start-up lock and
+log live in ``$XDG_RUNTIME_DIR`` (or a private per-user directory in the
+temp directory) and the socket is only accessible to its owner;
+``CLI_MULTI_RAPID_SOCKET`` overrides the path. Clients refuse a socket
+owned by another user. A daemon is started on demand, replaced when the
+client's settings environment differs from the one it was started with
+(but never while it is running a task), lets running tasks finish when
+it stops, and exits after ``idle_timeout`` seconds with no connections. When no daemon can be reached (no Unix sockets on this
+platform, or it fails to start) tasks run in-process instead.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import select
+import signal
+import socket
+import socketserver
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+Executor = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+ENV_SOCKET = "CLI_MULTI_RAPID_SOCKET"
+# Read by Settings (``Config.env_file``) relative to the working directory.
+ENV_FILE = ".env"
+PROTOCOL = 1
+DEFAULT_IDLE_TIMEOUT = 900.0
+START_TIMEOUT = 15.0
+# How long a stopping daemon waits for tasks it is running before exiting.
+DRAIN_TIMEOUT = 60.0
+
+
+class DaemonError(RuntimeError):
+    """The daemon answered with, or the connection failed in, an unexpected way."""
+
+
+class DaemonUnavailable(DaemonError):
+    """No suitable daemon could be reached."""
+
+
+class RemoteTaskError(RuntimeError):
+    """A task raised inside the daemon; the message names the original error."""
+
+
+def supported() -> bool:
+    return hasattr(socket, "AF_UNIX")
+
+
+def _uid() -> int:
+    return os.getuid() if hasattr(os, "getuid") else 0
+
+
+def runtime_dir() -> str:
+    """Directory for daemon sockets, locks and logs, private to this user."""
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return os.environ["XDG_RUNTIME_DIR"]
+    return os.path.join(tempfile.gettempdir(), f"cli-multi-rapid-{_uid()}")
+
+
+def socket_path(cwd: Optional[str] = None) -> str:
+    """Return the daemon socket for ``cwd`` (default: the working directory)."""
+    if os.environ.get(ENV_SOCKET):
+        return os.environ[ENV_SOCKET]
+    cwd = os.path.realpath(cwd or os.getcwd())
+    digest = hashlib.sha1(cwd.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(runtime_dir(), f"cli-multi-rapid-{_uid()}-{digest}.sock")
+
+
+def _prepare_dir(path: str) -> None:
+    """Create the runtime directory for ``path`` and check nobody else can use it.
+
+    Only done for :func:`runtime_dir`; an explicit socket path is the
+    caller's choice.
+    """
+    directory = os.path.dirname(path)
+    if directory != runtime_dir():
+        return
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        st = os.lstat(directory)
+    except OSError as exc:
+        raise DaemonUnavailable(f"cannot create {directory}: {exc}") from None
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != _uid() or st.st_mode & 0o077:
+        raise DaemonUnavailable(f"{directory} is not a directory private to this user")
+
+
+def env_fingerprint(keys: Iterable[str], cwd: Optional[str] = None) -> str:
+    """Hash the working directory, the (case-insensitive) values of ``keys``
+    and the content of the directory's ``.env`` file."""
+    cwd = os.path.realpath(cwd or os.getcwd())
+    environ = {k.lower(): v for k, v in os.environ.items()}
+    items = [(k, environ.get(k.lower())) for k in sorted(keys)]
+    digest = hashlib.sha1(json.dumps([cwd, items]).encode("utf-8"))
+    try:
+        with open(os.path.join(cwd, ENV_FILE), "rb") as env_file:
+            digest.update(b"\0" + env_file.read())
+    except OSError:
+        pass  # no .env file: only the environment counts
+    return digest.hexdigest()
+
+
+def settings_env_keys() -> List[str]:
+    """Environment variables the engine's :class:`Settings` read."""
+    from src.config import Settings
+
+    keys = set()
+    for field in Settings.__fields__.values():
+        keys.update(field.field_info.extra.get("env_names", ()))
+    return sorted(keys)
+
+
+# -- server ------------------------------------------------------------------
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "DaemonServer"
+
+    def handle(self) -> None:
+        self.server._track(1)
+        try:
+            for raw in self.rfile:
+                try:
+                    request = json.loads(raw)
+                    if not isinstance(request, dict):
+                        raise ValueError("expected a JSON object")
+                except ValueError as exc:
+                    request, reply = {}, {"ok": False, "error": f"invalid request: {exc}"}
+                else:
+                    reply = self.server.dispatch(request)
+                self.wfile.write(json.dumps(reply, default=str).encode("utf-8") + b"\n")
+                if request.get("op") == "shutdown":
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.server._track(-1)
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serve ``execute`` on a Unix socket, one thread per connection."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        path: str,
+        execute: Executor,
+        env_keys: Iterable[str] = (),
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    ) -> None:
+        self.path = path
+        self.execute = execute
+        self.env_keys = sorted(env_keys)
+        self.fingerprint = env_fingerprint(self.env_keys)
+        self.idle_timeout = idle_timeout
+        self.started = time.time()
+        self.served = 0
+        self.failed = 0
+        self.connections = 0
+        self.in_flight = 0
+        self._last_active = time.monotonic()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        if os.path.exists(path):
+            os.unlink(path)  # stale: the caller has checked nothing listens there
+        umask = os.umask(0o077)  # the socket is only usable by its owner
+        try:
+            super().__init__(path, _Handler)
+        finally:
+            os.umask(umask)
+
+    def _track(self, delta: int) -> None:
+        with self._lock:
+            self.connections += delta
+            self._last_active = time.monotonic()
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "ok": True,
+            "protocol": PROTOCOL,
+            "pid": os.getpid(),
+            "cwd": os.getcwd(),
+            "env_keys": self.env_keys,
+            "fingerprint": self.fingerprint,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ok": True,
+                "pid": os.getpid(),
+                "uptime": round(time.time() - self.started, 3),
+                "served": self.served,
+                "failed": self.failed,
+                "connections": self.connections,
+                "in_flight": self.in_flight,
+            }
+
+    def dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get("op")
+        if op == "execute":
+            return self._execute(request.get("task"))
+        if op == "hello":
+            return self.info()
+        if op == "stats":
+            return self.stats()
+        if op == "shutdown":
+            return self._shutdown(bool(request.get("if_idle")))
+        return {"ok": False, "error": f"unknown op {op!r}"}
+
+    def _execute(self, task: Any) -> Dict[str, Any]:
+        if not isinstance(task, dict):
+            return {"ok": False, "error": "execute needs a task object"}
+        with self._lock:
+            if self._stopping.is_set():
+                return {"ok": False, "unavailable": True, "error": "daemon is shutting down"}
+            self.in_flight += 1
+        try:
+            result = self.execute(task)
+            reply = {"ok": True, "result": result}
+        except Exception as exc:  # reported to the client, the daemon keeps serving
+            reply = {"ok": False, "task_error": True, "error": f"{type(exc).__name__}: {exc}"}
+        with self._lock:
+            self.in_flight -= 1
+            self.served += 1
+            self.failed += not reply["ok"]
+            self._last_active = time.monotonic()
+        return reply
+
+    def _shutdown(self, if_idle: bool) -> Dict[str, Any]:
+        with self._lock:
+            if if_idle and self.in_flight:
+                return {"ok": False, "busy": True, "in_flight": self.in_flight, "error": "daemon is running tasks"}
+            first = not self._stopping.is_set()
+            self._stopping.set()  # under the lock, so no new task starts
+        if first:
+            threading.Thread(target=self.shutdown, daemon=True).start()
+        return {"ok": True}
+
+    def stop(self) -> None:
+        """Stop serving; safe to call from any thread, including handlers."""
+        self._shutdown(if_idle=False)
+
+    def _watch_idle(self) -> None:
+        interval = min(1.0, self.idle_timeout / 4)
+        while not self._stopping.wait(interval):
+            with self._lock:
+                idle = self.connections == 0 and time.monotonic() - self._last_active >= self.idle_timeout
+            if idle:
+                self.stop()
+
+    def serve(self) -> None:
+        """Serve until stopped or idle, then remove the socket."""
+        if self.idle_timeout > 0:
+            threading.Thread(target=self._watch_idle, name="daemon-idle", daemon=True).start()
+        try:
+            self.serve_forever(poll_interval=0.2)
+        finally:
+            self._stopping.set()
+            self.server_close()
+            deadline = time.monotonic() + DRAIN_TIMEOUT
+            while self.in_flight and time.monotonic() < deadline:
+                time.sleep(0.05)  # handler threads die with the process
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+
+# -- client ------------------------------------------------------------------
+
+
+class DaemonClient:
+    """One connection to a daemon; not thread-safe (use one per thread)."""
+
+    def __init__(self, path: str, timeout: Optional[float] = None, connect_timeout: float = 2.0) -> None:
+        self.path = path
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._sock: Optional[socket.socket] = None
+        self._file: Any = None
+
+    def connect(self) -> "DaemonClient":
+        if not supported():
+            raise DaemonUnavailable("Unix domain sockets are not supported on this platform")
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.connect_timeout)
+        try:
+            owner = os.stat(self.path).st_uid
+            sock.connect(self.path)
+        except OSError as exc:
+            sock.close()
+            raise DaemonUnavailable(f"cannot connect to {self.path}: {exc}") from None
+        if owner != _uid():
+            # Another user's socket would receive every task prompt.
+            sock.close()
+            raise DaemonUnavailable(f"{self.path} belongs to another user (uid {owner})")
+        sock.settimeout(self.timeout)
+        self._sock, self._file = sock, sock.makefile("rwb")
+        return self
+
+    def close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._file.close()
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = self._file = None
+
+    def _stale(self) -> bool:
+        """True if the daemon has closed this kept-open connection.
+
+        Between requests nothing is due from the daemon, so a readable
+        socket means end of file (it went idle or was restarted).
+        """
+        try:
+            readable, _, _ = select.select([self._sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return bool(readable)
+
+    def call(self, op: str, **fields: Any) -> Dict[str, Any]:
+        """Send one request and return the reply.
+
+        A kept-open connection the daemon has since closed is replaced by
+        a fresh one before sending. Once the request is sent it is never
+        sent again: a lost reply raises :class:`DaemonError`, as the daemon
+        may already have run it.
+        """
+        message = json.dumps({"op": op, **fields}, default=str).encode("utf-8") + b"\n"
+        if self._sock is not None and self._stale():
+            self.close()
+        if self._sock is None:
+            self.connect()
+        try:
+            self._file.write(message)
+            self._file.flush()
+            line = self._file.readline()
+        except socket.timeout:
+            self.close()
+            raise DaemonError(f"daemon did not answer {op!r} in time") from None
+        except OSError as exc:
+            self.close()
+            raise DaemonError(f"connection to the daemon failed during {op!r}: {exc}") from None
+        if not line:
+            self.close()
+            raise DaemonError(f"daemon closed the connection during {op!r}")
+        return json.loads(line)
+
+    def execute(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        reply = self.call("execute", task=task)
+        if reply.get("unavailable"):  # refused without running it: a restarted daemon may take it
+            self.close()
+            reply = self.call("execute", task=task)
+        if reply.get("ok"):
+            return reply["result"]
+        if reply.get("task_error"):
+            raise RemoteTaskError(reply["error"])
+        if reply.get("unavailable"):
+            self.close()
+            raise DaemonUnavailable(reply["error"])
+        raise DaemonError(reply.get("error", "malformed reply"))
+
+
+@contextmanager
+def _start_lock(path: str) -> Iterator[None]:
+    """Serialise daemon start-up between clients racing to start one."""
+    if fcntl is None:  # pragma: no cover - Windows has no daemon anyway
+        yield
+        return
+    fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def _matching(path: str, replace: bool) -> Optional[DaemonClient]:
+    """Return a client for a daemon on ``path`` started with our environment.
+
+    A daemon with a different environment is shut down when ``replace``
+    is true and it is not running a task, and refused otherwise.
+    """
+    client = DaemonClient(path)
+    try:
+        info = client.call("hello")
+    except DaemonUnavailable:
+        return None
+    except DaemonError:
+        client.close()
+        return None
+    if info.get("protocol") == PROTOCOL and env_fingerprint(info.get("env_keys", ())) == info.get("fingerprint"):
+        return client
+    if not replace:
+        client.close()
+        raise DaemonUnavailable(f"daemon pid {info.get('pid')} was started with a different environment")
+    try:
+        reply = client.call("shutdown", if_idle=True)
+    except DaemonError:
+        reply = {"ok": True}
+    client.close()
+    if not reply.get("ok"):
+        raise DaemonUnavailable(
+            f"daemon pid {info.get('pid')} was started with a different environment and is running "
+            f"{reply.get('in_flight')} task(s); not replacing it"
+        )
+    deadline = time.monotonic() + 5.0
+    while os.path.exists(path) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return None
+
+
+def _spawn(path: str, idle_timeout: float) -> subprocess.Popen:
+    package_dir = Path(__file__).resolve().parents[1]
+    pythonpath = [str(package_dir), str(package_dir.parent)]
+    if os.environ.get("PYTHONPATH"):
+        pythonpath.append(os.environ["PYTHONPATH"])
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(pythonpath))
+    args = [sys.executable, "-m", f"{__package__}.daemon", "--socket", path, "--idle-timeout", str(idle_timeout)]
+    with open(path + ".log", "ab") as log:
+        return subprocess.Popen(
+            args, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT, env=env, start_new_session=True
+        )
+
+
+def connect(
+    path: Optional[str] = None,
+    autostart: bool = True,
+    idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    start_timeout: float = START_TIMEOUT,
+) -> DaemonClient:
+    """Return a client for this directory's daemon, starting it if needed.
+
+    Raises :class:`DaemonUnavailable` when there is none and it cannot
+    (or, without ``autostart``, may not) be started.
+    """
+    path = path or socket_path()
+    _prepare_dir(path)
+    client = _matching(path, replace=autostart)
+    if client is not None:
+        return client
+    if not autostart:
+        raise DaemonUnavailable(f"no daemon listening on {path}")
+    if not supported():
+        raise DaemonUnavailable("Unix domain sockets are not supported on this platform")
+    with _start_lock(path):
+        client = _matching(path, replace=True)
+        if client is not None:
+            return client
+        proc = _spawn(path, idle_timeout)
+        deadline = time.monotonic() + start_timeout
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise DaemonUnavailable(f"daemon exited with status {proc.returncode}; see {path}.log")
+            client = _matching(path, replace=False)
+            if client is not None:
+                return client
+            time.sleep(0.02)
+    raise DaemonUnavailable(f"daemon did not start within {start_timeout:g}s; see {path}.log")
+
+
+class DaemonExecutor:
+    """Executor sending tasks to the daemon, falling back to in-process.
+
+    Each calling thread keeps its own connection. The first time no
+    daemon can be reached, ``fallback()`` builds an in-process executor
+    that is used from then on.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        autostart: bool = True,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        fallback: Optional[Callable[[], Executor]] = None,
+        notice: Optional[Any] = None,
+    ) -> None:
+        self.path = path or socket_path()
+        self.autostart = autostart
+        self.idle_timeout = idle_timeout
+        self.fallback = fallback
+        self.notice = notice
+        self.fallback_reason: Optional[str] = None
+        self._in_process: Optional[Executor] = None
+        self._local = threading.local()
+        self._clients: List[DaemonClient] = []
+        self._lock = threading.Lock()
+
+    def _client(self) -> DaemonClient:
+        client = getattr(self._local, "client", None)
+        if client is None:
+            with self._lock:  # only one thread may start the daemon
+                client = connect(self.path, self.autostart, self.idle_timeout)
+                self._clients.append(client)
+            self._local.client = client
+        return client
+
+    def _fall_back(self, reason: str) -> Executor:
+        with self._lock:
+            if self._in_process is None:
+                if self.fallback is None:
+                    raise DaemonUnavailable(reason)
+                self.fallback_reason = reason
+                if self.notice is not None:
+                    print(f"daemon unavailable ({reason}); running in-process", file=self.notice, flush=True)
+                self._in_process = self.fallback()
+            return self._in_process
+
+    def __call__(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        if self._in_process is None:
+            # Only DaemonUnavailable (nothing was sent) is retried or falls
+            # back; a DaemonError after sending propagates so the task is
+            # never run twice.
+            for _ in range(2):
+                try:
+                    return self._client().execute(task)
+                except DaemonUnavailable as exc:
+                    reason = str(exc)
+                    self._local.client = None  # the daemon went away: reconnect or start it once
+            return self._fall_back(reason)(task)
+        return self._in_process(task)
+
+    def close(self) -> None:
+        with self._lock:
+            for client in self._clients:
+                client.close()
+            self._clients.clear()
+
+
+# -- entry points ------------------------------------------------------------
+
+
+def serve(path: Optional[str] = None, idle_timeout: float = DEFAULT_IDLE_TIMEOUT, db_path: Optional[str] = None) -> int:
+    """Build the engine and serve it on ``path`` until stopped or idle."""
+    from .runner import build_engine_executor
+
+    path = path or socket_path()
+    _prepare_dir(path)
+    probe = DaemonClient(path)
+    try:
+        probe.connect()
+    except DaemonUnavailable:
+        pass
+    else:
+        probe.close()
+        print(f"a daemon is already listening on {path}", file=sys.stderr)
+        return 0
+    server = DaemonServer(path, build_engine_executor(db_path), settings_env_keys(), idle_timeout)
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda *_: server.stop())
+    print(f"cli-multi-rapid daemon pid={os.getpid()} listening on {path}", file=sys.stderr, flush=True)
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def daemon_command(action: str, path: Optional[str] = None, idle_timeout: float = DEFAULT_IDLE_TIMEOUT) -> int:
+    """Run ``cli-multi-rapid daemon <action>``; return the exit status."""
+    path = path or socket_path()
+    if action == "serve":
+        return serve(path, idle_timeout)
+    if action == "start":
+        client = connect(path, autostart=True, idle_timeout=idle_timeout)
+        info = client.call("hello")
+        client.close()
+        print(f"daemon pid={info['pid']} listening on {path}")
+        return 0
+    client = DaemonClient(path)
+    try:
+        reply = client.call("stats" if action == "status" else "shutdown")
+    except DaemonUnavailable:
+        print(f"no daemon listening on {path}")
+        return 1 if action == "status" else 0
+    finally:
+        client.close()
+    if action == "status":
+        print(json.dumps(reply))
+    else:
+        print("daemon stopped")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="cli-multi-rapid-daemon", description="Serve the workflow engine on a Unix socket.")
+    parser.add_argument("--socket", help=f"socket path (default: ${ENV_SOCKET} or per working directory)")
+    parser.add_argument("--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT, help="exit after this many idle seconds (0: never)")
+    parser.add_argument("--db", help="database path (default: AGENTIC_DB)")
+    args = parser.parse_args(argv)
+    return serve(args.socket, args.idle_timeout, args.db)
+
+
+if __name__ == "__main__":  # pragma: no cover - started by connect()
+    sys.exit(main())
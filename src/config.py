@@ -6,38 +6,26 @@ variables to be loaded automatically and validated. The ``Settings``
 class can be instantiated once at application startup and passed to
 components such as service clients, the database manager and the quota
 manager.
+
+The :class:`Settings` model lives in :mod:`src._settings` and is loaded
+on first access through module ``__getattr__``, so importing this module
+(or one that only refers to the settings type) does not import pydantic.
 """
 
 from __future__ import annotations
 
-from pydantic import BaseSettings, Field
-
-
-class Settings(BaseSettings):
-    """Configuration settings loaded from environment variables or a .env file."""
-
-    # API keys for external services
-    anthropic_api_key: str = Field("", env="ANTHROPIC_API_KEY")
-    gemini_api_key: str = Field("", env="GEMINI_API_KEY")
-    github_token: str = Field("", env="GITHUB_TOKEN")
-
-    # Local service configuration
-    ollama_api_base: str = Field("http://localhost:11434", env="OLLAMA_API_BASE")
-    aider_cli_path: str = Field("aider", env="AIDER_CLI_PATH")
+from typing import TYPE_CHECKING, Any
 
-    # Database configuration
-    db_url: str = Field("agentic.db", env="AGENTIC_DB")
+if TYPE_CHECKING:  # pragma: no cover
+    from ._settings import Settings
 
-    # Redis configuration (for quota and caching)
-    redis_url: str = Field("redis://localhost:6379/0", env="REDIS_URL")
+__all__ = ["Settings"]
 
-    # Quota management
-    max_daily_cost: float = Field(10.0, env="MAX_DAILY_COST")
 
-    # Git configuration
-    default_branch: str = Field("main", env="DEFAULT_BRANCH")
-    lanes_config_path: str = Field("lanes.yaml", env="LANES_CONFIG_PATH")
+def __getattr__(name: str) -> Any:
+    if name == "Settings":
+        from ._settings import Settings
 
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
\ No newline at end of file
+        globals()["Settings"] = Settings
+        return Settings
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,7 +2,10 @@
 
 This class provides a simple interface around an SQLite database. It
 creates the required tables on initialisation and exposes methods for
-creating and retrieving :class:`WorkflowExecution` records. For
+creating and retrieving :class:`WorkflowExecution` records. One
+connection is opened per manager and shared (under a lock) by every
+thread, so a long-lived process such as the CLI daemon never reopens the
+database, and ``":memory:"`` databases keep their contents. For
 production use, consider using an ORM such as SQLAlchemy which provides
 migrations, connection pooling and richer querying capabilities.
 """
@@ -10,6 +13,7 @@ migrations, connection pooling and richer querying capabilities.
 from __future__ import annotations
 
 import sqlite3
+import threading
 from contextlib import contextmanager
 from typing import Iterator, List, Optional
 
@@ -21,6 +25,8 @@ class DatabaseManager:
 
     def __init__(self, db_path: str = "agentic.db") -> None:
         self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
         self._initialise()
 
     def _initialise(self) -> None:
@@ -41,12 +47,18 @@ class DatabaseManager:
 
     @contextmanager
     def _connect(self) -> Iterator[sqlite3.Connection]:
-        conn = sqlite3.connect(self.db_path)
-        try:
-            yield conn
-            conn.commit()
-        finally:
-            conn.close()
+        with self._lock:
+            try:
+                yield self._conn
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+
+    def close(self) -> None:
+        """Close the underlying connection."""
+        with self._lock:
+            self._conn.close()
 
     def create_execution(self, task_id: str, service: str, status: str = "pending", result: Optional[str] = None, cost: float = 0.0) -> int:
         """Insert a new workflow execution and return its ID."""
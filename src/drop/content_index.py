@@ -0,0 +1,102 @@
+"""Content-hash index of files saved through the drop server.
+
+Agents often save files whose content has not changed. The index records
+the SHA-256 of every saved path, both on disk (with the ``(size,
+mtime_ns)`` stamp of the written file, so edits made behind the server's
+back invalidate the entry) and per branch as queued for git mirroring. A
+repeated save is then recognised with a lookup and one ``stat`` and skips
+the disk write and all git work. The hash is also what clients send as
+``If-None-Match``.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+
+def normalize_etag(value: Optional[str]) -> Optional[str]:
+    """Return the bare lower-case hash from an ``ETag``/``If-None-Match`` value."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    return value.strip('"').lower() or None
+
+
+class ContentIndex:
+    """SQLite-backed ``path -> sha256`` index for disk and mirrored content."""
+
+    def __init__(self, db_path: Path | str) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS disk (
+                path TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS mirrored (
+                branch TEXT NOT NULL,
+                path TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                PRIMARY KEY (branch, path)
+            ) WITHOUT ROWID;
+            """
+        )
+
+    def current(self, rel: str, dest: Path) -> Optional[str]:
+        """Return the hash of ``dest`` if it is unchanged since it was recorded."""
+        with self._lock:
+            row = self.conn.execute("SELECT sha256, size, mtime_ns FROM disk WHERE path = ?", (rel,)).fetchone()
+        if row is None:
+            return None
+        try:
+            st = os.stat(dest)
+        except OSError:
+            return None
+        if (st.st_size, st.st_mtime_ns) != (row[1], row[2]):
+            return None
+        return row[0]
+
+    def record(self, rel: str, dest: Path, sha256: str) -> None:
+        st = os.stat(dest)
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO disk (path, sha256, size, mtime_ns) VALUES (?, ?, ?, ?)",
+                (rel, sha256, st.st_size, st.st_mtime_ns),
+            )
+
+    def mirrored(self, branch: str, rel: str) -> Optional[str]:
+        """Return the hash last queued for ``rel`` on ``branch``."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT sha256 FROM mirrored WHERE branch = ? AND path = ?", (branch, rel)
+            ).fetchone()
+        return row[0] if row else None
+
+    def record_mirrored(self, branch: str, rel: str, sha256: str) -> None:
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO mirrored (branch, path, sha256) VALUES (?, ?, ?)", (branch, rel, sha256)
+            )
+
+    def forget_mirrored(self, branch: str, rels: Iterable[str]) -> None:
+        """Drop entries so the next save of these paths is mirrored again."""
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "DELETE FROM mirrored WHERE branch = ? AND path = ?", ((branch, rel) for rel in rels)
+            )
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,136 @@
+"""Cross-process locking and per-branch worktrees for the drop server.
+
+Under a multi-worker server every process has its own mirror queue, so
+two processes may commit to the same repository at once. Two layouts
+are supported:
+
+* **shared tree** – all branches are checked out in ``REPO_DIR`` in turn,
+  and the whole commit/push section runs under one repository lock;
+* **branch worktrees** – each branch gets its own worktree inside the git
+  directory (``.git/drop-worktrees/``), and only saves to the *same*
+  branch serialise on that branch's lock, so different branches are
+  committed and pushed in parallel.
+
+Locks are ``flock`` locks on files under ``.git/drop-locks/``. They are
+held per open file description, so they exclude other threads as well as
+other processes, and the kernel releases them if a worker dies. On
+platforms without ``fcntl`` the lock degrades to a process-local one.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import subprocess
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+GitFn = Callable[..., Any]
+
+_LOCAL_LOCKS: Dict[str, threading.Lock] = {}
+_LOCAL_GUARD = threading.Lock()
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on ``path`` (created if missing)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fcntl is None:  # pragma: no cover - Windows
+        with _LOCAL_GUARD:
+            lock = _LOCAL_LOCKS.setdefault(str(path), threading.Lock())
+        with lock:
+            yield
+        return
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # closing the descriptor releases the lock
+
+
+def branch_slug(branch: str) -> str:
+    """Return a filesystem-safe, collision-free name for ``branch``."""
+    readable = re.sub(r"[^A-Za-z0-9._-]+", "_", branch).strip("._")[:60]
+    return f"{readable}-{hashlib.sha1(branch.encode('utf-8')).hexdigest()[:8]}"
+
+
+class BranchWorkspaces:
+    """Hand out a locked working tree for each branch."""
+
+    def __init__(
+        self,
+        repo_dir: Path,
+        git: GitFn,
+        default_branch: str = "main",
+        remote: str = "origin",
+        per_branch: bool = True,
+    ) -> None:
+        self.repo_dir = Path(repo_dir)
+        self.git = git
+        self.default_branch = default_branch
+        self.remote = remote
+        self.per_branch = per_branch
+        common = git("rev-parse", "--git-common-dir", cwd=self.repo_dir, check=True).stdout.strip()
+        self.git_dir = (self.repo_dir / common).resolve()
+        self.lock_dir = self.git_dir / "drop-locks"
+        self.worktree_dir = self.git_dir / "drop-worktrees"
+
+    def path(self, branch: str) -> Path:
+        return self.worktree_dir / branch_slug(branch) if self.per_branch else self.repo_dir
+
+    @contextmanager
+    def checkout(self, branch: str) -> Iterator[Path]:
+        """Lock ``branch`` and yield a working tree with it checked out.
+
+        In shared-tree mode the repository lock is held instead, and the
+        branch is checked out in ``repo_dir``.
+        """
+        if not self.per_branch:
+            with file_lock(self.lock_dir / "repo.lock"):
+                self._checkout_shared(branch)
+                yield self.repo_dir
+            return
+        with file_lock(self.lock_dir / f"{branch_slug(branch)}.lock"):
+            path = self.path(branch)
+            if not (path / ".git").exists():
+                # Adding a worktree updates shared metadata under .git/worktrees.
+                with file_lock(self.lock_dir / "repo.lock"):
+                    self._add_worktree(branch, path)
+            yield path
+
+    def _start_point(self) -> Optional[str]:
+        fetched = self.git("fetch", self.remote, self.default_branch, cwd=self.repo_dir, check=False)
+        if fetched.returncode == 0:
+            return f"{self.remote}/{self.default_branch}"
+        local = self.git("rev-parse", "--verify", "-q", self.default_branch, cwd=self.repo_dir, check=False)
+        return self.default_branch if local.returncode == 0 else None
+
+    def _checkout_shared(self, branch: str) -> None:
+        exists = self.git("rev-parse", "--verify", "-q", f"refs/heads/{branch}", cwd=self.repo_dir, check=False)
+        if exists.returncode == 0:
+            self.git("checkout", branch, cwd=self.repo_dir, check=True)
+            return
+        start = self._start_point()
+        self.git("checkout", "-B", branch, *([start] if start else []), cwd=self.repo_dir, check=True)
+
+    def _add_worktree(self, branch: str, path: Path) -> None:
+        self.git("worktree", "prune", cwd=self.repo_dir, check=False)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        exists = self.git("rev-parse", "--verify", "-q", f"refs/heads/{branch}", cwd=self.repo_dir, check=False)
+        if exists.returncode == 0:
+            # -f: the branch may also be checked out in the main tree.
+            self.git("worktree", "add", "-f", str(path), branch, cwd=self.repo_dir, check=True)
+            return
+        start = self._start_point()
+        if start is None:
+            raise subprocess.CalledProcessError(1, ["git", "worktree", "add"], "", "no start point for new branch")
+        self.git("worktree", "add", "-f", "-b", branch, str(path), start, cwd=self.repo_dir, check=True)
@@ -0,0 +1,215 @@
+"""Prometheus metrics for the drop server.
+
+A small registry of counters, histograms and callback gauges rendered in
+the Prometheus text exposition format, so ``/metrics`` needs no extra
+dependency.
+
+Under a multi-worker server each process counts on its own. When a
+``shared_dir`` is given, every process writes a snapshot of its values to
+``<shared_dir>/<pid>.json`` (at most once per ``flush_interval``) and
+:meth:`Metrics.render` adds up the snapshots of all live processes, so a
+scrape answered by any worker reports totals for the whole server.
+Snapshots of processes that have exited are removed.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _key(labels: Optional[Dict[str, object]]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _fmt_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Metrics:
+    """Thread-safe metrics registry with optional cross-process aggregation."""
+
+    def __init__(
+        self,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+        shared_dir: Optional[Path] = None,
+        flush_interval: float = 1.0,
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.shared_dir = Path(shared_dir) if shared_dir else None
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        # name, labels -> [per-bucket counts..., sum, count]
+        self._hists: Dict[Tuple[str, LabelKey], List[float]] = {}
+        self._gauges: Dict[str, Callable[[], float]] = {}
+        self._last_flush = 0.0
+        if self.shared_dir is not None:
+            self.shared_dir.mkdir(parents=True, exist_ok=True)
+
+    # -- registration ------------------------------------------------------
+
+    def describe(self, name: str, kind: str, help_text: str) -> None:
+        """Declare ``name`` as a ``counter``, ``histogram`` or ``gauge``."""
+        self._meta[name] = (kind, help_text)
+
+    def gauge(self, name: str, fn: Callable[[], float], help_text: str = "") -> None:
+        """Register a gauge whose value is read from ``fn`` at flush/render time."""
+        self._meta[name] = ("gauge", help_text)
+        self._gauges[name] = fn
+
+    # -- recording ---------------------------------------------------------
+
+    def inc(self, name: str, value: float = 1.0, **labels: object) -> None:
+        key = (name, _key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: object) -> None:
+        key = (name, _key(labels))
+        with self._lock:
+            hist = self._hists.get(key)
+            if hist is None:
+                hist = self._hists[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    hist[i] += 1
+                    break
+            hist[-2] += value
+            hist[-1] += 1
+
+    @contextmanager
+    def time(self, name: str, **labels: object) -> Iterator[None]:
+        """Observe the duration of the ``with`` block, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    # -- export ------------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, list]:
+        with self._lock:
+            counters = [[n, list(map(list, k)), v] for (n, k), v in self._counters.items()]
+            hists = [[n, list(map(list, k)), list(v)] for (n, k), v in self._hists.items()]
+        gauges = []
+        for name, fn in self._gauges.items():
+            try:
+                gauges.append([name, [], float(fn())])
+            except Exception:  # a broken gauge must not break the scrape
+                continue
+        return {"buckets": list(self.buckets), "counters": counters, "hists": hists, "gauges": gauges}
+
+    def flush(self, force: bool = False) -> None:
+        """Write this process's snapshot for the other workers to read."""
+        if self.shared_dir is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = now
+        path = self.shared_dir / f"{os.getpid()}.json"
+        tmp = path.with_suffix(".tmp")
+        try:
+            tmp.write_text(json.dumps(self.snapshot()), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def _peer_snapshots(self) -> Iterator[Dict[str, list]]:
+        if self.shared_dir is None:
+            return
+        for path in self.shared_dir.glob("*.json"):
+            try:
+                pid = int(path.stem)
+            except ValueError:
+                continue
+            if pid == os.getpid():
+                continue
+            if not _pid_alive(pid):
+                path.unlink(missing_ok=True)
+                continue
+            try:
+                snap = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if snap.get("buckets") == list(self.buckets):
+                yield snap
+
+    def render(self) -> str:
+        """Return all metrics (summed over live processes) in text format."""
+        self.flush(force=True)
+        counters: Dict[Tuple[str, LabelKey], float] = {}
+        hists: Dict[Tuple[str, LabelKey], List[float]] = {}
+        gauges: Dict[Tuple[str, LabelKey], float] = {}
+        for snap in [self.snapshot(), *self._peer_snapshots()]:
+            for name, labels, value in snap["counters"]:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0.0) + value
+            for name, labels, values in snap["hists"]:
+                key = (name, tuple(map(tuple, labels)))
+                total = hists.setdefault(key, [0.0] * len(values))
+                for i, v in enumerate(values):
+                    total[i] += v
+            for name, labels, value in snap["gauges"]:
+                key = (name, tuple(map(tuple, labels)))
+                gauges[key] = gauges.get(key, 0.0) + value
+
+        by_name: Dict[str, List[str]] = {}
+        for (name, key), value in sorted(counters.items()):
+            by_name.setdefault(name, []).append(f"{name}{_fmt_labels(key)} {_fmt_value(value)}")
+        for (name, key), value in sorted(gauges.items()):
+            by_name.setdefault(name, []).append(f"{name}{_fmt_labels(key)} {_fmt_value(value)}")
+        for (name, key), values in sorted(hists.items()):
+            lines = by_name.setdefault(name, [])
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{name}_bucket{_fmt_labels(key, (('le', _fmt_value(bound)),))} {_fmt_value(cumulative)}")
+            lines.append(f"{name}_bucket{_fmt_labels(key, (('le', '+Inf'),))} {_fmt_value(values[-1])}")
+            lines.append(f"{name}_sum{_fmt_labels(key)} {_fmt_value(values[-2])}")
+            lines.append(f"{name}_count{_fmt_labels(key)} {_fmt_value(values[-1])}")
+
+        out: List[str] = []
+        for name in sorted(set(by_name) | set(self._meta)):
+            kind, help_text = self._meta.get(name, ("untyped", ""))
+            if help_text:
+                out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(by_name.get(name, []))
+        return "\n".join(out) + "\n"
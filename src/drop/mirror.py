@@ -0,0 +1,476 @@
+"""Background git mirroring for the drop server.
+
+Running checkout, add, commit and push inside the ``/save`` request puts
+a network round trip on every save, and concurrent requests race on the
+shared working tree. :class:`MirrorQueue` moves that work to background
+workers:
+
+* saves are queued per branch and acknowledged immediately with a job id;
+* saves to a branch arriving within the debounce window are coalesced
+  into one commit;
+* each branch is pushed once per round, after all of its ready commits;
+* a failed push is retried with exponential backoff while new saves keep
+  being committed, so a flaky remote never blocks the queue.
+
+Each branch is handled by at most one thread at a time, inside
+:meth:`BranchWorkspaces.checkout <src.drop.locking.BranchWorkspaces.checkout>`,
+which holds a cross-process lock; queues in several server processes can
+therefore share one repository, and different branches proceed in
+parallel when each has its own worktree.
+
+Content given as a path (a streamed upload under ``SAVE_BASE_DIR``) is
+snapshotted when the job is submitted: hard-linked, or copied where that
+is not possible, into ``.git/drop-spool/``. Later saves of the same path
+replace the live file rather than rewrite it, so the job keeps the bytes
+it was submitted with. At commit time the snapshot is checked against the
+SHA-256 recorded for it, and a job whose content no longer matches fails
+instead of committing someone else's bytes.
+
+Job progress (``queued`` → ``committing`` → ``pushing`` → ``done``, or
+``retrying``/``failed``) is exposed through :meth:`MirrorQueue.status`,
+optionally backed by a :class:`JobStore` shared by all processes. With
+``job_max_age``, the worker deletes stored jobs not updated for that long
+(at most every :data:`PRUNE_INTERVAL` seconds), so the store stays small.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from .locking import BranchWorkspaces
+
+GitFn = Callable[..., Any]
+# File content, or a path to copy it from (used for large streamed uploads).
+Content = Union[bytes, Path]
+# Minimum seconds between two prunes of the job store.
+PRUNE_INTERVAL = 300.0
+
+
+@dataclass
+class MirrorJob:
+    """One save waiting to be committed and pushed."""
+
+    id: str
+    branch: str
+    message: str
+    files: List[Tuple[str, Content]]
+    paths: List[str] = field(default_factory=list)
+    # Expected SHA-256 of path contents, checked before committing.
+    shas: Dict[str, str] = field(default_factory=dict)
+    status: str = "queued"
+    commit: Optional[str] = None
+    attempts: int = 0
+    error: Optional[str] = None
+    created: float = field(default_factory=time.time)
+    updated: float = field(default_factory=time.time)
+
+    def set(self, status: str, **changes: Any) -> None:
+        self.status = status
+        for key, value in changes.items():
+            setattr(self, key, value)
+        self.updated = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "branch": self.branch,
+            "status": self.status,
+            "paths": self.paths,
+            "commit": self.commit,
+            "push_attempts": self.attempts,
+            "error": self.error,
+            "created": self.created,
+            "updated": self.updated,
+        }
+
+
+class JobStore:
+    """SQLite table of job status dicts, readable from every server process."""
+
+    def __init__(self, db_path: Path | str) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, data TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def put(self, jobs: Sequence[MirrorJob]) -> None:
+        rows = [(job.id, json.dumps(job.to_dict()), job.updated) for job in jobs]
+        with self._lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO jobs (id, data, updated) VALUES (?, ?, ?)", rows)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def prune(self, max_age: float) -> int:
+        """Delete jobs not updated for ``max_age`` seconds; return how many."""
+        with self._lock, self.conn:
+            return self.conn.execute("DELETE FROM jobs WHERE updated < ?", (time.time() - max_age,)).rowcount
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class MirrorQueue:
+    """Per-branch queue that commits and pushes saves in the background."""
+
+    def __init__(
+        self,
+        workspaces: BranchWorkspaces,
+        git: GitFn,
+        debounce: float = 0.5,
+        max_retries: int = 5,
+        retry_backoff: float = 2.0,
+        remote: str = "origin",
+        max_jobs: int = 10_000,
+        branch_workers: int = 4,
+        store: Optional[JobStore] = None,
+        on_failed: Optional[Callable[[MirrorJob], None]] = None,
+        on_phase: Optional[Callable[[str, float], None]] = None,
+        job_max_age: Optional[float] = None,
+    ) -> None:
+        self.workspaces = workspaces
+        self.repo_dir = workspaces.repo_dir
+        self.git = git
+        self.debounce = debounce
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.remote = remote
+        self.max_jobs = max_jobs
+        self.branch_workers = max(1, branch_workers)
+        self.store = store
+        self.job_max_age = job_max_age
+        self._pruned_at: Optional[float] = None
+        # Called (outside the queue lock) for every job that ends up ``failed``.
+        self.on_failed = on_failed
+        # Called with ("workspace", seconds) after waiting for and checking out a branch.
+        self.on_phase = on_phase
+        self._jobs: "OrderedDict[str, MirrorJob]" = OrderedDict()
+        self._pending: Dict[str, List[MirrorJob]] = {}
+        self._last_write: Dict[str, float] = {}
+        self._unpushed: Dict[str, List[MirrorJob]] = {}
+        self._retry_at: Dict[str, float] = {}
+        self._active: Set[str] = set()  # branches a worker currently holds
+        self._cond = threading.Condition()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    # -- public API --------------------------------------------------------
+
+    def submit(
+        self,
+        branch: str,
+        files: Sequence[Tuple[str, Content]],
+        message: str,
+        shas: Optional[Dict[str, str]] = None,
+    ) -> MirrorJob:
+        """Queue ``files`` (relative posix path, bytes or source path) for ``branch``.
+
+        Source paths are snapshotted now; ``shas`` maps relative paths to
+        the SHA-256 their content must still have when it is committed.
+        """
+        owned = [(rel, self._snapshot(raw) if isinstance(raw, Path) else raw) for rel, raw in files]
+        job = MirrorJob(uuid.uuid4().hex, branch, message, owned, [rel for rel, _ in files], dict(shas or {}))
+        self._persist([job])
+        with self._cond:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+            self._pending.setdefault(branch, []).append(job)
+            self._last_write[branch] = time.monotonic()
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.branch_workers, thread_name_prefix="drop-mirror-branch")
+                self._thread = threading.Thread(target=self._run, name="drop-mirror", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        return job
+
+    def get(self, job_id: str) -> Optional[MirrorJob]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job's status dict, from this process or the shared store."""
+        job = self.get(job_id)
+        if job is not None:
+            with self._cond:
+                return job.to_dict()
+        return self.store.get(job_id) if self.store is not None else None
+
+    def depth(self) -> int:
+        """Number of jobs not yet committed or pushed."""
+        with self._cond:
+            return sum(len(v) for v in self._pending.values()) + sum(len(v) for v in self._unpushed.values())
+
+    def wait(self, job_id: str, timeout: float = 30.0) -> Optional[MirrorJob]:
+        """Block until the job is ``done`` or ``failed`` (or ``timeout``)."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None or job.status in ("done", "failed"):
+                    return job
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return job
+                self._cond.wait(remaining)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    # -- content snapshots -------------------------------------------------
+
+    @property
+    def spool_dir(self) -> Path:
+        return self.workspaces.git_dir / "drop-spool"
+
+    def _snapshot(self, source: Path) -> Path:
+        """Return a file owned by the job with the current content of ``source``."""
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        target = self.spool_dir / uuid.uuid4().hex
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copyfile(source, target)
+        return target
+
+    @staticmethod
+    def _release(jobs: Sequence[MirrorJob]) -> None:
+        """Drop the jobs' content, deleting their snapshots."""
+        for job in jobs:
+            for _, raw in job.files:
+                if isinstance(raw, Path):
+                    raw.unlink(missing_ok=True)
+            job.files = []  # finished jobs are kept for /jobs; their content is not
+
+    @staticmethod
+    def _content_changed(job: MirrorJob) -> Optional[str]:
+        for rel, raw in job.files:
+            expected = job.shas.get(rel)
+            if expected is None or not isinstance(raw, Path):
+                continue
+            digest = hashlib.sha256()
+            with raw.open("rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            if digest.hexdigest() != expected:
+                return rel
+        return None
+
+    # -- worker ------------------------------------------------------------
+
+    def _set(self, jobs: Sequence[MirrorJob], status: str, **changes: Any) -> None:
+        for job in jobs:
+            job.set(status, **changes)
+        self._persist(jobs)
+
+    def _persist(self, jobs: Sequence[MirrorJob]) -> None:
+        if self.store is None or not jobs:
+            return
+        try:
+            self.store.put(jobs)
+        except sqlite3.Error:
+            pass  # status reporting must not stall mirroring
+
+    def _next_wakeup(self, now: float) -> Tuple[List[str], List[str], Optional[float]]:
+        """Return idle branches ready to commit, idle branches ready to push and the next deadline."""
+        idle = lambda b: b not in self._active  # noqa: E731
+        ready = [
+            b for b, jobs in self._pending.items() if jobs and idle(b) and now - self._last_write[b] >= self.debounce
+        ]
+        push = [
+            b for b in self._unpushed
+            if self._unpushed[b] and idle(b) and b not in ready and self._retry_at.get(b, 0.0) <= now
+        ]
+        deadlines = [self._last_write[b] + self.debounce for b, jobs in self._pending.items() if jobs and idle(b)]
+        deadlines += [
+            self._retry_at[b] for b in self._unpushed if self._unpushed[b] and idle(b) and b in self._retry_at
+        ]
+        return ready, push, min(deadlines) if deadlines else None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    ready, push, deadline = self._next_wakeup(now)
+                    if ready or push:
+                        break
+                    if self._stopping and not self._active:
+                        return
+                    # Finishing branches notify, so an active branch's deadline can wait.
+                    self._cond.wait(None if deadline is None else max(0.0, deadline - now))
+                work = [(b, self._pending.pop(b)) for b in ready] + [(b, []) for b in push]
+                self._active.update(b for b, _ in work)
+            for branch, jobs in work:
+                self._executor.submit(self._process, branch, jobs)
+            self._prune_store()
+
+    def _prune_store(self) -> None:
+        if self.store is None or not self.job_max_age:
+            return
+        now = time.monotonic()
+        if self._pruned_at is not None and now - self._pruned_at < min(PRUNE_INTERVAL, self.job_max_age):
+            return
+        self._pruned_at = now
+        try:
+            self.store.prune(self.job_max_age)
+        except sqlite3.Error:
+            pass  # another process holds the database; the next round prunes
+
+    def _process(self, branch: str, jobs: List[MirrorJob]) -> None:
+        """Commit ``jobs`` and push ``branch`` while holding its workspace."""
+        try:
+            if jobs:
+                with self._cond:
+                    self._set(jobs, "committing")
+            try:
+                start = time.perf_counter()
+                with self.workspaces.checkout(branch) as cwd:
+                    if self.on_phase is not None:
+                        self.on_phase("workspace", time.perf_counter() - start)
+                    if jobs:
+                        self._commit(cwd, branch, jobs)
+                    with self._cond:
+                        due = bool(self._unpushed.get(branch)) and self._retry_at.get(branch, 0.0) <= time.monotonic()
+                    if due:
+                        self._push(cwd, branch)
+            except (subprocess.CalledProcessError, OSError) as e:
+                error = getattr(e, "stderr", None) or str(e)
+                with self._cond:
+                    failed = [job for job in jobs if job.status == "committing"]
+                    self._set(failed, "failed", error=f"checkout failed: {error}")
+                self._release(failed)
+                self._notify_failed(failed)
+        finally:
+            with self._cond:
+                self._active.discard(branch)
+                self._cond.notify_all()
+
+    def _commit(self, cwd: Path, branch: str, jobs: List[MirrorJob]) -> None:
+        try:
+            self._commit_files(cwd, branch, jobs)
+        finally:
+            self._release(jobs)
+
+    def _commit_files(self, cwd: Path, branch: str, jobs: List[MirrorJob]) -> None:
+        changed = []
+        for job in jobs:
+            try:
+                rel = self._content_changed(job)
+            except OSError as e:
+                rel = f"{job.paths[0] if job.paths else '?'} ({e})"
+            if rel is not None:
+                changed.append((job, rel))
+        if changed:
+            with self._cond:
+                for job, rel in changed:
+                    self._set([job], "failed", error=f"content of {rel} changed before it was committed")
+            self._notify_failed([job for job, _ in changed])
+            jobs = [job for job in jobs if all(job is not bad for bad, _ in changed)]
+            if not jobs:
+                return
+        files: Dict[str, Content] = {}
+        for job in jobs:
+            files.update(job.files)  # later saves of the same path win
+        if len(jobs) == 1:
+            message = jobs[0].message
+        else:
+            message = f"agent: {len(jobs)} saves\n\n" + "\n".join(f"- {job.message}" for job in jobs)
+        try:
+            for rel, raw in files.items():
+                target = cwd / rel
+                target.parent.mkdir(parents=True, exist_ok=True)
+                if isinstance(raw, Path):
+                    shutil.copyfile(raw, target)
+                else:
+                    target.write_bytes(raw)
+            paths = sorted(files)
+            self.git("add", "--", *paths, cwd=cwd, check=True)
+            committed = self.git("commit", "-m", message, "--", *paths, cwd=cwd, check=False)
+            sha = self.git("rev-parse", "HEAD", cwd=cwd, check=True).stdout.strip()
+            # A push that ran out of retries leaves its commits only in the
+            # local branch, so an unchanged save must still push them.
+            ahead = committed.returncode == 0 or self._ahead(cwd, branch)
+        except (subprocess.CalledProcessError, OSError) as e:
+            error = getattr(e, "stderr", None) or str(e)
+            with self._cond:
+                self._set(jobs, "failed", error=f"commit failed: {error}")
+            self._notify_failed(jobs)
+            return
+        with self._cond:
+            if not ahead and not self._unpushed.get(branch):
+                # Nothing changed and nothing is waiting to be pushed.
+                self._set(jobs, "done", commit=sha, error=None)
+                return
+            self._set(jobs, "pushing", commit=sha)
+            self._unpushed.setdefault(branch, []).extend(jobs)
+
+    def _ahead(self, cwd: Path, branch: str) -> bool:
+        """Return whether ``branch`` has commits its remote copy lacks."""
+        counted = self.git("rev-list", "--count", f"{self.remote}/{branch}..HEAD", cwd=cwd, check=False)
+        if counted.returncode != 0:
+            return True  # never pushed, so the remote has no copy yet
+        return counted.stdout.strip() != "0"
+
+    def _push(self, cwd: Path, branch: str) -> None:
+        with self._cond:
+            jobs = list(self._unpushed.get(branch, []))
+        if not jobs:
+            return
+        result = self.git("push", self.remote, branch, cwd=cwd, check=False)
+        with self._cond:
+            attempts = max(job.attempts for job in jobs) + 1
+            if result.returncode == 0:
+                self._set(jobs, "done", attempts=attempts, error=None)
+                self._unpushed[branch] = [j for j in self._unpushed[branch] if j not in jobs]
+                self._retry_at.pop(branch, None)
+                return
+            error = (result.stderr or "").strip() or f"git push exited with {result.returncode}"
+            if attempts >= self.max_retries:
+                self._set(jobs, "failed", attempts=attempts, error=f"push failed: {error}")
+                self._unpushed[branch] = [j for j in self._unpushed[branch] if j not in jobs]
+                self._retry_at.pop(branch, None)
+            else:
+                self._set(jobs, "retrying", attempts=attempts, error=f"push failed: {error}")
+                self._retry_at[branch] = time.monotonic() + self.retry_backoff * 2 ** (attempts - 1)
+                return
+        self._notify_failed(jobs)
+
+    def _notify_failed(self, jobs: List[MirrorJob]) -> None:
+        if self.on_failed is None:
+            return
+        for job in jobs:
+            try:
+                self.on_failed(job)
+            except Exception:  # a listener must not kill the worker
+                pass
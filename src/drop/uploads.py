@@ -0,0 +1,247 @@
+"""Streaming and resumable uploads for the drop server.
+
+``/save`` takes base64 inside JSON, so a file is held in memory three
+times (JSON body, base64 text, decoded bytes) and is 33% larger on the
+wire. The helpers here stream a raw request body straight to a temp file
+in the destination directory, hashing as they go, and rename it into
+place atomically once it is complete, so memory use is one copy buffer
+regardless of file size.
+
+:class:`UploadStore` adds resumable uploads: a session records the target
+path, expected size and optional SHA-256; chunks are appended at an
+explicit offset (a mismatched offset is rejected with the current one so
+the client can resume) and may carry their own checksum. Session state is
+kept on disk, so uploads survive a server restart, and chunks are
+serialized with a file lock per session, so several server processes can
+take chunks for the same upload.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple
+
+from .locking import file_lock
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadError(Exception):
+    """An upload was rejected; ``status`` is the HTTP status to report."""
+
+    def __init__(self, status: int, message: str, **extra: Any) -> None:
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+
+def _copy(stream: BinaryIO, out: BinaryIO, limit: Optional[int], digests: Tuple[Any, ...]) -> int:
+    """Copy ``stream`` into ``out`` updating ``digests``; return bytes copied."""
+    total = 0
+    buf = bytearray(CHUNK_SIZE)
+    view = memoryview(buf)
+    readinto = getattr(stream, "readinto", None)
+    while True:
+        if readinto is not None:
+            n = readinto(buf)
+            data = view[:n] if n else b""
+        else:
+            data = stream.read(CHUNK_SIZE)
+            n = len(data)
+        if not n:
+            return total
+        total += n
+        if limit is not None and total > limit:
+            raise UploadError(413, f"upload exceeds {limit} bytes")
+        out.write(data)
+        for digest in digests:
+            digest.update(data)
+
+
+def stream_to_file(
+    stream: BinaryIO,
+    dest: Path,
+    max_bytes: Optional[int] = None,
+    expected_sha256: Optional[str] = None,
+    unless_sha256: Optional[str] = None,
+) -> Tuple[int, str, bool]:
+    """Stream ``stream`` into ``dest`` atomically; return ``(size, sha256, replaced)``.
+
+    The data goes to a temp file in ``dest``'s directory which replaces
+    ``dest`` only after the whole body was received and, if given, the
+    checksum matched. On any failure ``dest`` is left untouched. When the
+    received content hashes to ``unless_sha256`` (the hash of the current
+    file), the temp file is discarded and ``replaced`` is ``False``.
+    """
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=dest.parent, prefix=f".{dest.name}.", suffix=".tmp")
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as out:
+            size = _copy(stream, out, max_bytes, (digest,))
+        sha = digest.hexdigest()
+        if expected_sha256 and sha != expected_sha256.lower():
+            raise UploadError(422, "checksum mismatch", sha256=sha)
+        if sha == unless_sha256:
+            os.unlink(tmp)
+            return size, sha, False
+        os.replace(tmp, dest)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return size, sha, True
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class UploadStore:
+    """Resumable upload sessions persisted under ``state_dir``."""
+
+    def __init__(self, state_dir: Path, ttl: float = 24 * 3600, max_bytes: Optional[int] = None) -> None:
+        self.state_dir = Path(state_dir)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+    @contextmanager
+    def _lock(self, upload_id: str) -> Iterator[None]:
+        # A file lock rather than a threading.Lock: gunicorn workers share sessions.
+        if not upload_id.isalnum():
+            raise UploadError(404, "unknown upload")
+        with file_lock(self._lock_path(upload_id)):
+            yield
+
+    def _lock_path(self, upload_id: str) -> Path:
+        return self.state_dir / f"{upload_id}.lock"
+
+    def _state_path(self, upload_id: str) -> Path:
+        return self.state_dir / f"{upload_id}.json"
+
+    def _save(self, session: Dict[str, Any]) -> None:
+        tmp = self._state_path(session["id"]).with_suffix(".tmp")
+        tmp.write_text(json.dumps(session), encoding="utf-8")
+        os.replace(tmp, self._state_path(session["id"]))
+
+    def get(self, upload_id: str) -> Dict[str, Any]:
+        if not upload_id.isalnum():
+            raise UploadError(404, "unknown upload")
+        try:
+            return json.loads(self._state_path(upload_id).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            raise UploadError(404, "unknown upload") from None
+
+    def create(self, rel: str, dest: Path, size: int, sha256: Optional[str] = None, **meta: Any) -> Dict[str, Any]:
+        """Start a session for ``size`` bytes destined for ``dest``."""
+        if size < 0:
+            raise UploadError(400, "size must be non-negative")
+        if self.max_bytes is not None and size > self.max_bytes:
+            raise UploadError(413, f"upload exceeds {self.max_bytes} bytes")
+        upload_id = uuid.uuid4().hex
+        part = dest.parent / f".{dest.name}.{upload_id}.part"
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        part.touch()
+        session = {
+            "id": upload_id,
+            "path": rel,
+            "dest": str(dest),
+            "part": str(part),
+            "size": size,
+            "sha256": sha256.lower() if sha256 else None,
+            "offset": 0,
+            "complete": False,
+            "created": time.time(),
+            "meta": meta,
+        }
+        self._save(session)
+        return session
+
+    def append(
+        self,
+        upload_id: str,
+        offset: int,
+        stream: BinaryIO,
+        chunk_sha256: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Append a chunk at ``offset``; complete the upload when it is full.
+
+        A wrong ``offset`` raises a 409 carrying the current offset. A chunk
+        whose checksum does not match is discarded (the offset does not
+        advance), so the client can simply resend it.
+        """
+        with self._lock(upload_id):
+            session = self.get(upload_id)
+            if session["complete"]:
+                raise UploadError(409, "upload already complete", offset=session["offset"])
+            if offset != session["offset"]:
+                raise UploadError(409, "offset mismatch", offset=session["offset"])
+            digest = hashlib.sha256()
+            remaining = session["size"] - offset
+            with open(session["part"], "r+b") as out:
+                out.seek(offset)
+                try:
+                    written = _copy(stream, out, remaining, (digest,))
+                except UploadError:
+                    out.truncate(offset)
+                    raise UploadError(413, "chunk extends past the declared size", offset=offset) from None
+                if chunk_sha256 and digest.hexdigest() != chunk_sha256.lower():
+                    out.truncate(offset)
+                    raise UploadError(422, "chunk checksum mismatch", offset=offset)
+                out.truncate(offset + written)
+            session["offset"] = offset + written
+            if session["offset"] == session["size"]:
+                self._finish(session)
+            self._save(session)
+            return session
+
+    def _finish(self, session: Dict[str, Any]) -> None:
+        sha = file_sha256(Path(session["part"]))
+        if session["sha256"] and sha != session["sha256"]:
+            # Start over: the assembled file is not what the client declared.
+            with open(session["part"], "r+b") as f:
+                f.truncate(0)
+            session["offset"] = 0
+            self._save(session)
+            raise UploadError(422, "checksum mismatch", offset=0, sha256=sha)
+        os.replace(session["part"], session["dest"])
+        session["complete"] = True
+        session["sha256"] = sha
+        # Later waiters on the unlinked lock only see a complete session.
+        self._lock_path(session["id"]).unlink(missing_ok=True)
+
+    def cleanup(self, now: Optional[float] = None) -> int:
+        """Remove sessions (and part files) older than ``ttl``; return how many."""
+        now = time.time() if now is None else now
+        removed = 0
+        for state in self.state_dir.glob("*.json"):
+            try:
+                session = json.loads(state.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if now - session.get("created", now) < self.ttl:
+                continue
+            with self._lock(state.stem):  # not while a chunk is being written
+                if not session.get("complete"):
+                    try:
+                        os.unlink(session["part"])
+                    except OSError:
+                        pass
+                state.unlink(missing_ok=True)
+            self._lock_path(state.stem).unlink(missing_ok=True)
+            removed += 1
+        return removed
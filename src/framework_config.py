@@ -0,0 +1,579 @@
+"""Routing and lane configuration.
+
+``config.schema.json`` describes the framework config file (``routing``,
+``lanes``, ``tasks`` and ``integrations``). This module loads such a file
+(YAML or JSON), validates it against the schema and compiles it into an
+immutable :class:`FrameworkConfig` whose lookups are precomputed indexes:
+lanes by name and by branch prefix, tasks by label and the service each
+task or lane routes to. Nothing is re-read or re-parsed per lookup.
+:meth:`LaneConfig.allows` reads ``allowedPaths`` as the same anchored
+gitignore-style patterns the lane's sparse checkout uses.
+
+The schema validator is compiled once per process. :mod:`jsonschema` is
+used when it is installed; otherwise the schema is compiled into a tree
+of small check functions covering the keywords the schema uses (``type``,
+``properties``, ``required``, ``items``, ``enum``, ``minimum`` and
+``maximum``).
+
+:class:`ConfigStore` holds the current config for long-running processes.
+It polls the file (a ``stat`` per interval; the file is only parsed when
+its size or mtime changed and its content hash differs) and swaps in a
+new :class:`FrameworkConfig` with a single reference assignment, so
+readers always see one complete version. A file that fails to parse or
+validate is rejected and the previous version stays active.
+:func:`shared_store` hands out one started store per file, which the
+router, the engine executor and the drop server share.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+SCHEMA_PATH = Path(__file__).resolve().parents[1] / "config.schema.json"
+
+# ``defaultAgent`` values -> service names used by the service router.
+# ``auto`` maps to ``None``: let the router apply its own default.
+AGENT_SERVICES: Mapping[str, Optional[str]] = MappingProxyType(
+    {"auto": None, "claude": "anthropic", "gemini": "gemini", "aider": "aider", "ollama": "ollama"}
+)
+
+Validator = Callable[[Any], List[str]]
+
+
+class ConfigError(ValueError):
+    """The config file could not be read or does not match the schema."""
+
+    def __init__(self, message: str, errors: Sequence[str] = ()) -> None:
+        super().__init__(message if not errors else f"{message}: " + "; ".join(errors))
+        self.errors = tuple(errors)
+
+
+# -- schema validation ----------------------------------------------------
+
+_TYPES: Dict[str, Tuple[type, ...]] = {
+    "object": (dict,),
+    "array": (list,),
+    "string": (str,),
+    "number": (int, float),
+    "integer": (int,),
+    "boolean": (bool,),
+    "null": (type(None),),
+}
+
+_Check = Callable[[Any, str, List[str]], None]
+
+
+def _compile_node(schema: Mapping[str, Any]) -> _Check:
+    checks: List[_Check] = []
+
+    if "type" in schema:
+        names = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        types = tuple(t for name in names for t in _TYPES[name])
+        allow_bool = "boolean" in names
+
+        def check_type(value: Any, path: str, errors: List[str]) -> None:
+            if not isinstance(value, types) or (isinstance(value, bool) and not allow_bool):
+                errors.append(f"{path or '$'}: expected {' or '.join(names)}")
+
+        checks.append(check_type)
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+
+        def check_enum(value: Any, path: str, errors: List[str]) -> None:
+            if value not in allowed:
+                errors.append(f"{path or '$'}: must be one of {allowed}")
+
+        checks.append(check_enum)
+    for keyword, fails in (("minimum", lambda v, b: v < b), ("maximum", lambda v, b: v > b)):
+        if keyword in schema:
+            bound = schema[keyword]
+
+            def check_bound(value: Any, path: str, errors: List[str], bound=bound, fails=fails, keyword=keyword) -> None:
+                if isinstance(value, (int, float)) and not isinstance(value, bool) and fails(value, bound):
+                    errors.append(f"{path or '$'}: {keyword} is {bound}")
+
+            checks.append(check_bound)
+    if "required" in schema or "properties" in schema:
+        required = list(schema.get("required", ()))
+        properties = {name: _compile_node(sub) for name, sub in schema.get("properties", {}).items()}
+
+        def check_object(value: Any, path: str, errors: List[str]) -> None:
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if name not in value:
+                    errors.append(f"{path or '$'}: missing required property {name!r}")
+            for name, check in properties.items():
+                if name in value:
+                    check(value[name], f"{path}.{name}" if path else name, errors)
+
+        checks.append(check_object)
+    if "items" in schema:
+        item_check = _compile_node(schema["items"])
+
+        def check_items(value: Any, path: str, errors: List[str]) -> None:
+            if isinstance(value, list):
+                for i, item in enumerate(value):
+                    item_check(item, f"{path}[{i}]", errors)
+
+        checks.append(check_items)
+
+    def check(value: Any, path: str, errors: List[str]) -> None:
+        for c in checks:
+            c(value, path, errors)
+
+    return check
+
+
+def compile_schema(schema: Mapping[str, Any]) -> Validator:
+    """Compile ``schema`` into a function returning a list of error messages."""
+    try:
+        import jsonschema  # type: ignore
+    except ImportError:
+        root = _compile_node(schema)
+
+        def validate(instance: Any) -> List[str]:
+            errors: List[str] = []
+            root(instance, "", errors)
+            return errors
+
+        return validate
+
+    validator = jsonschema.validators.validator_for(schema)(schema)
+
+    def validate_with_jsonschema(instance: Any) -> List[str]:
+        return [
+            f"{'.'.join(str(p) for p in error.absolute_path) or '$'}: {error.message}"
+            for error in validator.iter_errors(instance)
+        ]
+
+    return validate_with_jsonschema
+
+
+_VALIDATORS: Dict[str, Tuple[Tuple[int, int], Validator]] = {}
+_VALIDATORS_LOCK = threading.Lock()
+
+
+def validator_for(schema_path: Path | str = SCHEMA_PATH) -> Validator:
+    """Return the compiled validator for ``schema_path`` (cached per process)."""
+    path = Path(schema_path).resolve()
+    st = path.stat()
+    stamp = (st.st_size, st.st_mtime_ns)
+    with _VALIDATORS_LOCK:
+        cached = _VALIDATORS.get(str(path))
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, compile_schema(json.loads(path.read_text(encoding="utf-8"))))
+            _VALIDATORS[str(path)] = cached
+        return cached[1]
+
+
+# -- lane paths -------------------------------------------------------------
+
+
+def sparse_patterns(allowed_paths: Sequence[str]) -> Tuple[str, ...]:
+    """Convert ``allowedPaths`` entries into anchored sparse-checkout patterns."""
+    patterns = []
+    for raw in allowed_paths:
+        entry = raw.strip()
+        negate = entry.startswith("!")
+        if negate:
+            entry = entry[1:]
+        if entry.startswith("./"):
+            entry = entry[2:]
+        entry = entry.lstrip("/")
+        if entry:
+            patterns.append(f"{'!' if negate else ''}/{entry}")
+    return tuple(patterns)
+
+
+@lru_cache(maxsize=256)
+def _pattern_regex(pattern: str) -> "re.Pattern[str]":
+    """Compile an anchored gitignore-style pattern (without its ``/``)."""
+    out, i, n = [], 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        at_segment = i == 0 or pattern[i - 1] == "/"
+        if at_segment and pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif at_segment and pattern.startswith("**", i) and i + 2 == n:
+            out.append(".*")
+            i += 2
+        elif c == "*":
+            out.append("[^/]*")
+            i += 1
+        elif c == "?":
+            out.append("[^/]")
+            i += 1
+        elif c == "[" and pattern.find("]", i + 2) != -1:
+            end = pattern.find("]", i + 2)
+            body = pattern[i + 1 : end].replace("\\", "\\\\")
+            out.append("[" + ("^" + body[1:] if body.startswith("!") else body) + "]")
+            i = end + 1
+        elif c == "\\" and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return re.compile("".join(out))
+
+
+def path_allowed(path: str, allowed_paths: Sequence[str]) -> bool:
+    """Return whether ``path`` falls inside the sparse checkout of ``allowed_paths``.
+
+    Entries are read exactly as :func:`sparse_patterns` hands them to
+    ``git sparse-checkout``: gitignore-style patterns anchored at the
+    repository root, where a matching directory includes everything
+    below it, a trailing ``/`` matches directories only and the last
+    matching ``!`` pattern wins. No entries means the whole tree.
+    """
+    patterns = sparse_patterns(allowed_paths)
+    if not patterns:
+        return True
+    parts = [p for p in Path(path).as_posix().split("/") if p not in ("", ".")]
+    prefixes = ["/".join(parts[: k + 1]) for k in range(len(parts))]
+    allowed = False
+    for pattern in patterns:
+        negate = pattern.startswith("!")
+        body = pattern[2:] if negate else pattern[1:]
+        dir_only = body.endswith("/")
+        regex = _pattern_regex(body.rstrip("/"))
+        candidates = prefixes[:-1] if dir_only else prefixes
+        if any(regex.fullmatch(candidate) for candidate in candidates):
+            allowed = not negate
+    return allowed
+
+
+# -- immutable config -------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class LaneConfig:
+    """A lane definition from the lanes config."""
+
+    name: str
+    branch_prefix: str
+    default_agent: Optional[str] = None
+    allowed_paths: Tuple[str, ...] = ()
+    priority: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, item: Mapping[str, Any]) -> "LaneConfig":
+        return cls(
+            name=item["name"],
+            branch_prefix=item.get("branchPrefix", ""),
+            default_agent=item.get("defaultAgent"),
+            allowed_paths=tuple(item.get("allowedPaths") or ()),
+            priority=item.get("priority"),
+        )
+
+    def allows(self, path: str) -> bool:
+        """Return whether ``path`` is inside this lane's ``allowedPaths``."""
+        return path_allowed(path, self.allowed_paths)
+
+
+@dataclass(frozen=True)
+class RoutingConfig:
+    default_agent: str = "auto"
+    max_task_cost: Optional[float] = None
+    offline_only: bool = False
+    quota_warn: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class TaskConfig:
+    label: str
+    command: str
+    args: Tuple[str, ...] = ()
+    lane: Optional[str] = None
+    max_cost: Optional[float] = None
+
+
+class LaneIndex:
+    """Lanes indexed by name and branch prefix.
+
+    ``lane_for`` does one dict lookup per distinct prefix length (longest
+    first), independent of the number of lanes.
+    """
+
+    __slots__ = ("by_name", "_by_prefix", "_prefix_lengths")
+
+    def __init__(self, lanes: Sequence[LaneConfig]) -> None:
+        self.by_name: Mapping[str, LaneConfig] = MappingProxyType({lane.name: lane for lane in lanes})
+        by_prefix: Dict[str, LaneConfig] = {}
+        for lane in lanes:
+            if lane.branch_prefix:
+                by_prefix.setdefault(lane.branch_prefix, lane)  # first definition wins
+        self._by_prefix: Mapping[str, LaneConfig] = MappingProxyType(by_prefix)
+        self._prefix_lengths = tuple(sorted({len(p) for p in by_prefix}, reverse=True))
+
+    def lane_for(self, branch: str) -> Optional[LaneConfig]:
+        """Return the lane a branch belongs to, by name or longest prefix."""
+        lane = self.by_name.get(branch)
+        if lane is not None:
+            return lane
+        for length in self._prefix_lengths:
+            if length <= len(branch):
+                lane = self._by_prefix.get(branch[:length])
+                if lane is not None:
+                    return lane
+        return None
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _service(agent: Optional[str]) -> Optional[str]:
+    if agent is None:
+        return None
+    return AGENT_SERVICES.get(agent, agent)
+
+
+@dataclass(frozen=True)
+class FrameworkConfig:
+    """One validated, immutable version of the framework config."""
+
+    routing: RoutingConfig = field(default_factory=RoutingConfig)
+    lanes: Tuple[LaneConfig, ...] = ()
+    tasks: Tuple[TaskConfig, ...] = ()
+    integrations: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
+    version: str = ""
+    source: Optional[str] = None
+    lane_index: LaneIndex = field(init=False, repr=False, compare=False)
+    tasks_by_label: Mapping[str, TaskConfig] = field(init=False, repr=False, compare=False)
+    _services_by_task: Mapping[str, Optional[str]] = field(init=False, repr=False, compare=False)
+    _services_by_lane: Mapping[str, Optional[str]] = field(init=False, repr=False, compare=False)
+    _lanes_by_task: Mapping[str, str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        index = LaneIndex(self.lanes)
+        default = _service(self.routing.default_agent)
+        by_lane = {
+            lane.name: _service(lane.default_agent) if lane.default_agent else default for lane in self.lanes
+        }
+        by_task = {
+            task.label: by_lane.get(task.lane, default) if task.lane else default for task in self.tasks
+        }
+        set_ = object.__setattr__  # frozen dataclass: indexes are set once here
+        set_(self, "lane_index", index)
+        set_(self, "tasks_by_label", MappingProxyType({task.label: task for task in self.tasks}))
+        set_(self, "_services_by_task", MappingProxyType(by_task))
+        set_(self, "_services_by_lane", MappingProxyType(by_lane))
+        set_(self, "_lanes_by_task", MappingProxyType({t.label: t.lane for t in self.tasks if t.lane}))
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any], version: str = "", source: Optional[str] = None) -> "FrameworkConfig":
+        routing = data.get("routing") or {}
+        return cls(
+            routing=RoutingConfig(
+                default_agent=routing.get("defaultAgent", "auto"),
+                max_task_cost=routing.get("maxTaskCost"),
+                offline_only=bool(routing.get("offlineOnly", False)),
+                quota_warn=routing.get("quotaWarn"),
+            ),
+            lanes=tuple(LaneConfig.from_dict(item) for item in data.get("lanes") or ()),
+            tasks=tuple(
+                TaskConfig(
+                    label=item["label"],
+                    command=item["command"],
+                    args=tuple(item.get("args") or ()),
+                    lane=item.get("lane"),
+                    max_cost=item.get("maxCost"),
+                )
+                for item in data.get("tasks") or ()
+            ),
+            integrations=_freeze(dict(data.get("integrations") or {})),
+            version=version,
+            source=source,
+        )
+
+    def lane_for(self, branch: str) -> Optional[LaneConfig]:
+        return self.lane_index.lane_for(branch)
+
+    def service_for(
+        self, task_label: Optional[str] = None, lane: Optional[str] = None, branch: Optional[str] = None
+    ) -> Optional[str]:
+        """Return the service a task routes to, or ``None`` for the router default.
+
+        ``offlineOnly`` routes everything to ``ollama``. Otherwise the task's
+        lane (by ``task_label``, ``lane`` name or ``branch``) picks the agent,
+        falling back to ``routing.defaultAgent``.
+        """
+        if self.routing.offline_only:
+            return "ollama"
+        if task_label is not None and task_label in self._services_by_task:
+            return self._services_by_task[task_label]
+        if lane not in self._services_by_lane and branch is not None:
+            found = self.lane_index.lane_for(branch)
+            lane = found.name if found else None
+        if lane is not None and lane in self._services_by_lane:
+            return self._services_by_lane[lane]
+        return _service(self.routing.default_agent)
+
+    def priority_for(
+        self, task_label: Optional[str] = None, lane: Optional[str] = None, branch: Optional[str] = None
+    ) -> Optional[str]:
+        """Return the scheduling class of the task's lane, or ``None`` if unset.
+
+        The lane is found as in :meth:`service_for`: by ``task_label``,
+        then ``lane`` name, then ``branch``.
+        """
+        if task_label is not None and task_label in self._lanes_by_task:
+            lane = self._lanes_by_task[task_label]
+        found = self.lane_index.by_name.get(lane) if lane is not None else None
+        if found is None and branch is not None:
+            found = self.lane_index.lane_for(branch)
+        return found.priority if found is not None else None
+
+
+# -- loading ------------------------------------------------------------------
+
+
+def read_config_data(path: Path | str) -> Any:
+    """Parse a YAML or JSON config file (YAML requires PyYAML)."""
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+    if path.suffix == ".json":
+        return json.loads(text)
+    try:
+        import yaml  # type: ignore
+    except ImportError as exc:  # pragma: no cover - depends on environment
+        raise RuntimeError(f"PyYAML is required to read {path}") from exc
+    return yaml.safe_load(text)
+
+
+def load_config(path: Path | str, schema_path: Optional[Path | str] = SCHEMA_PATH) -> FrameworkConfig:
+    """Read, validate and compile the config file at ``path``."""
+    path = Path(path)
+    try:
+        raw = path.read_bytes()
+        data = read_config_data(path)
+    except (OSError, ValueError) as exc:
+        raise ConfigError(f"cannot read {path}: {exc}") from exc
+    except Exception as exc:  # e.g. yaml.YAMLError
+        raise ConfigError(f"cannot parse {path}: {exc}") from exc
+    if data is None:
+        data = {}
+    if schema_path is not None:
+        errors = validator_for(schema_path)(data)
+        if errors:
+            raise ConfigError(f"invalid config {path}", errors)
+    if not isinstance(data, dict):
+        raise ConfigError(f"invalid config {path}", ["$: expected object"])
+    return FrameworkConfig.from_dict(data, version=hashlib.sha256(raw).hexdigest(), source=str(path))
+
+
+class ConfigStore:
+    """The current :class:`FrameworkConfig`, reloaded when its file changes."""
+
+    def __init__(
+        self,
+        path: Path | str,
+        schema_path: Optional[Path | str] = SCHEMA_PATH,
+        poll_interval: float = 2.0,
+    ) -> None:
+        self.path = Path(path)
+        self.schema_path = schema_path
+        self.poll_interval = poll_interval
+        self.last_error: Optional[ConfigError] = None
+        self._current = FrameworkConfig()
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._listeners: List[Callable[[FrameworkConfig], None]] = []
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if self.path.exists():
+            self.reload()
+
+    @property
+    def current(self) -> FrameworkConfig:
+        """The active config; a plain attribute read, safe from any thread."""
+        return self._current
+
+    def subscribe(self, listener: Callable[[FrameworkConfig], None]) -> None:
+        """Call ``listener(config)`` after every successful swap."""
+        self._listeners.append(listener)
+
+    def reload(self, force: bool = False) -> bool:
+        """Reload if the file changed; return ``True`` if a new version was swapped in.
+
+        Errors are kept in :attr:`last_error` (and the old version stays
+        active) so a bad edit never takes a running service down.
+        """
+        with self._reload_lock:
+            try:
+                st = os.stat(self.path)
+            except OSError:
+                return False
+            stamp = (st.st_size, st.st_mtime_ns)
+            if not force and stamp == self._stamp:
+                return False
+            try:
+                config = load_config(self.path, self.schema_path)
+            except ConfigError as exc:
+                self.last_error = exc
+                self._stamp = stamp  # do not re-parse the same bad file every poll
+                return False
+            self._stamp = stamp
+            self.last_error = None
+            if config.version == self._current.version and not force:
+                return False  # touched but unchanged
+            self._current = config
+        for listener in list(self._listeners):
+            try:
+                listener(config)
+            except Exception:  # a listener must not break reloading
+                pass
+        return True
+
+    def start(self) -> "ConfigStore":
+        """Poll the file in a daemon thread every ``poll_interval`` seconds."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._poll, name="config-watch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.poll_interval + 1)
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            self.reload()
+
+
+_SHARED: Dict[str, ConfigStore] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_store(path: Path | str, poll_interval: float = 2.0) -> ConfigStore:
+    """Return this process's started :class:`ConfigStore` for ``path``.
+
+    The engine, the router and the drop server all read the config
+    through it, so one watcher per file serves the whole process. The
+    file need not exist yet: until it does the default config is active,
+    and it is picked up once it appears.
+    """
+    key = os.path.abspath(path)
+    with _SHARED_LOCK:
+        store = _SHARED.get(key)
+        if store is None:
+            store = _SHARED[key] = ConfigStore(key, poll_interval=poll_interval).start()
+        return store
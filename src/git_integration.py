@@ -2,41 +2,395 @@
 
 The Git lane manager is responsible for creating isolated worktrees for
 each lane (branch) so that concurrent agent runs do not interfere
-with each other. This stub implementation creates a worktree directory
-under ``worktrees/`` and checks out the requested branch. In a real
-environment, error handling should be added and edge cases (e.g.,
-existing worktrees, branch divergence) must be considered.
+with each other. Worktrees live under ``worktrees/`` in the repository.
+
+Running ``git worktree add`` on a lane's critical path costs a full
+checkout of the tree, so the manager keeps a pool of pre-created
+worktrees instead. A lane is handed an idle worktree, which is switched
+to the lane's branch in place (``checkout -f`` plus ``clean``); since the
+pooled worktree already has a populated checkout, only the files that
+differ are rewritten. Released worktrees are detached and returned to
+the pool. The pool is capped at ``pool_size`` worktrees, a few idle ones
+are kept warm in the background, idle ones beyond that are evicted after
+``idle_timeout`` seconds, and stale worktree metadata is pruned.
+
+Each lane has its own lock, so concurrent callers for the same lane get
+the same worktree instead of racing to create two.
+
+Lane definitions are read from the lanes config (``lanes.yaml`` or JSON,
+see ``config.schema.json``). A branch belongs to the lane whose ``name``
+equals it or whose ``branchPrefix`` it starts with. When that lane lists
+``allowedPaths``, its worktree uses a sparse checkout limited to those
+paths, and pooled worktrees are created without a checkout, so creation
+time and disk usage follow the lane's scope rather than the repository
+size. With a ``clone_filter`` such as ``blob:none``, fetches (and
+:meth:`GitLaneManager.clone`) use partial clone, so blobs outside the
+checked-out scope are never downloaded.
+
+Given a :class:`~src.framework_config.ConfigStore`, lanes come from the
+store's current config instead, so edits to the config file take effect
+without restarting the manager.
 """
 
 from __future__ import annotations
 
+import shutil
 import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .framework_config import ConfigStore, LaneConfig, LaneIndex, read_config_data, sparse_patterns
+from .subprocess_runner import run
+
+POOL_PREFIX = "pool-"
+
+
+class WorktreePoolExhausted(RuntimeError):
+    """Raised when every worktree in the pool is assigned to a lane."""
+
+
+def load_lanes(path: Path | str) -> List[LaneConfig]:
+    """Read lane definitions from a YAML or JSON config file.
+
+    The file may contain the full framework config (with a top-level
+    ``lanes`` key) or just the list of lanes. YAML requires PyYAML.
+    """
+    data = read_config_data(path)
+    if isinstance(data, dict):
+        data = data.get("lanes") or []
+    return [LaneConfig.from_dict(item) for item in data or []]
+
+
+@dataclass
+class _Worktree:
+    path: Path
+    lane: Optional[str] = None
+    busy: bool = False
+    last_used: float = field(default_factory=time.monotonic)
+    # Current sparse patterns: () for a full checkout, None when unknown.
+    sparse: Optional[Tuple[str, ...]] = None
+
+    @property
+    def idle(self) -> bool:
+        return self.lane is None and not self.busy
 
 
 class GitLaneManager:
     """Manage Git worktrees for agent lanes."""
 
-    def __init__(self, repo_dir: Path | str) -> None:
+    def __init__(
+        self,
+        repo_dir: Path | str,
+        pool_size: int = 8,
+        warm: int = 1,
+        idle_timeout: float = 900.0,
+        base_branch: str = "main",
+        git_timeout: Optional[float] = 300.0,
+        lanes_config_path: Optional[Path | str] = None,
+        clone_filter: Optional[str] = None,
+        config: Optional[ConfigStore] = None,
+    ) -> None:
         self.repo_dir = Path(repo_dir)
         self.worktrees_dir = self.repo_dir / "worktrees"
         self.worktrees_dir.mkdir(exist_ok=True)
+        self.pool_size = pool_size
+        self.warm = warm
+        self.idle_timeout = idle_timeout
+        self.base_branch = base_branch
+        self.git_timeout = git_timeout
+        self.clone_filter = clone_filter
+        self.config = config
+        if config is None:
+            config_path = Path(lanes_config_path) if lanes_config_path else self.repo_dir / "lanes.yaml"
+            self._static_lanes = LaneIndex(load_lanes(config_path) if config_path.exists() else [])
+        self._lock = threading.Lock()
+        self._lane_locks: Dict[str, threading.Lock] = {}
+        self._worktrees: Dict[Path, _Worktree] = {}
+        self._lanes: Dict[str, _Worktree] = {}
+        self._warmer: Optional[threading.Thread] = None
+        self._prune_quietly()
+
+    # -- git helpers -----------------------------------------------------
+
+    def _git(self, *args: str, cwd: Optional[Path] = None, check: bool = True) -> str:
+        result = run(["git", *args], cwd=cwd or self.repo_dir, timeout=self.git_timeout)
+        if check:
+            result.check_returncode(self.git_timeout)
+        return result.stdout if result.returncode == 0 else ""
+
+    def _discover(self) -> None:
+        """Rebuild pool state from ``git worktree list``."""
+        root = self.worktrees_dir.resolve()
+        found: Dict[Path, _Worktree] = {}
+        path: Optional[Path] = None
+        branch: Optional[str] = None
+        for line in self._git("worktree", "list", "--porcelain").splitlines() + [""]:
+            if line.startswith("worktree "):
+                path, branch = Path(line[len("worktree ") :]).resolve(), None
+            elif line.startswith("branch refs/heads/"):
+                branch = line[len("branch refs/heads/") :]
+            elif not line and path is not None:
+                if path.parent == root:
+                    previous = self._worktrees.get(path)
+                    wt = previous or _Worktree(path)
+                    wt.lane = branch
+                    found[path] = wt
+                path = None
+        # Keep slots that are being created right now.
+        found.update({p: wt for p, wt in self._worktrees.items() if wt.busy and p not in found})
+        self._worktrees = found
+        self._lanes = {wt.lane: wt for wt in found.values() if wt.lane}
+
+    def prune(self) -> None:
+        """Drop metadata of deleted worktrees and leftover pool directories."""
+        with self._lock:
+            self._git("worktree", "prune")
+            self._discover()
+            for child in self.worktrees_dir.iterdir():
+                if child.name.startswith(POOL_PREFIX) and child.resolve() not in self._worktrees:
+                    shutil.rmtree(child, ignore_errors=True)
+
+    def _prune_quietly(self) -> None:
+        try:
+            self.prune()
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError):
+            pass  # e.g. not a repository yet; the first lane checkout reports real errors
+
+    # -- lanes, sparse checkout and partial clone -------------------------
+
+    @property
+    def _lane_index(self) -> LaneIndex:
+        return self.config.current.lane_index if self.config is not None else self._static_lanes
+
+    @property
+    def lanes(self) -> List[LaneConfig]:
+        return list(self._lane_index.by_name.values())
+
+    @property
+    def _scoped(self) -> bool:
+        # Without scoped lanes, pooled worktrees are pre-populated so that
+        # switching branches only rewrites the files that differ.
+        return any(lane.allowed_paths for lane in self._lane_index.by_name.values())
+
+    def lane_for(self, branch: str) -> Optional[LaneConfig]:
+        """Return the lane a branch belongs to, by name or longest prefix."""
+        return self._lane_index.lane_for(branch)
+
+    def _apply_sparse(self, wt: _Worktree, patterns: Tuple[str, ...]) -> None:
+        if wt.sparse == patterns:
+            return
+        if patterns:
+            self._git("sparse-checkout", "set", "--no-cone", *patterns, cwd=wt.path)
+        else:
+            self._git("sparse-checkout", "disable", cwd=wt.path)
+        wt.sparse = patterns
+
+    def fetch(self, remote: str = "origin", *refspecs: str) -> bool:
+        """Fetch from ``remote``, as a partial clone when ``clone_filter`` is set.
+
+        Returns ``False`` if the repository has no such remote.
+        """
+        if run(["git", "remote", "get-url", remote], cwd=self.repo_dir).returncode != 0:
+            return False
+        args = ["fetch", "-q"]
+        if self.clone_filter:
+            args.append(f"--filter={self.clone_filter}")
+        self._git(*args, remote, *refspecs)
+        return True
+
+    @classmethod
+    def clone(
+        cls,
+        url: str,
+        dest: Path | str,
+        clone_filter: Optional[str] = "blob:none",
+        sparse_paths: Sequence[str] = (),
+        **kwargs: Any,
+    ) -> "GitLaneManager":
+        """Clone ``url`` into ``dest`` and return a manager for it.
+
+        With ``clone_filter`` the clone is partial and blobs are fetched on
+        demand; with ``sparse_paths`` only those paths are checked out, so
+        only their blobs are ever downloaded.
+        """
+        args = ["git", "clone", "-q", "--no-checkout"]
+        if clone_filter:
+            args.append(f"--filter={clone_filter}")
+        run([*args, url, str(dest)], timeout=kwargs.get("git_timeout", 300.0), check=True)
+        patterns = sparse_patterns(sparse_paths)
+        if patterns:
+            run(["git", "sparse-checkout", "set", "--no-cone", *patterns], cwd=dest, check=True)
+        run(["git", "checkout", "-q", "-f", "HEAD"], cwd=dest, check=True)
+        return cls(dest, clone_filter=clone_filter, **kwargs)
+
+    # -- pool management -------------------------------------------------
+
+    def _lane_lock(self, lane_name: str) -> threading.Lock:
+        with self._lock:
+            return self._lane_locks.setdefault(lane_name, threading.Lock())
+
+    def _new_path(self) -> Path:
+        root = self.worktrees_dir.resolve()
+        n = 0
+        while root / f"{POOL_PREFIX}{n}" in self._worktrees or (root / f"{POOL_PREFIX}{n}").exists():
+            n += 1
+        return root / f"{POOL_PREFIX}{n}"
+
+    def _reserve(self) -> Optional[_Worktree]:
+        """Mark an idle worktree (or a new slot) busy; caller holds ``_lock``."""
+        idle = [wt for wt in self._worktrees.values() if wt.idle]
+        if idle:
+            wt = max(idle, key=lambda w: w.last_used)
+            wt.busy = True
+            return wt
+        if len(self._worktrees) < self.pool_size:
+            wt = _Worktree(self._new_path(), busy=True)
+            self._worktrees[wt.path] = wt
+            return wt
+        return None
+
+    def _materialise(self, wt: _Worktree) -> None:
+        if not wt.path.exists():
+            args = ["worktree", "add", "--detach"]
+            if self._scoped:
+                args.append("--no-checkout")
+            try:
+                self._git(*args, str(wt.path), "HEAD")
+                wt.sparse = None if self._scoped else ()
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+                with self._lock:
+                    self._worktrees.pop(wt.path, None)
+                raise
+
+    def warm_pool(self) -> int:
+        """Create idle worktrees until ``warm`` are ready; return how many were added."""
+        added = 0
+        while True:
+            with self._lock:
+                idle = sum(1 for wt in self._worktrees.values() if wt.idle)
+                if idle >= self.warm or len(self._worktrees) >= self.pool_size:
+                    return added
+                wt = _Worktree(self._new_path(), busy=True)
+                self._worktrees[wt.path] = wt
+            self._materialise(wt)
+            with self._lock:
+                wt.busy = False
+                wt.last_used = time.monotonic()
+            added += 1
+
+    def _warm_in_background(self) -> None:
+        with self._lock:
+            if self._warmer is not None and self._warmer.is_alive():
+                return
+            self._warmer = threading.Thread(target=self._warm_quietly, name="worktree-warmer", daemon=True)
+            self._warmer.start()
+
+    def _warm_quietly(self) -> None:
+        try:
+            self.warm_pool()
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError):
+            pass  # warming is best effort; lanes create worktrees on demand
+
+    def _switch(self, wt: _Worktree, lane_name: str) -> None:
+        """Check ``lane_name`` out in ``wt``, creating the branch if needed.
+
+        The sparse-checkout scope is applied first, so the checkout only
+        writes files inside the lane's ``allowedPaths``.
+        """
+        lane = self.lane_for(lane_name)
+        self._apply_sparse(wt, sparse_patterns(lane.allowed_paths) if lane else ())
+        # "--" keeps a lane named like a file from being read as a pathspec.
+        checkout = run(["git", "checkout", "-q", "-f", lane_name, "--"], cwd=wt.path, timeout=self.git_timeout)
+        if checkout.returncode != 0:
+            self._git("checkout", "-q", "-f", "-b", lane_name, self.base_branch, "--", cwd=wt.path)
+        self._git("clean", "-q", "-ffdx", cwd=wt.path)
 
     def create_lane_worktree(self, lane_name: str) -> Dict[str, str]:
-        """Create a worktree for ``lane_name`` and return its path.
+        """Return a worktree with ``lane_name`` checked out.
+
+        A lane that already holds a worktree gets the same one back.
+        Otherwise an idle pooled worktree is switched to the lane's branch
+        in place; the branch is created from ``base_branch`` if it does not
+        exist yet. Raises :class:`WorktreePoolExhausted` when all
+        ``pool_size`` worktrees are assigned to other lanes.
+        """
+        with self._lane_lock(lane_name):
+            with self._lock:
+                wt = self._lanes.get(lane_name)
+                if wt is not None and wt.path.exists():
+                    wt.last_used = time.monotonic()
+                    return {"path": str(wt.path)}
+                wt = self._reserve()
+            if wt is None:
+                self.evict_idle()
+                with self._lock:
+                    wt = self._reserve()
+                if wt is None:
+                    raise WorktreePoolExhausted(f"all {self.pool_size} worktrees are assigned to lanes")
+            try:
+                self._materialise(wt)
+                self._switch(wt, lane_name)
+            except BaseException:
+                with self._lock:
+                    wt.busy = False
+                raise
+            with self._lock:
+                wt.lane, wt.busy, wt.last_used = lane_name, False, time.monotonic()
+                self._lanes[lane_name] = wt
+        self._warm_in_background()
+        return {"path": str(wt.path)}
+
+    def release_lane(self, lane_name: str) -> bool:
+        """Detach and clean the lane's worktree and return it to the pool.
 
-        If the worktree already exists, it is reused. This implementation
-        assumes that ``git`` is installed and available in the PATH. It
-        checks out the lane starting from the default branch (``main``).
+        Uncommitted changes in the worktree are discarded. Returns ``False``
+        if the lane held no worktree.
         """
-        worktree_path = self.worktrees_dir / lane_name.replace("/", "-")
-        if worktree_path.exists():
-            return {"path": str(worktree_path)}
-        # Create the worktree by running `git worktree add`
-        subprocess.run(
-            ["git", "worktree", "add", str(worktree_path), lane_name],
-            cwd=self.repo_dir,
-            check=True,
-        )
-        return {"path": str(worktree_path)}
\ No newline at end of file
+        with self._lane_lock(lane_name):
+            with self._lock:
+                wt = self._lanes.pop(lane_name, None)
+                if wt is None:
+                    return False
+                wt.busy = True
+            try:
+                self._git("checkout", "-q", "-f", "--detach", cwd=wt.path)
+                self._git("clean", "-q", "-ffdx", cwd=wt.path)
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+                self._remove(wt)
+                return True
+            with self._lock:
+                wt.lane, wt.busy, wt.last_used = None, False, time.monotonic()
+        self.evict_idle()
+        return True
+
+    def _remove(self, wt: _Worktree) -> None:
+        self._git("worktree", "remove", "--force", str(wt.path), check=False)
+        shutil.rmtree(wt.path, ignore_errors=True)
+        with self._lock:
+            self._worktrees.pop(wt.path, None)
+
+    def evict_idle(self, now: Optional[float] = None) -> List[str]:
+        """Remove idle worktrees unused for ``idle_timeout`` beyond the warm set."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            idle = sorted((wt for wt in self._worktrees.values() if wt.idle), key=lambda w: w.last_used, reverse=True)
+            victims = [wt for wt in idle[self.warm :] if now - wt.last_used >= self.idle_timeout]
+            for wt in victims:
+                wt.busy = True
+        for wt in victims:
+            self._remove(wt)
+        return [str(wt.path) for wt in victims]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            idle = sum(1 for wt in self._worktrees.values() if wt.idle)
+            return {"total": len(self._worktrees), "idle": idle, "lanes": len(self._lanes)}
+
+    def close(self) -> None:
+        """Wait for background warming to finish."""
+        warmer = self._warmer
+        if warmer is not None:
+            warmer.join()
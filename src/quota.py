@@ -9,6 +9,7 @@ and survives restarts.
 
 from __future__ import annotations
 
+import threading
 from typing import Dict
 
 
@@ -22,6 +23,8 @@ class QuotaManager:
     def __init__(self, max_daily_cost: float) -> None:
         self.max_daily_cost = max_daily_cost
         self.current_cost: float = 0.0
+        # Check-and-add must be atomic when tasks run concurrently.
+        self._lock = threading.Lock()
 
     def check_quota(self, cost: float) -> None:
         """Ensure that adding ``cost`` does not exceed the daily quota.
@@ -29,11 +32,12 @@ class QuotaManager:
         If the quota would be exceeded, :class:`QuotaExceededError` is
         raised. Otherwise, the cost is added to the current usage.
         """
-        if self.current_cost + cost > self.max_daily_cost:
-            raise QuotaExceededError(
-                f"Quota exceeded: {self.current_cost + cost} > {self.max_daily_cost}"
-            )
-        self.current_cost += cost
+        with self._lock:
+            if self.current_cost + cost > self.max_daily_cost:
+                raise QuotaExceededError(
+                    f"Quota exceeded: {self.current_cost + cost} > {self.max_daily_cost}"
+                )
+            self.current_cost += cost
 
     def reset(self) -> None:
         """Reset the current usage to zero (e.g. at the start of a new day)."""
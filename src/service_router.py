@@ -5,49 +5,92 @@ client based on the task context. It supports simple strategies such
 as cost optimisation or explicit service selection. In this minimal
 implementation, the router always returns a default client. Extend
 ``select_client`` to incorporate more sophisticated logic.
+
+Client modules are imported only when a client is first created (and
+the client classes stay importable from here through module
+``__getattr__``), so importing the router does not load every backend.
+
+Tasks without an explicit ``service`` are routed by the ``task_label``,
+``lane`` or ``branch`` in their context, looked up in the precomputed
+indexes of the config held by a :class:`~src.framework_config.ConfigStore`,
+which by default is the process's shared store for
+``settings.framework_config_path``.
 """
 
 from __future__ import annotations
 
-from typing import Dict, Any
+import importlib
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .config import Settings
+    from .framework_config import ConfigStore
+
+DEFAULT_SERVICE = "anthropic"
+
+# service name -> (module, class)
+CLIENTS: Dict[str, Tuple[str, str]] = {
+    "anthropic": (".services.anthropic_client", "AnthropicClient"),
+    "gemini": (".services.gemini_client", "GeminiClient"),
+    "ollama": (".services.ollama_client", "OllamaClient"),
+    "aider": (".services.aider_client", "AiderClient"),
+}
+
 
-from .services.anthropic_client import AnthropicClient
-from .services.gemini_client import GeminiClient
-from .services.ollama_client import OllamaClient
-from .services.aider_client import AiderClient
-from .config import Settings
+def _client_class(service: str) -> Any:
+    module, name = CLIENTS[service]
+    return getattr(importlib.import_module(module, __package__), name)
+
+
+def __getattr__(name: str) -> Any:
+    for service, (_, class_name) in CLIENTS.items():
+        if class_name == name:
+            return _client_class(service)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class CostOptimizedServiceRouter:
     """Select a service client based on cost, availability or explicit hints."""
 
-    def __init__(self, settings: Settings) -> None:
+    def __init__(self, settings: Settings, config: Optional[ConfigStore] = None) -> None:
         self.settings = settings
+        if config is None:
+            from .framework_config import shared_store
+
+            config = shared_store(settings.framework_config_path, settings.framework_config_poll)
+        self.config = config
         # Instantiate clients lazily when first used to avoid unnecessary
         # connections during startup.
         self._clients: Dict[str, Any] = {}
 
     def _get_client(self, service: str):
         if service not in self._clients:
-            if service == "anthropic":
-                self._clients[service] = AnthropicClient(self.settings)
-            elif service == "gemini":
-                self._clients[service] = GeminiClient(self.settings)
-            elif service == "ollama":
-                self._clients[service] = OllamaClient(self.settings)
-            elif service == "aider":
-                self._clients[service] = AiderClient(self.settings)
-            else:
+            if service not in CLIENTS:
                 raise ValueError(f"Unknown service: {service}")
+            self._clients[service] = _client_class(service)(self.settings)
         return self._clients[service]
 
+    def service_for(self, task_context: Dict[str, Any]) -> str:
+        """Return the service name a task routes to.
+
+        An explicit ``service`` key wins. Otherwise the routing config (if
+        any) decides by task label, lane or branch, and Anthropic is the
+        fallback.
+        """
+        service = task_context.get("service")
+        if service:
+            return service
+        if self.config is not None:
+            service = self.config.current.service_for(
+                task_context.get("task_label"), task_context.get("lane"), task_context.get("branch")
+            )
+        return service or DEFAULT_SERVICE
+
     def select_client(self, task_context: Dict[str, Any]):
         """Return the appropriate client for the given task context.
 
-        The task context may include an explicit ``service`` key. If
-        omitted, Anthropic is used as the default. Future implementations
-        could inspect cost estimates, model capabilities or quotas to
-        decide.
+        See :meth:`service_for` for how the service is chosen. Future
+        implementations could inspect cost estimates, model capabilities
+        or quotas to decide.
         """
-        service = task_context.get("service", "anthropic")
-        return self._get_client(service)
\ No newline at end of file
+        return self._get_client(self.service_for(task_context))
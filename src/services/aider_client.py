@@ -1,42 +1,70 @@
 """Aider service client.
 
-Aider is a local CLI tool for code editing and transformation. This stub
-client demonstrates how you might integrate with the aider CLI via a
-subprocess call. The actual aider tool must be installed on the host
-machine. When implementing the real version, capture stdout/stderr and
-return structured results to the workflow engine.
+Aider is a local CLI tool for code editing and transformation. Rather than
+spawning a new aider process for every task, this client dispatches tasks
+to a pool of long-lived aider workers (see :mod:`src.services.aider_pool`),
+one per lane or worktree, so that interpreter startup, model setup and
+repository scanning are amortised across tasks. The actual aider package
+must be installed in the worker interpreter; otherwise workers fall back
+to echoing the command back.
 """
 
 from __future__ import annotations
 
-import subprocess
-from typing import Any, Dict
+import threading
+from typing import Any, Dict, Optional
 
+from .aider_pool import AiderWorkerError, AiderWorkerPool
 from .base_client import BaseServiceClient
 
 
 class AiderClient(BaseServiceClient):
-    """Concrete client for interacting with the aider CLI tool."""
+    """Concrete client for interacting with aider through a worker pool."""
+
+    def __init__(self, settings: Any) -> None:
+        super().__init__(settings)
+        self._pool: Optional[AiderWorkerPool] = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def pool(self) -> AiderWorkerPool:
+        """Return the worker pool, creating it on first use."""
+        with self._pool_lock:
+            if self._pool is None:
+                max_rss_mb = self.settings.aider_worker_max_rss_mb
+                self._pool = AiderWorkerPool(
+                    max_workers=self.settings.aider_pool_size,
+                    max_tasks_per_worker=self.settings.aider_worker_max_tasks,
+                    max_memory_bytes=max_rss_mb * 1024 * 1024 if max_rss_mb else None,
+                    python=self.settings.aider_worker_python or None,
+                )
+            return self._pool
 
     def execute_task(self, task_context: Dict[str, Any]) -> Dict[str, Any]:
         command: str = task_context.get("command", "")
-        # TODO: In a real implementation, build the aider CLI command from the
-        # task_context and invoke it via subprocess.run. Capture the output
-        # and convert it into a structured result.
+        worktree = task_context.get("worktree")
+        # Workers are keyed by worktree (or lane) so each one keeps the repo
+        # state for a single checkout warm.
+        key = str(worktree or task_context.get("lane") or "default")
+        payload = {
+            "message": command or task_context.get("prompt", ""),
+            "files": list(task_context.get("files", [])),
+            "model": task_context.get("model"),
+            "cwd": str(worktree) if worktree else None,
+        }
         try:
-            # For demonstration, we simply echo the command back. Do not
-            # actually execute arbitrary shell commands in production without
-            # proper sanitisation and security checks.
-            result = subprocess.run(
-                ["echo", f"[Aider stub] {command}"],
-                capture_output=True,
-                text=True,
-                check=True,
+            response = self.pool.execute(
+                key,
+                payload,
+                cwd=worktree,
+                timeout=self.settings.aider_task_timeout,
             )
-            return {
-                "status": "success",
-                "result": result.stdout.strip(),
-                "cost": 0.0,
-            }
-        except subprocess.CalledProcessError as exc:
-            raise RuntimeError(f"Aider execution failed: {exc}") from exc
\ No newline at end of file
+        except AiderWorkerError as exc:
+            raise RuntimeError(f"Aider execution failed: {exc}") from exc
+        if not response.get("ok"):
+            raise RuntimeError(f"Aider execution failed: {response.get('error')}")
+        return {
+            "status": "success",
+            "result": str(response.get("result", "")).strip(),
+            "cost": float(response.get("cost", 0.0)),
+        }
@@ -0,0 +1,296 @@
+"""Pool of persistent aider worker processes.
+
+Spawning aider for every task pays interpreter startup, model setup and
+repository scanning each time. The pool keeps long-lived workers (see
+:mod:`src.services.aider_worker`) keyed by lane or worktree and talks to
+them over a framed stdin/stdout protocol, so per-task overhead is reduced
+to a round trip over a pipe.
+
+Workers idle for longer than ``ping_idle_after`` seconds are pinged before
+reuse (a hung worker is replaced instead of eating the task's timeout),
+and workers are recycled after a configurable
+number of tasks or when their resident memory exceeds a limit. A
+semaphore caps the number of tasks executing concurrently, and the total
+number of live worker processes never exceeds the same cap.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from .aider_worker import read_frame, write_frame
+
+WORKER_SCRIPT = Path(__file__).with_name("aider_worker.py")
+
+
+class AiderWorkerError(RuntimeError):
+    """Raised when a worker dies, times out or violates the protocol."""
+
+
+class AiderWorker:
+    """A single long-lived aider worker process."""
+
+    def __init__(self, command: Sequence[str], cwd: Optional[Path] = None) -> None:
+        self.cwd = cwd
+        self.process = subprocess.Popen(
+            list(command),
+            cwd=cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self.tasks_completed = 0
+        self.last_used = time.monotonic()
+        self._responses: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        # A reader thread turns the blocking pipe into a queue so requests
+        # can time out portably (``select`` does not work on Windows pipes).
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def _read_loop(self) -> None:
+        assert self.process.stdout is not None
+        try:
+            while True:
+                frame = read_frame(self.process.stdout)
+                self._responses.put(frame)
+                if frame is None:
+                    return
+        except Exception:
+            self._responses.put(None)
+
+    def is_alive(self) -> bool:
+        # Once the reader has seen end-of-stream the worker can no longer
+        # answer, even if the process has not been reaped yet.
+        return self.process.poll() is None and self._reader.is_alive()
+
+    def request(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Send ``payload`` and wait up to ``timeout`` seconds for the reply."""
+        if not self.is_alive():
+            raise AiderWorkerError(f"Worker {self.pid} is not running")
+        assert self.process.stdin is not None
+        try:
+            write_frame(self.process.stdin, payload)
+        except (BrokenPipeError, OSError) as exc:
+            raise AiderWorkerError(f"Worker {self.pid} pipe closed") from exc
+        try:
+            response = self._responses.get(timeout=timeout)
+        except queue.Empty as exc:
+            raise AiderWorkerError(f"Worker {self.pid} timed out after {timeout}s") from exc
+        if response is None:
+            raise AiderWorkerError(f"Worker {self.pid} exited unexpectedly")
+        self.last_used = time.monotonic()
+        return response
+
+    def ping(self, timeout: float = 5.0) -> bool:
+        """Return ``True`` if the worker answers a ping within ``timeout``."""
+        try:
+            return bool(self.request({"op": "ping"}, timeout=timeout).get("ok"))
+        except AiderWorkerError:
+            return False
+
+    def rss_bytes(self) -> Optional[int]:
+        """Return the worker's resident set size, or ``None`` if unknown."""
+        try:
+            with open(f"/proc/{self.pid}/statm", "r", encoding="ascii") as f:
+                resident_pages = int(f.read().split()[1])
+        except (OSError, ValueError, IndexError):
+            return None
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Ask the worker to exit, killing it if it does not comply."""
+        if self.is_alive():
+            try:
+                self.request({"op": "shutdown"}, timeout=timeout)
+            except AiderWorkerError:
+                pass
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout):
+            if stream is not None:
+                stream.close()
+
+
+class AiderWorkerPool:
+    """Hand out persistent aider workers per lane or worktree.
+
+    Parameters
+    ----------
+    max_workers:
+        Maximum number of concurrently executing tasks and live processes.
+    max_tasks_per_worker:
+        Recycle a worker after it has served this many tasks (0 disables).
+    max_memory_bytes:
+        Recycle a worker whose resident memory exceeds this many bytes.
+    command:
+        Command used to start a worker. Defaults to running
+        :mod:`src.services.aider_worker` with ``python``.
+    ping_idle_after:
+        Ping a worker idle for at least this many seconds before reusing
+        it (0 pings before every task).
+    ping_timeout:
+        Seconds a worker has to answer that ping.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_tasks_per_worker: int = 50,
+        max_memory_bytes: Optional[int] = None,
+        command: Optional[Sequence[str]] = None,
+        python: Optional[str] = None,
+        ping_idle_after: float = 30.0,
+        ping_timeout: float = 5.0,
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.max_memory_bytes = max_memory_bytes
+        self.command = list(command) if command else [python or sys.executable, str(WORKER_SCRIPT)]
+        self.ping_idle_after = ping_idle_after
+        self.ping_timeout = ping_timeout
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._lock = threading.Lock()
+        self._idle: Dict[str, List[AiderWorker]] = {}
+        self._live = 0
+        self._closed = False
+
+    def execute(
+        self,
+        key: str,
+        payload: Dict[str, Any],
+        cwd: Optional[Path | str] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Run ``payload`` on a worker bound to ``key`` and return its reply.
+
+        A worker that fails or times out is discarded so the next task gets
+        a fresh process.
+        """
+        with self._slots:
+            worker = self._checkout(key, Path(cwd) if cwd else None)
+            try:
+                response = worker.request({"op": "task", **payload}, timeout=timeout)
+            except AiderWorkerError:
+                self._discard(worker)
+                raise
+            worker.tasks_completed += 1
+            self._checkin(key, worker)
+            return response
+
+    def _checkout(self, key: str, cwd: Optional[Path]) -> AiderWorker:
+        evicted = None
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise AiderWorkerError("Pool has been shut down")
+                idle = self._idle.get(key, [])
+                worker = idle.pop() if idle else None
+                if worker is None:
+                    if self._live >= self.max_workers:
+                        evicted = self._evict_one_idle()
+                    self._live += 1
+                    break
+            # Pinged outside the lock: other lanes need not wait for it.
+            if self._healthy(worker):
+                return worker
+            self._discard(worker, timeout=0)
+        if evicted is not None:
+            evicted.close()  # outside the lock too: closing can take seconds
+        try:
+            return AiderWorker(self.command, cwd=cwd)
+        except Exception:
+            with self._lock:
+                self._live -= 1
+            raise
+
+    def _healthy(self, worker: AiderWorker) -> bool:
+        if not worker.is_alive():
+            return False
+        if time.monotonic() - worker.last_used < self.ping_idle_after:
+            return True
+        return worker.ping(timeout=self.ping_timeout)
+
+    def _evict_one_idle(self) -> Optional[AiderWorker]:
+        """Remove the least recently used idle worker (lock must be held).
+
+        The caller closes the returned worker after releasing the lock.
+        """
+        candidates = [(w.last_used, k, w) for k, ws in self._idle.items() for w in ws]
+        if not candidates:
+            return None
+        _, key, worker = min(candidates, key=lambda item: item[0])
+        self._idle[key].remove(worker)
+        self._live -= 1
+        return worker
+
+    def _should_recycle(self, worker: AiderWorker) -> bool:
+        if not worker.is_alive():
+            return True
+        if self.max_tasks_per_worker and worker.tasks_completed >= self.max_tasks_per_worker:
+            return True
+        if self.max_memory_bytes:
+            rss = worker.rss_bytes()
+            if rss is not None and rss > self.max_memory_bytes:
+                return True
+        return False
+
+    def _checkin(self, key: str, worker: AiderWorker) -> None:
+        if self._should_recycle(worker):
+            self._discard(worker)
+            return
+        with self._lock:
+            if not self._closed:
+                self._idle.setdefault(key, []).append(worker)
+                return
+        self._discard(worker)
+
+    def _discard(self, worker: AiderWorker, timeout: float = 2.0) -> None:
+        with self._lock:
+            self._live -= 1
+        worker.close(timeout=timeout)
+
+    def health_check(self, timeout: float = 5.0) -> Dict[str, Any]:
+        """Ping idle workers, drop unresponsive ones and return pool stats."""
+        with self._lock:
+            idle = [(k, w) for k, ws in self._idle.items() for w in ws]
+            self._idle = {}
+        removed = 0
+        for key, worker in idle:
+            if worker.ping(timeout=timeout) and not self._should_recycle(worker):
+                self._checkin(key, worker)
+            else:
+                self._discard(worker)
+                removed += 1
+        return {**self.stats(), "removed": removed}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "live_workers": self._live,
+                "idle_workers": sum(len(ws) for ws in self._idle.values()),
+                "max_workers": self.max_workers,
+            }
+
+    def shutdown(self) -> None:
+        """Stop all idle workers; busy workers are stopped on check-in."""
+        with self._lock:
+            self._closed = True
+            idle = [w for ws in self._idle.values() for w in ws]
+            self._idle = {}
+            self._live -= len(idle)
+        for worker in idle:
+            worker.close()
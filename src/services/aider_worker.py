@@ -0,0 +1,132 @@
+"""Long-lived aider worker process.
+
+This script is spawned by :class:`~src.services.aider_pool.AiderWorkerPool`
+and serves aider requests over its stdin/stdout using a simple framed
+protocol: every message is a 4-byte big-endian length followed by a UTF-8
+encoded JSON object. Keeping the process alive means interpreter startup,
+model setup and repository scanning are paid once per worker rather than
+once per task.
+
+The module only depends on the standard library so that it can be executed
+directly by path (``python aider_worker.py``) from any working directory.
+If aider's Python API cannot be imported the worker falls back to the same
+echo behaviour as the original stub client.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import struct
+import sys
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+_HEADER = struct.Struct(">I")
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+
+def write_frame(stream: BinaryIO, payload: Dict[str, Any]) -> None:
+    """Serialise ``payload`` as a length-prefixed JSON frame and flush it."""
+    body = json.dumps(payload).encode("utf-8")
+    stream.write(_HEADER.pack(len(body)) + body)
+    stream.flush()
+
+
+def _read_exact(stream: BinaryIO, size: int) -> Optional[bytes]:
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = stream.read(remaining)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def read_frame(stream: BinaryIO) -> Optional[Dict[str, Any]]:
+    """Read one frame from ``stream``; return ``None`` on end of stream."""
+    header = _read_exact(stream, _HEADER.size)
+    if header is None:
+        return None
+    (size,) = _HEADER.unpack(header)
+    if size > MAX_FRAME_BYTES:
+        raise ValueError(f"Frame of {size} bytes exceeds limit")
+    body = _read_exact(stream, size)
+    if body is None:
+        return None
+    return json.loads(body.decode("utf-8"))
+
+
+class _AiderSession:
+    """Cache aider coders so repeated tasks reuse model and repo state."""
+
+    def __init__(self) -> None:
+        self._coders: Dict[Tuple[str, Tuple[str, ...]], Any] = {}
+        try:
+            from aider.coders import Coder  # type: ignore
+            from aider.io import InputOutput  # type: ignore
+            from aider.models import Model  # type: ignore
+        except ImportError:
+            self._api = None
+        else:
+            self._api = (Coder, InputOutput, Model)
+
+    def run(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        message = request.get("message", "")
+        if self._api is None:
+            return {"ok": True, "result": f"[Aider stub] {message}", "cost": 0.0}
+        Coder, InputOutput, Model = self._api
+        cwd = request.get("cwd")
+        if cwd:
+            os.chdir(cwd)
+        model_name = request.get("model") or "gpt-4o-mini"
+        files = tuple(request.get("files") or ())
+        key = (model_name, files)
+        coder = self._coders.get(key)
+        if coder is None:
+            coder = Coder.create(
+                main_model=Model(model_name),
+                fnames=list(files),
+                io=InputOutput(yes=True, pretty=False),
+            )
+            self._coders[key] = coder
+        cost_before = getattr(coder, "total_cost", 0.0)
+        result = coder.run(message)
+        return {
+            "ok": True,
+            "result": result or "",
+            "cost": getattr(coder, "total_cost", 0.0) - cost_before,
+        }
+
+
+def main() -> int:
+    # Frames travel over the original stdout; anything aider prints goes to
+    # stderr so it cannot corrupt the protocol stream.
+    channel = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+    requests_in = sys.stdin.buffer
+
+    session = _AiderSession()
+    while True:
+        request = read_frame(requests_in)
+        if request is None:
+            return 0
+        op = request.get("op")
+        if op == "ping":
+            write_frame(channel, {"ok": True, "pid": os.getpid()})
+        elif op == "shutdown":
+            write_frame(channel, {"ok": True})
+            return 0
+        elif op == "task":
+            try:
+                write_frame(channel, session.run(request))
+            except Exception as exc:  # report and keep serving
+                write_frame(channel, {"ok": False, "error": f"{type(exc).__name__}: {exc}"})
+        else:
+            write_frame(channel, {"ok": False, "error": f"Unknown op: {op}"})
+
+
+if __name__ == "__main__":  # pragma: no cover - exercised via subprocess
+    sys.exit(main())
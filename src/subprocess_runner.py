@@ -0,0 +1,355 @@
+"""Streaming, memory-bounded subprocess execution.
+
+``subprocess.run(capture_output=True)`` buffers the complete stdout and
+stderr of a child process and shows nothing until it exits, so a runaway
+test run or a huge ``git diff`` can exhaust worker memory. This module
+provides a shared runner used by the tools and the drop server which:
+
+* streams output line by line to optional callbacks (or, via
+  :func:`stream`, to an async iterator);
+* keeps only a bounded head and tail of each stream in memory;
+* enforces timeouts by killing the child's whole process group, and
+  stops reading after :data:`PUMP_JOIN_TIMEOUT` seconds if a grandchild
+  that left the group still holds the output pipes open;
+* records per-command timing metrics in :data:`METRICS`.
+"""
+
+from __future__ import annotations
+
+import codecs
+import io
+import os
+import select
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import IO, AsyncIterator, Callable, Deque, Dict, List, Mapping, Optional, Sequence, Tuple
+
+LineCallback = Callable[[str], None]
+
+DEFAULT_MAX_OUTPUT_BYTES = 1024 * 1024
+_MAX_LINE_CHARS = 64 * 1024
+# Seconds to keep reading after the child exited; a grandchild that
+# escaped the process group can hold the pipes open indefinitely.
+PUMP_JOIN_TIMEOUT = 5.0
+_PUMP_POLL = 0.1
+
+
+class BoundedBuffer:
+    """Keep the first and last lines of a stream within a byte budget.
+
+    Half of ``max_bytes`` is reserved for the head of the stream and half
+    for a ring buffer holding the tail. Everything in between is counted
+    but discarded.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_OUTPUT_BYTES) -> None:
+        self.head_limit = max_bytes // 2
+        self.tail_limit = max_bytes - self.head_limit
+        self._head: List[str] = []
+        self._head_size = 0
+        self._tail: Deque[str] = deque()
+        self._tail_size = 0
+        self.total_bytes = 0
+        self.dropped_bytes = 0
+
+    def append(self, line: str) -> None:
+        size = len(line)
+        self.total_bytes += size
+        if not self._tail and self._head_size + size <= self.head_limit:
+            self._head.append(line)
+            self._head_size += size
+            return
+        self._tail.append(line)
+        self._tail_size += size
+        while self._tail and self._tail_size > self.tail_limit:
+            dropped = self._tail.popleft()
+            self._tail_size -= len(dropped)
+            self.dropped_bytes += len(dropped)
+
+    @property
+    def truncated(self) -> bool:
+        return self.dropped_bytes > 0
+
+    def getvalue(self) -> str:
+        head = "".join(self._head)
+        tail = "".join(self._tail)
+        if not self.truncated:
+            return head + tail
+        return f"{head}\n... [{self.dropped_bytes} bytes truncated] ...\n{tail}"
+
+
+@dataclass
+class ProcessResult:
+    """Outcome of a command executed through :func:`run`."""
+
+    args: List[str]
+    returncode: int
+    stdout: str
+    stderr: str
+    duration: float
+    timed_out: bool = False
+    stdout_truncated: bool = False
+    stderr_truncated: bool = False
+
+    def check_returncode(self, timeout: Optional[float] = None) -> None:
+        """Raise the same exceptions ``subprocess.run(check=True)`` would."""
+        if self.timed_out:
+            raise subprocess.TimeoutExpired(self.args, timeout or self.duration, self.stdout, self.stderr)
+        if self.returncode != 0:
+            raise subprocess.CalledProcessError(self.returncode, self.args, self.stdout, self.stderr)
+
+
+@dataclass
+class CommandStats:
+    """Aggregated timing for one command name."""
+
+    count: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+
+@dataclass
+class RunnerMetrics:
+    """Thread-safe timing metrics keyed by command name (e.g. ``git status``)."""
+
+    _stats: Dict[str, CommandStats] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @staticmethod
+    def command_name(args: Sequence[str]) -> str:
+        program = os.path.basename(args[0]) if args else ""
+        sub = next((a for a in args[1:] if not a.startswith("-")), None)
+        return f"{program} {sub}" if sub and program in ("git", "python", "pytest") else program
+
+    def record(self, args: Sequence[str], duration: float, returncode: int, timed_out: bool) -> None:
+        name = self.command_name(args)
+        with self._lock:
+            stats = self._stats.setdefault(name, CommandStats())
+            stats.count += 1
+            stats.total_seconds += duration
+            stats.max_seconds = max(stats.max_seconds, duration)
+            if timed_out:
+                stats.timeouts += 1
+            elif returncode != 0:
+                stats.failures += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {name: dict(vars(stats)) for name, stats in self._stats.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+METRICS = RunnerMetrics()
+
+
+def _popen_group_kwargs() -> Dict[str, object]:
+    if sys.platform == "win32":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}  # type: ignore[attr-defined]
+    return {"start_new_session": True}
+
+
+def _kill_group(pid: int) -> None:
+    """Kill the process group led by ``pid`` (or just the process on Windows)."""
+    if sys.platform == "win32":
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(pid)], capture_output=True)
+        return
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _pump(stream: IO[str], buffer: BoundedBuffer, callback: Optional[LineCallback], stop: threading.Event) -> None:
+    def emit(line: str) -> None:
+        # Like readline(_MAX_LINE_CHARS): a newline-free blob is handed
+        # on in bounded pieces rather than accumulated in full.
+        for i in range(0, len(line), _MAX_LINE_CHARS):
+            piece = line[i : i + _MAX_LINE_CHARS]
+            buffer.append(piece)
+            if callback is not None:
+                callback(piece)
+
+    try:
+        if sys.platform == "win32":  # select() does not support pipes there
+            for line in iter(lambda: stream.readline(_MAX_LINE_CHARS), ""):
+                emit(line)
+            return
+        # Read the descriptor directly so the pump notices ``stop`` even
+        # while the pipe stays open but silent.
+        fd = stream.fileno()
+        decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")("replace"), translate=True)
+        pending = ""
+        while not stop.is_set():
+            if not select.select([fd], [], [], _PUMP_POLL)[0]:
+                continue
+            data = os.read(fd, 65536)
+            pending += decoder.decode(data, final=not data)
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                emit(line + "\n")
+            if len(pending) >= _MAX_LINE_CHARS:
+                cut = len(pending) - len(pending) % _MAX_LINE_CHARS
+                emit(pending[:cut])
+                pending = pending[cut:]
+            if not data:
+                break
+        if pending:
+            emit(pending)
+    finally:
+        stream.close()
+
+
+def run(
+    args: Sequence[str],
+    cwd: Optional[os.PathLike | str] = None,
+    *,
+    timeout: Optional[float] = None,
+    check: bool = False,
+    env: Optional[Mapping[str, str]] = None,
+    on_stdout: Optional[LineCallback] = None,
+    on_stderr: Optional[LineCallback] = None,
+    max_output_bytes: int = DEFAULT_MAX_OUTPUT_BYTES,
+) -> ProcessResult:
+    """Run ``args`` and stream its output while keeping memory bounded.
+
+    Each line of stdout/stderr is passed to ``on_stdout``/``on_stderr`` as
+    soon as it is read. Only ``max_output_bytes`` of each stream (split
+    between head and tail) are retained on the result. When ``timeout``
+    elapses the whole process group is killed and the result is marked as
+    timed out. With ``check=True`` a non-zero exit raises
+    :class:`subprocess.CalledProcessError` and a timeout raises
+    :class:`subprocess.TimeoutExpired`, mirroring ``subprocess.run``.
+    """
+    argv = [str(a) for a in args]
+    start = time.monotonic()
+    process = subprocess.Popen(
+        argv,
+        cwd=cwd,
+        env=dict(env) if env is not None else None,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+        **_popen_group_kwargs(),  # type: ignore[arg-type]
+    )
+    out_buf = BoundedBuffer(max_output_bytes)
+    err_buf = BoundedBuffer(max_output_bytes)
+    stop = threading.Event()
+    pumps = [
+        threading.Thread(target=_pump, args=(process.stdout, out_buf, on_stdout, stop), daemon=True),
+        threading.Thread(target=_pump, args=(process.stderr, err_buf, on_stderr, stop), daemon=True),
+    ]
+    for pump in pumps:
+        pump.start()
+
+    timed_out = False
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        _kill_group(process.pid)
+        process.wait()
+    finally:
+        if process.poll() is None:  # interrupted (e.g. KeyboardInterrupt)
+            _kill_group(process.pid)
+            process.wait()
+    deadline = time.monotonic() + PUMP_JOIN_TIMEOUT
+    for pump in pumps:
+        pump.join(max(0.0, deadline - time.monotonic()))
+    if any(pump.is_alive() for pump in pumps):
+        stop.set()  # the pumps close the pipes on their way out
+        for pump in pumps:
+            pump.join(_PUMP_POLL * 5)
+
+    duration = time.monotonic() - start
+    METRICS.record(argv, duration, process.returncode, timed_out)
+    result = ProcessResult(
+        args=argv,
+        returncode=process.returncode,
+        stdout=out_buf.getvalue(),
+        stderr=err_buf.getvalue(),
+        duration=duration,
+        timed_out=timed_out,
+        stdout_truncated=out_buf.truncated,
+        stderr_truncated=err_buf.truncated,
+    )
+    if check:
+        result.check_returncode(timeout)
+    return result
+
+
+async def stream(
+    args: Sequence[str],
+    cwd: Optional[os.PathLike | str] = None,
+    *,
+    timeout: Optional[float] = None,
+    env: Optional[Mapping[str, str]] = None,
+) -> AsyncIterator[Tuple[str, str]]:
+    """Yield ``(stream_name, line)`` pairs from a child process as they arrive.
+
+    ``stream_name`` is ``"stdout"`` or ``"stderr"``. Once both streams are
+    exhausted a final ``("exit", "<returncode>")`` pair is yielded. If the
+    process outlives ``timeout`` its process group is killed and
+    :class:`asyncio.TimeoutError` is raised.
+    """
+    import asyncio  # only async callers pay for it
+
+    argv = [str(a) for a in args]
+    start = time.monotonic()
+    process = await asyncio.create_subprocess_exec(
+        *argv,
+        cwd=cwd,
+        env=dict(env) if env is not None else None,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        **_popen_group_kwargs(),  # type: ignore[arg-type]
+    )
+    lines: "asyncio.Queue[Optional[Tuple[str, str]]]" = asyncio.Queue()
+
+    async def pump(name: str, reader: asyncio.StreamReader) -> None:
+        async for raw in reader:
+            await lines.put((name, raw.decode("utf-8", errors="replace")))
+        await lines.put(None)
+
+    assert process.stdout is not None and process.stderr is not None
+    tasks = [
+        asyncio.ensure_future(pump("stdout", process.stdout)),
+        asyncio.ensure_future(pump("stderr", process.stderr)),
+    ]
+    deadline = None if timeout is None else start + timeout
+    open_streams = len(tasks)
+    timed_out = False
+    try:
+        while open_streams:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = await asyncio.wait_for(lines.get(), remaining)
+            except asyncio.TimeoutError:
+                timed_out = True
+                raise
+            if item is None:
+                open_streams -= 1
+                continue
+            yield item
+        await process.wait()
+        yield ("exit", str(process.returncode))
+    finally:
+        if process.returncode is None:
+            _kill_group(process.pid)
+            await process.wait()
+        for task in tasks:
+            task.cancel()
+        METRICS.record(argv, time.monotonic() - start, process.returncode or 0, timed_out)
@@ -6,24 +6,51 @@ searching, document reading, file analysis or running tests. Tools
 provide a common ``run`` method which accepts structured parameters and
 returns a result. Having a unified interface simplifies wiring tools
 into agents and allows the router to treat them uniformly.
+
+Tools are imported on first attribute access (PEP 562), so
+``from src.tools import FileSystemTool`` does not pay for ``requests``
+or the other tools' dependencies.
 """
 
-from .web_search import WebSearchTool  # noqa: F401
-from .doc_reader import DocumentReaderTool  # noqa: F401
-from .file_analyzer import FileAnalyzerTool  # noqa: F401
-from .code_analyzer import CodeAnalyzerTool  # noqa: F401
-from .git_tool import GitTool  # noqa: F401
-from .testing_tool import TestingTool  # noqa: F401
-from .github_api import GitHubAPITool  # noqa: F401
-from .fs import FileSystemTool  # noqa: F401
-
-__all__ = [
-    "WebSearchTool",
-    "DocumentReaderTool",
-    "FileAnalyzerTool",
-    "CodeAnalyzerTool",
-    "GitTool",
-    "TestingTool",
-    "GitHubAPITool",
-    "FileSystemTool",
-]
\ No newline at end of file
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+_LAZY = {
+    "WebSearchTool": ".web_search",
+    "DocumentReaderTool": ".doc_reader",
+    "FileAnalyzerTool": ".file_analyzer",
+    "CodeAnalyzerTool": ".code_analyzer",
+    "GitTool": ".git_tool",
+    "TestingTool": ".testing_tool",
+    "GitHubAPITool": ".github_api",
+    "FileSystemTool": ".fs",
+    "CodeSearchTool": ".code_search",
+}
+
+__all__ = list(_LAZY)
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .code_analyzer import CodeAnalyzerTool
+    from .code_search import CodeSearchTool
+    from .doc_reader import DocumentReaderTool
+    from .file_analyzer import FileAnalyzerTool
+    from .fs import FileSystemTool
+    from .git_tool import GitTool
+    from .github_api import GitHubAPITool
+    from .testing_tool import TestingTool
+    from .web_search import WebSearchTool
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
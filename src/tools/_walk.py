@@ -0,0 +1,187 @@
+"""Shared directory walking helpers for the tools package.
+
+``os.scandir`` returns cached ``stat`` information with each entry, which
+makes it considerably cheaper than ``Path.rglob`` followed by ``is_file``
+on large trees. Directories that never contain useful project files
+(VCS metadata, virtualenvs, caches) are pruned during the walk, and
+``.gitignore`` files can optionally be honoured as they are encountered.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Pattern, Sequence, Set, Tuple
+
+CACHE_DIR_NAME = ".agentic_cache"
+
+SKIP_DIRS: Set[str] = {
+    ".git",
+    ".hg",
+    ".svn",
+    "__pycache__",
+    ".venv",
+    "venv",
+    "node_modules",
+    ".tox",
+    ".nox",
+    ".mypy_cache",
+    ".pytest_cache",
+    ".ruff_cache",
+    CACHE_DIR_NAME,
+}
+
+# Where GitLaneManager keeps its lane worktrees, relative to the repository
+# root. Tools that scan a repository skip it so every lane is not counted
+# again; elsewhere a ``worktrees`` directory is ordinary project code.
+WORKTREE_POOL_DIR = "worktrees"
+
+
+def translate_pattern(pattern: str) -> str:
+    """Translate a gitignore glob (without anchoring) into a regex body."""
+    out: List[str] = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("/**", i) and i + 3 == len(pattern):
+            out.append("/.*")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1 : end].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+class IgnoreRules:
+    """Ordered gitignore rules; the last matching rule decides.
+
+    Each rule is scoped to the directory (relative posix prefix) of the
+    ``.gitignore`` file it came from, mirroring git's semantics for nested
+    ignore files.
+    """
+
+    def __init__(self, rules: Optional[List[Tuple[str, Pattern[str], bool, bool]]] = None) -> None:
+        self.rules = rules or []
+
+    def extend(self, base: str, lines: Iterable[str]) -> "IgnoreRules":
+        """Return new rules with ``lines`` (scoped to ``base``) appended."""
+        added = []
+        for raw in lines:
+            line = raw.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            anchored = "/" in line
+            line = line.lstrip("/")
+            if not line:
+                continue
+            prefix = "" if anchored else "(?:.*/)?"
+            added.append((base, re.compile(f"^{prefix}{translate_pattern(line)}$"), negate, dir_only))
+        return IgnoreRules(self.rules + added) if added else self
+
+    def ignored(self, rel: str, is_dir: bool) -> bool:
+        result = False
+        for base, regex, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if base and not rel.startswith(base):
+                continue
+            if regex.match(rel[len(base):]):
+                result = not negate
+        return result
+
+
+def _read_gitignore(directory: str) -> List[str]:
+    try:
+        with open(os.path.join(directory, ".gitignore"), "r", encoding="utf-8", errors="replace") as f:
+            return f.readlines()
+    except OSError:
+        return []
+
+
+def iter_files(
+    root: Path | str,
+    suffixes: Optional[Sequence[str]] = None,
+    skip_dirs: Set[str] = SKIP_DIRS,
+    use_gitignore: bool = False,
+    skip_paths: Iterable[str] = (),
+) -> Iterator[Tuple[str, os.DirEntry]]:
+    """Yield ``(relative posix path, DirEntry)`` for files under ``root``.
+
+    Only regular files are yielded; symlinks are not followed. When
+    ``suffixes`` is given, only files ending with one of them are returned.
+    With ``use_gitignore`` every ``.gitignore`` found during the walk is
+    applied to the subtree below it.
+    """
+    for rel, entry, is_dir in walk(root, skip_dirs, use_gitignore, skip_paths):
+        if not is_dir and (not suffixes or entry.name.endswith(tuple(suffixes))):
+            yield rel, entry
+
+
+def walk(
+    root: Path | str,
+    skip_dirs: Set[str] = SKIP_DIRS,
+    use_gitignore: bool = False,
+    skip_paths: Iterable[str] = (),
+) -> Iterator[Tuple[str, os.DirEntry, bool]]:
+    """Yield ``(relative posix path, DirEntry, is_dir)`` for every entry.
+
+    Directories are yielded before their contents. Directories named in
+    ``skip_dirs`` (at any depth) or ``skip_paths`` (relative to ``root``),
+    and ignored ones, are neither yielded nor descended into.
+    """
+    skip_paths = set(skip_paths)
+    root_rules = IgnoreRules()
+    if use_gitignore:
+        root_rules = root_rules.extend("", _read_gitignore(str(root)))
+    stack = [(str(root), "", root_rules)]
+    while stack:
+        directory, prefix, rules = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        for entry in entries:
+            rel = f"{prefix}{entry.name}"
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name in skip_dirs or rel in skip_paths or (use_gitignore and rules.ignored(rel, True)):
+                        continue
+                    yield rel, entry, True
+                    child_rules = rules.extend(rel + "/", _read_gitignore(entry.path)) if use_gitignore else rules
+                    stack.append((entry.path, rel + "/", child_rules))
+                elif entry.is_file(follow_symlinks=False):
+                    if use_gitignore and rules.ignored(rel, False):
+                        continue
+                    yield rel, entry, False
+            except OSError:
+                continue
@@ -0,0 +1,246 @@
+"""Trigram code search tool.
+
+Finding relevant code by listing and reading whole files is slow and
+wastes tokens. This tool maintains an on-disk trigram inverted index of a
+repository (in SQLite under ``.agentic_cache/code_search``) and answers
+substring and regular expression queries with file and line hits.
+
+A query is first reduced to the trigrams any match must contain; the
+posting lists of those trigrams are intersected to find candidate files,
+and only the candidates are read and matched line by line. Trigrams are
+indexed case-insensitively so the same index serves case-sensitive and
+case-insensitive queries. The index is updated incrementally: only files
+whose ``(mtime, size)`` changed are re-tokenised, and deleted files are
+dropped.
+"""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+
+try:  # Python 3.11 moved the regex parser
+    import re._parser as sre_parse  # type: ignore[import-not-found]
+    import re._constants as sre_constants  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover - older interpreters
+    import sre_constants  # type: ignore[no-redef]
+    import sre_parse  # type: ignore[no-redef]
+
+from ._walk import CACHE_DIR_NAME, iter_files
+
+_SNIFF_BYTES = 8192
+
+
+def trigrams(data: bytes) -> Set[int]:
+    """Return the distinct case-folded byte trigrams of ``data`` as integers."""
+    data = data.lower()
+    return {int.from_bytes(data[i : i + 3], "big") for i in range(len(data) - 2)}
+
+
+def _literal_runs(parsed: Any, flags: int) -> List[str]:
+    """Return literal strings every match of a parsed regex must contain.
+
+    Only top-level concatenations (and the groups inside them) are
+    considered; alternations, classes and optional repeats end a run
+    because they do not guarantee specific text.
+    """
+    runs: List[str] = []
+    current: List[str] = []
+
+    def flush() -> None:
+        if current:
+            runs.append("".join(current))
+            current.clear()
+
+    for op, arg in parsed:
+        if op is sre_constants.LITERAL:
+            current.append(chr(arg))
+        elif op is sre_constants.SUBPATTERN:
+            flush()
+            sub_flags = arg[1] if len(arg) > 3 else 0
+            runs.extend(_literal_runs(arg[-1], flags | sub_flags))
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            flush()
+            low, _high, item = arg
+            if low >= 1:
+                runs.extend(_literal_runs(item, flags))
+        elif op is sre_constants.AT:
+            continue  # anchors match no text
+        else:
+            flush()
+    flush()
+    return runs
+
+
+def required_trigrams(pattern: str, regex: bool, ascii_only: bool = False) -> Set[int]:
+    """Return the trigrams any match of ``pattern`` must contain.
+
+    The index only folds ASCII case, so case-insensitive queries pass
+    ``ascii_only`` to drop trigrams containing non-ASCII bytes.
+    """
+    if regex:
+        try:
+            literals = _literal_runs(sre_parse.parse(pattern), 0)
+        except (re.error, AttributeError, TypeError, ValueError):
+            return set()
+    else:
+        literals = [pattern]
+    required: Set[int] = set()
+    for literal in literals:
+        required |= trigrams(literal.encode("utf-8"))
+    if ascii_only:
+        required = {t for t in required if not t & 0x808080}
+    return required
+
+
+class CodeSearchTool:
+    """Build and query a trigram index over a repository."""
+
+    def __init__(
+        self,
+        root: Union[str, Path] = ".",
+        cache_dir: Optional[Union[str, Path]] = None,
+        max_file_bytes: int = 1024 * 1024,
+    ) -> None:
+        self.root = Path(root)
+        self.max_file_bytes = max_file_bytes
+        db_dir = Path(cache_dir) if cache_dir else self.root / CACHE_DIR_NAME / "code_search"
+        db_dir.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_dir / "index.sqlite"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                trigram INTEGER NOT NULL,
+                file_id INTEGER NOT NULL,
+                PRIMARY KEY (trigram, file_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_by_file ON postings (file_id);
+            """
+        )
+
+    def update(self) -> Dict[str, int]:
+        """Bring the index in line with the working tree.
+
+        Returns counts of ``indexed``, ``removed`` and ``unchanged`` files.
+        """
+        rows = self.conn.execute("SELECT id, path, mtime_ns, size FROM files")
+        known = {path: (fid, mtime, size) for fid, path, mtime, size in rows}
+        seen: Set[str] = set()
+        indexed = 0
+        with self.conn:
+            for rel, entry in iter_files(self.root, use_gitignore=True):
+                st = entry.stat()
+                if st.st_size > self.max_file_bytes:
+                    continue
+                seen.add(rel)
+                previous = known.get(rel)
+                if previous and previous[1] == st.st_mtime_ns and previous[2] == st.st_size:
+                    continue
+                try:
+                    with open(entry.path, "rb") as f:
+                        data = f.read()
+                except OSError:
+                    seen.discard(rel)
+                    continue
+                if b"\0" in data[:_SNIFF_BYTES]:
+                    seen.discard(rel)
+                    continue
+                if previous:
+                    fid = previous[0]
+                    self.conn.execute("DELETE FROM postings WHERE file_id = ?", (fid,))
+                    self.conn.execute(
+                        "UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?", (st.st_mtime_ns, st.st_size, fid)
+                    )
+                else:
+                    cursor = self.conn.execute(
+                        "INSERT INTO files (path, mtime_ns, size) VALUES (?, ?, ?)", (rel, st.st_mtime_ns, st.st_size)
+                    )
+                    fid = cursor.lastrowid
+                self.conn.executemany(
+                    "INSERT INTO postings (trigram, file_id) VALUES (?, ?)",
+                    ((t, fid) for t in trigrams(data)),
+                )
+                indexed += 1
+            removed = [(known[p][0],) for p in known if p not in seen]
+            self.conn.executemany("DELETE FROM postings WHERE file_id = ?", removed)
+            self.conn.executemany("DELETE FROM files WHERE id = ?", removed)
+        return {"indexed": indexed, "removed": len(removed), "unchanged": len(seen) - indexed}
+
+    def _candidates(self, required: Iterable[int]) -> List[str]:
+        required = list(required)
+        if not required:
+            return [row[0] for row in self.conn.execute("SELECT path FROM files ORDER BY path")]
+        # Start from the rarest trigram so intersections stay small.
+        counts = []
+        for t in required:
+            (count,) = self.conn.execute("SELECT COUNT(*) FROM postings WHERE trigram = ?", (t,)).fetchone()
+            if not count:
+                return []
+            counts.append((count, t))
+        counts.sort()
+        ids: Optional[Set[int]] = None
+        for _, t in counts:
+            rows = self.conn.execute("SELECT file_id FROM postings WHERE trigram = ?", (t,))
+            found = {row[0] for row in rows}
+            ids = found if ids is None else ids & found
+            if not ids:
+                return []
+        assert ids is not None
+        placeholders = ",".join("?" * len(ids))
+        rows = self.conn.execute(f"SELECT path FROM files WHERE id IN ({placeholders}) ORDER BY path", list(ids))
+        return [row[0] for row in rows]
+
+    def search(
+        self,
+        query: str,
+        regex: bool = False,
+        case_sensitive: bool = True,
+        max_results: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """Return up to ``max_results`` ``{"path", "line", "text"}`` hits.
+
+        ``query`` is a literal substring unless ``regex`` is true. Line
+        numbers are one-based. The index is not refreshed; call
+        :meth:`update` (or use :meth:`run`) first.
+        """
+        flags = 0 if case_sensitive else re.IGNORECASE
+        matcher = re.compile(query if regex else re.escape(query), flags)
+        hits: List[Dict[str, Any]] = []
+        for rel in self._candidates(required_trigrams(query, regex, ascii_only=not case_sensitive)):
+            try:
+                with open(self.root / rel, "r", encoding="utf-8", errors="replace") as f:
+                    for lineno, line in enumerate(f, 1):
+                        if matcher.search(line):
+                            hits.append({"path": rel, "line": lineno, "text": line.rstrip("\n")})
+                            if len(hits) >= max_results:
+                                return hits
+            except OSError:
+                continue
+        return hits
+
+    def run(self, query: str, regex: bool = False, case_sensitive: bool = True, max_results: int = 100) -> Dict[str, Any]:
+        """Refresh the index and search it; timings are reported in ms."""
+        start = time.perf_counter()
+        stats = self.update()
+        indexed_at = time.perf_counter()
+        hits = self.search(query, regex=regex, case_sensitive=case_sensitive, max_results=max_results)
+        return {
+            "hits": hits,
+            "index": stats,
+            "update_ms": round((indexed_at - start) * 1000, 2),
+            "search_ms": round((time.perf_counter() - indexed_at) * 1000, 2),
+        }
+
+    def close(self) -> None:
+        self.conn.close()
@@ -4,23 +4,267 @@ This tool reads the contents of a text document from the local filesystem.
 It is intentionally kept simple to avoid external dependencies. For
 structured documents like PDFs or Word files, consider integrating with
 libraries such as ``pdfminer.six`` or ``python-docx`` in the future.
+
+Agents frequently need only a few sections of very large logs or docs, so
+besides :meth:`DocumentReaderTool.run` (whole file) the tool offers byte
+and line range reads and a chunk generator. Files above a size threshold
+are accessed through ``mmap`` so only the touched pages are read. Decoded
+chunks are kept in an LRU cache keyed by ``(path, mtime, size, range)``
+with a memory cap, shared by all reader instances in the process, so
+repeated reads of the same documents across tasks are nearly free.
 """
 
 from __future__ import annotations
 
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Union
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple, Union
+
+# Files at least this large are read through mmap instead of read().
+MMAP_THRESHOLD = 4 * 1024 * 1024
+# The line index records the byte offset of every Nth line.
+_LINE_INDEX_STRIDE = 1024
+
+
+class ChunkCache:
+    """Thread-safe LRU cache of decoded text bounded by total characters."""
+
+    def __init__(self, max_chars: int = 64 * 1024 * 1024) -> None:
+        self.max_chars = max_chars
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._total = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, size: int) -> None:
+        if size > self.max_chars:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._total -= self._sizes[key]
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            self._total += size
+            while self._total > self.max_chars:
+                old, _ = self._entries.popitem(last=False)
+                self._total -= self._sizes.pop(old)
+
+    @property
+    def size(self) -> int:
+        return self._total
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total = 0
+
+
+_SHARED_CACHE = ChunkCache()
+
+
+def _align_start(data: Any, start: int) -> int:
+    """Move ``start`` forward past UTF-8 continuation bytes."""
+    while start < len(data) and 0x80 <= data[start] < 0xC0:
+        start += 1
+    return start
+
+
+def _align_end(data: Any, end: int) -> int:
+    """Move ``end`` back so it does not split a UTF-8 sequence."""
+    while 0 < end < len(data) and 0x80 <= data[end] < 0xC0:
+        end -= 1
+    return end
 
 
 class DocumentReaderTool:
     """Read the contents of a document from disk."""
 
+    def __init__(self, cache: Optional[ChunkCache] = None, encoding: str = "utf-8") -> None:
+        self.cache = cache if cache is not None else _SHARED_CACHE
+        self.encoding = encoding
+
     def run(self, path: Union[str, Path]) -> str:
         """Return the contents of the file at ``path`` as a string.
 
         If the file cannot be read (e.g. due to encoding issues), an
         exception will be raised. The caller should handle any exceptions
-        gracefully.
+        gracefully. Results are served from the shared chunk cache while the
+        file's mtime and size are unchanged.
         """
-        p = Path(path)
-        return p.read_text(encoding="utf-8")
\ No newline at end of file
+        stamp = self._stamp(path)
+        key = (stamp, "full")
+        text = self.cache.get(key)
+        if text is None:
+            text = Path(path).read_text(encoding=self.encoding)
+            self.cache.put(key, text, len(text))
+        return text
+
+    @staticmethod
+    def _stamp(path: Union[str, Path]) -> Tuple[str, int, int]:
+        st = os.stat(path)
+        return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+    @contextmanager
+    def _open(self, path: Union[str, Path], size: int) -> Iterator[Any]:
+        """Yield a sliceable view of the file: an mmap for large files."""
+        with open(path, "rb") as f:
+            if size >= MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    yield mm
+            else:
+                yield f.read()
+
+    def read_bytes(self, path: Union[str, Path], start: int = 0, end: Optional[int] = None) -> bytes:
+        """Return the raw bytes in ``[start, end)`` of the file at ``path``."""
+        size = os.stat(path).st_size
+        end = size if end is None else min(end, size)
+        start = max(0, min(start, end))
+        if size < MMAP_THRESHOLD:
+            with open(path, "rb") as f:
+                f.seek(start)
+                return f.read(end - start)
+        with self._open(path, size) as data:
+            return bytes(data[start:end])
+
+    def read_range(self, path: Union[str, Path], start: int = 0, end: Optional[int] = None) -> str:
+        """Return the decoded text in the byte range ``[start, end)``.
+
+        Range boundaries that fall inside a multi-byte character are moved
+        so the character is either fully included or fully excluded.
+        """
+        stamp = self._stamp(path)
+        size = stamp[2]
+        end = size if end is None else min(end, size)
+        start = max(0, min(start, end))
+        key = (stamp, "range", start, end)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        with self._open(path, size) as data:
+            s = _align_start(data, start)
+            e = max(s, _align_end(data, end))
+            text = bytes(data[s:e]).decode(self.encoding, errors="replace")
+        self.cache.put(key, text, len(text))
+        return text
+
+    def _line_index(self, path: Union[str, Path], stamp: Tuple[str, int, int], data: Any) -> List[int]:
+        """Return byte offsets of lines 0, N, 2N, ... (cached per stamp)."""
+        key = (stamp, "line-index")
+        index = self.cache.get(key)
+        if index is None:
+            index = [0]
+            line = 0
+            pos = data.find(b"\n")
+            while pos != -1:
+                line += 1
+                if line % _LINE_INDEX_STRIDE == 0:
+                    index.append(pos + 1)
+                pos = data.find(b"\n", pos + 1)
+            self.cache.put(key, index, len(index))
+        return index
+
+    def read_lines(self, path: Union[str, Path], start: int = 0, end: Optional[int] = None) -> str:
+        """Return lines ``[start, end)`` (zero-based) of the file at ``path``.
+
+        A sparse offset index (one entry every 1024 lines) is built on
+        first use and cached, so later reads seek close to ``start``
+        instead of scanning from the beginning.
+        """
+        stamp = self._stamp(path)
+        key = (stamp, "lines", start, end)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        with self._open(path, stamp[2]) as data:
+            index = self._line_index(path, stamp, data)
+            checkpoint = min(start // _LINE_INDEX_STRIDE, len(index) - 1)
+            pos = index[checkpoint]
+            line = checkpoint * _LINE_INDEX_STRIDE
+            while line < start and pos != -1:
+                pos = data.find(b"\n", pos)
+                pos = -1 if pos == -1 else pos + 1
+                line += 1
+            if pos == -1:
+                text = ""
+            else:
+                stop = pos
+                while (end is None or line < end) and stop != -1:
+                    stop = data.find(b"\n", stop)
+                    stop = -1 if stop == -1 else stop + 1
+                    line += 1
+                text = bytes(data[pos : len(data) if stop == -1 else stop]).decode(self.encoding, errors="replace")
+        self.cache.put(key, text, len(text))
+        return text
+
+    def _boundaries(self, data: Any, chunk_size: int, paragraphs: bool) -> List[int]:
+        bounds = [0]
+        size = len(data)
+        while bounds[-1] < size:
+            start = bounds[-1]
+            limit = min(start + chunk_size, size)
+            if limit == size:
+                bounds.append(size)
+                break
+            cut = -1
+            if paragraphs:
+                cut = data.rfind(b"\n\n", start, limit)
+                cut = -1 if cut == -1 else cut + 2
+            if cut <= start:
+                cut = data.rfind(b"\n", start, limit)
+                cut = -1 if cut == -1 else cut + 1
+            if cut <= start:
+                cut = _align_end(data, limit)
+            if cut <= start:
+                cut = limit
+            bounds.append(cut)
+        return bounds
+
+    def iter_chunks(
+        self,
+        path: Union[str, Path],
+        chunk_size: int = 64 * 1024,
+        paragraphs: bool = False,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield ``{"start", "end", "text"}`` chunks of at most ``chunk_size`` bytes.
+
+        Chunks end on a line boundary where possible; with ``paragraphs``
+        they prefer to end on a blank line. Chunk boundaries and decoded
+        chunks are cached, so iterating the same document again does not
+        touch the disk.
+        """
+        stamp = self._stamp(path)
+        bounds_key = (stamp, "bounds", chunk_size, paragraphs)
+        bounds = self.cache.get(bounds_key)
+        if bounds is None:
+            with self._open(path, stamp[2]) as data:
+                bounds = self._boundaries(data, chunk_size, paragraphs)
+            self.cache.put(bounds_key, bounds, len(bounds))
+        for start, end in zip(bounds, bounds[1:]):
+            yield {"start": start, "end": end, "text": self._chunk(path, stamp, start, end)}
+
+    def _chunk(self, path: Union[str, Path], stamp: Tuple[str, int, int], start: int, end: int) -> str:
+        # Not "range": chunks are decoded without aligning to characters.
+        key = (stamp, "chunk", start, end)
+        text = self.cache.get(key)
+        if text is None:
+            text = self.read_bytes(path, start, end).decode(self.encoding, errors="replace")
+            self.cache.put(key, text, len(text))
+        return text
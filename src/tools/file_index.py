@@ -0,0 +1,301 @@
+"""Persistent file index for fast listings.
+
+``Path.glob`` followed by ``is_file`` on every match costs seconds on large
+worktrees, and agents list files constantly. :class:`FileIndex` keeps a
+per-base-directory index of file names in memory (and on disk between
+processes) and answers glob and prefix queries from it.
+
+The index is refreshed incrementally. Each directory's listing is stored
+with the directory's mtime; a refresh only ``stat``\\ s directories and
+re-lists those whose mtime changed, since creating, deleting or renaming
+an entry always bumps its parent's mtime. On Linux an inotify watch set
+is kept as well, so when no events have arrived even the ``stat`` walk
+is skipped. ``.gitignore`` files are honoured, including nested ones.
+"""
+
+from __future__ import annotations
+
+import bisect
+import ctypes
+import ctypes.util
+import errno
+import json
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+from ._walk import CACHE_DIR_NAME, SKIP_DIRS, IgnoreRules, translate_pattern
+
+# Listings of directories modified this recently are re-read on the next
+# refresh, so changes within the filesystem's mtime granularity are not
+# missed.
+_RACY_NS = 2_000_000_000
+
+
+class _Inotify:
+    """Minimal ctypes binding to Linux inotify used as a change hint."""
+
+    # IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+    DIR_MASK = 0x100 | 0x200 | 0x40 | 0x80 | 0x400 | 0x800
+    # IN_MODIFY | IN_CLOSE_WRITE, used for .gitignore files only so that
+    # ordinary content edits do not trigger a refresh.
+    FILE_MASK = 0x2 | 0x8
+
+    def __init__(self) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.fd = fd
+        self.watched: set = set()
+
+    def watch(self, path: str, mask: int = DIR_MASK) -> None:
+        if path in self.watched:
+            return
+        if self._add_watch(self.fd, os.fsencode(path), mask) < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        self.watched.add(path)
+
+    def drain(self) -> bool:
+        """Consume pending events; return ``True`` if anything happened."""
+        changed = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            except OSError as exc:
+                if exc.errno == errno.EINTR:
+                    continue
+                raise
+            if not data:
+                return changed
+            changed = True
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def glob_to_regex(pattern: str) -> Pattern[str]:
+    """Compile a ``Path.glob`` style pattern into a regex over posix paths."""
+    return re.compile(f"^{translate_pattern(pattern.strip('/'))}$")
+
+
+def _literal_prefix(pattern: str) -> str:
+    """Return the leading directories of ``pattern`` without wildcards."""
+    parts = pattern.strip("/").split("/")
+    literal = []
+    for part in parts[:-1]:
+        if any(c in part for c in "*?["):
+            break
+        literal.append(part)
+    return "/".join(literal) + "/" if literal else ""
+
+
+class FileIndex:
+    """Incrementally maintained index of the files below ``base_dir``."""
+
+    def __init__(
+        self,
+        base_dir: Path | str,
+        cache_path: Optional[Path | str] = None,
+        use_gitignore: bool = True,
+        use_inotify: bool = True,
+    ) -> None:
+        self.base_dir = Path(base_dir)
+        self.cache_path = Path(cache_path) if cache_path else self.base_dir / CACHE_DIR_NAME / "file_index.json"
+        self.use_gitignore = use_gitignore
+        # rel dir -> {"mtime": ns, "scanned": ns, "files": [...], "dirs": [...], "ignore": [...] }
+        self._dirs: Dict[str, Dict[str, Any]] = {}
+        self._files: List[str] = []
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._inotify: Optional[_Inotify] = None
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError):
+                self._inotify = None
+
+    def _load(self) -> None:
+        self._loaded = True
+        try:
+            with self.cache_path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("use_gitignore") == self.use_gitignore:
+            self._dirs = data.get("dirs", {})
+
+    def _save(self) -> None:
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_path.with_suffix(f".{os.getpid()}.tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                json.dump({"use_gitignore": self.use_gitignore, "dirs": self._dirs}, f)
+            os.replace(tmp, self.cache_path)
+        except OSError:
+            pass  # the on-disk copy is an optimisation only
+
+    def _watch(self, path: str, mask: int = _Inotify.DIR_MASK) -> None:
+        if self._inotify is None:
+            return
+        try:
+            self._inotify.watch(path, mask)
+        except OSError:
+            # Typically the per-user watch limit; fall back to mtime checks.
+            self._inotify.close()
+            self._inotify = None
+
+    def _list_dir(self, path: str, mtime: int) -> Dict[str, Any]:
+        files, dirs = [], []
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIP_DIRS:
+                            dirs.append(entry.name)
+                    elif entry.is_file(follow_symlinks=False):
+                        files.append(entry.name)
+                except OSError:
+                    continue
+        ignore: List[str] = []
+        if self.use_gitignore and ".gitignore" in files:
+            try:
+                with open(os.path.join(path, ".gitignore"), "r", encoding="utf-8", errors="replace") as f:
+                    ignore = f.readlines()
+            except OSError:
+                pass
+        return {"mtime": mtime, "scanned": time.time_ns(), "files": sorted(files), "dirs": sorted(dirs), "ignore": ignore}
+
+    def refresh(self, force: bool = False) -> bool:
+        """Bring the index up to date; return ``True`` if anything changed."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if self._inotify is not None and self._files and not force:
+                if not self._inotify.drain():
+                    return False
+                # Deleted directories lose their watches; re-adding is cheap.
+                self._inotify.watched.clear()
+            changed = self._refresh_locked()
+            if changed or not self._files:
+                self._rebuild_files()
+            if changed:
+                self._save()
+            return changed
+
+    def _refresh_locked(self) -> bool:
+        changed = False
+        seen = set()
+        stack: List[Tuple[str, IgnoreRules]] = [("", IgnoreRules())]
+        while stack:
+            rel, rules = stack.pop()
+            path = os.path.join(self.base_dir, rel) if rel else str(self.base_dir)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            self._watch(path)
+            seen.add(rel)
+            entry = self._dirs.get(rel)
+            gitignore_stale = False
+            if entry is not None and entry["ignore"]:
+                # Editing .gitignore in place does not bump the dir mtime.
+                try:
+                    gi = os.stat(os.path.join(path, ".gitignore"))
+                    gitignore_stale = gi.st_mtime_ns + _RACY_NS > entry["scanned"]
+                except OSError:
+                    gitignore_stale = True
+            if (
+                entry is None
+                or entry["mtime"] != st.st_mtime_ns
+                or st.st_mtime_ns + _RACY_NS > entry["scanned"]
+                or gitignore_stale
+            ):
+                try:
+                    new_entry = self._list_dir(path, st.st_mtime_ns)
+                except OSError:
+                    continue
+                if entry is None or any(new_entry[k] != entry[k] for k in ("files", "dirs", "ignore")):
+                    changed = True
+                self._dirs[rel] = entry = new_entry
+            prefix = f"{rel}/" if rel else ""
+            if entry["ignore"]:
+                self._watch(os.path.join(path, ".gitignore"), _Inotify.FILE_MASK)
+                rules = rules.extend(prefix, entry["ignore"])
+            # Ignored directories are pruned, so e.g. build output is never walked.
+            stack.extend(
+                (prefix + d, rules) for d in entry["dirs"] if not rules.rules or not rules.ignored(prefix + d, True)
+            )
+        for rel in [r for r in self._dirs if r not in seen]:
+            del self._dirs[rel]
+            changed = True
+        return changed
+
+    def _rebuild_files(self) -> None:
+        files: List[str] = []
+        stack: List[Tuple[str, IgnoreRules]] = [("", IgnoreRules())]
+        while stack:
+            rel, rules = stack.pop()
+            entry = self._dirs.get(rel)
+            if entry is None:
+                continue
+            prefix = f"{rel}/" if rel else ""
+            if entry["ignore"]:
+                rules = rules.extend(prefix, entry["ignore"])
+            for name in entry["files"]:
+                if not rules.rules or not rules.ignored(prefix + name, False):
+                    files.append(prefix + name)
+            for name in entry["dirs"]:
+                if not rules.rules or not rules.ignored(prefix + name, True):
+                    stack.append((prefix + name, rules))
+        files.sort()
+        self._files = files
+
+    def files(self) -> List[str]:
+        """Return all indexed files as sorted relative posix paths."""
+        self.refresh()
+        return list(self._files)
+
+    def prefix(self, prefix: str) -> List[str]:
+        """Return indexed files whose relative path starts with ``prefix``."""
+        self.refresh()
+        return self._range(prefix)
+
+    def _range(self, prefix: str) -> List[str]:
+        files = self._files
+        lo = bisect.bisect_left(files, prefix)
+        hi = bisect.bisect_left(files, prefix + "\U0010ffff") if prefix else len(files)
+        return files[lo:hi]
+
+    def glob(self, pattern: str) -> List[str]:
+        """Return indexed files matching a ``Path.glob`` style ``pattern``."""
+        self.refresh()
+        regex = glob_to_regex(pattern)
+        return [f for f in self._range(_literal_prefix(pattern)) if regex.match(f)]
+
+    def close(self) -> None:
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+
+_INDEXES: Dict[Tuple[str, bool], FileIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_index(base_dir: Path | str, use_gitignore: bool = True) -> FileIndex:
+    """Return the process-wide shared index for ``base_dir``."""
+    key = (os.path.abspath(base_dir), use_gitignore)
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is None:
+            index = _INDEXES[key] = FileIndex(base_dir, use_gitignore=use_gitignore)
+        return index
@@ -5,23 +5,52 @@ creating directories and removing files. It is intentionally limited in
 scope to avoid accidental modification of arbitrary parts of the file
 system. Additional safeguards (e.g. path allow lists) should be added
 when expanding functionality.
+
+With ``use_index``, listings are answered from a persistent,
+gitignore-aware :class:`~src.tools.file_index.FileIndex` shared by every
+tool instance with the same base directory, so repeated ``list_files``
+calls do not walk the tree again. Such listings leave out ignored files
+and tool directories (``.git``, caches), so they are opt-in.
 """
 
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
+
+from .file_index import get_index
 
 
 class FileSystemTool:
     """Perform simple file system operations."""
 
-    def __init__(self, base_dir: Path | str = ".") -> None:
+    def __init__(self, base_dir: Path | str = ".", use_index: bool = False) -> None:
         self.base_dir = Path(base_dir)
+        self.use_index = use_index
+
+    def list_files(self, pattern: str = "*", use_index: Optional[bool] = None) -> List[str]:
+        """Return a list of file paths under ``base_dir`` matching ``pattern``.
+
+        ``pattern`` uses ``Path.glob`` syntax (``*``, ``?``, ``[...]`` and
+        ``**`` for any number of directories). With ``use_index`` (default:
+        the tool's setting) the listing comes from the file index and skips
+        files excluded by ``.gitignore`` and tool directories.
+        """
+        if not (self.use_index if use_index is None else use_index):
+            return [str(p) for p in self.base_dir.glob(pattern) if p.is_file()]
+        return [str(self.base_dir / rel) for rel in get_index(self.base_dir).glob(pattern)]
+
+    def list_prefix(self, prefix: str, use_index: Optional[bool] = None) -> List[str]:
+        """Return file paths whose path relative to ``base_dir`` starts with ``prefix``.
 
-    def list_files(self, pattern: str = "*") -> List[str]:
-        """Return a list of file paths under ``base_dir`` matching ``pattern``."""
-        return [str(p) for p in self.base_dir.glob(pattern) if p.is_file()]
+        ``use_index`` works as for :meth:`list_files`. Without the index
+        only the directory holding ``prefix`` is walked.
+        """
+        if self.use_index if use_index is None else use_index:
+            return [str(self.base_dir / rel) for rel in get_index(self.base_dir).prefix(prefix)]
+        start = self.base_dir / prefix.rpartition("/")[0]
+        rels = (p.relative_to(self.base_dir).as_posix() for p in start.rglob("*") if p.is_file())
+        return [str(self.base_dir / rel) for rel in sorted(r for r in rels if r.startswith(prefix))]
 
     def make_dir(self, relative_path: str) -> Dict[str, Any]:
         """Create a directory relative to the base directory."""
@@ -35,4 +64,4 @@ class FileSystemTool:
         if path.exists():
             path.unlink()
             return {"removed": str(path)}
-        return {"removed": False, "reason": "file not found"}
\ No newline at end of file
+        return {"removed": False, "reason": "file not found"}
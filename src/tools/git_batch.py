@@ -0,0 +1,201 @@
+"""Persistent ``git cat-file`` backend for read-only queries.
+
+Starting a ``git`` process costs several milliseconds, and agents issue
+dozens of ``rev-parse``, ``show`` and ``cat-file`` calls per task.
+:class:`GitBatch` keeps one ``git cat-file --batch`` and one
+``git cat-file --batch-check`` process alive per repository and sends
+queries to them over pipes, so a lookup costs a pipe round trip instead
+of a fork and exec. Several names can be sent in one write, which makes
+multi-path queries (e.g. reading every changed file at a revision) a
+single exchange.
+
+Object contents and types are immutable for a given SHA, so they are kept
+in a small byte-bounded LRU cache keyed by SHA. Symbolic names such as
+``HEAD`` or ``main:path`` are always resolved by git, since refs move.
+"""
+
+from __future__ import annotations
+
+import re
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from .doc_reader import ChunkCache
+
+_SHA = re.compile(r"^[0-9a-f]{40}$")
+
+
+class GitObject(NamedTuple):
+    sha: str
+    type: str
+    size: int
+    data: Optional[bytes] = None
+
+
+class _CatFile:
+    """One long-running ``git cat-file`` process speaking the batch protocol."""
+
+    def __init__(self, repo_dir: Path, mode: str) -> None:
+        self.repo_dir = repo_dir
+        self.mode = mode
+        self.proc: Optional[subprocess.Popen] = None
+        self.lock = threading.Lock()
+
+    def _ensure(self) -> subprocess.Popen:
+        if self.proc is None or self.proc.poll() is not None:
+            self.proc = subprocess.Popen(
+                ["git", "cat-file", self.mode],
+                cwd=self.repo_dir,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        return self.proc
+
+    def query(self, names: Sequence[str]) -> List[Optional[GitObject]]:
+        """Look up ``names`` in one exchange; ``None`` marks missing objects."""
+        with self.lock:
+            try:
+                return self._query(names)
+            except (BrokenPipeError, ValueError, OSError):
+                # The process died (e.g. the repository moved); retry once.
+                self.close()
+                return self._query(names)
+
+    def _query(self, names: Sequence[str]) -> List[Optional[GitObject]]:
+        proc = self._ensure()
+        assert proc.stdin is not None and proc.stdout is not None
+        payload = "".join(f"{name}\n" for name in names).encode("utf-8")
+        # Write from a thread so a large batch cannot deadlock against git
+        # blocking on a full stdout pipe.
+        writer = threading.Thread(target=self._write, args=(proc, payload), daemon=True)
+        writer.start()
+        results: List[Optional[GitObject]] = []
+        read = proc.stdout.readline
+        for _ in names:
+            header = read()
+            if not header:
+                raise BrokenPipeError("git cat-file exited")
+            parts = header.decode("utf-8", errors="replace").split()
+            if len(parts) != 3 or parts[-1] in ("missing", "ambiguous"):
+                results.append(None)
+                continue
+            sha, kind, size = parts[0], parts[1], int(parts[2])
+            data = None
+            if self.mode == "--batch":
+                data = proc.stdout.read(size)
+                proc.stdout.read(1)  # trailing newline
+            results.append(GitObject(sha, kind, size, data))
+        writer.join()
+        return results
+
+    @staticmethod
+    def _write(proc: subprocess.Popen, payload: bytes) -> None:
+        try:
+            assert proc.stdin is not None
+            proc.stdin.write(payload)
+            proc.stdin.flush()
+        except (BrokenPipeError, ValueError, OSError):
+            pass
+
+    def close(self) -> None:
+        proc, self.proc = self.proc, None
+        if proc is None:
+            return
+        try:
+            if proc.stdin:
+                proc.stdin.close()
+            proc.wait(timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+            proc.wait()
+        if proc.stdout:
+            proc.stdout.close()
+
+
+class GitBatch:
+    """Answer read-only object queries through persistent git processes."""
+
+    def __init__(self, repo_dir: Path | str, cache_bytes: int = 32 * 1024 * 1024) -> None:
+        self.repo_dir = Path(repo_dir)
+        self._contents = _CatFile(self.repo_dir, "--batch")
+        self._check = _CatFile(self.repo_dir, "--batch-check")
+        self.cache = ChunkCache(max_chars=cache_bytes)
+
+    @staticmethod
+    def _valid(name: str) -> bool:
+        return bool(name) and "\n" not in name and not name.startswith("-")
+
+    def info_many(self, names: Sequence[str]) -> Dict[str, Optional[GitObject]]:
+        """Return type and size (no data) for each of ``names``."""
+        out: Dict[str, Optional[GitObject]] = {}
+        pending = []
+        for name in names:
+            if not self._valid(name):
+                out[name] = None
+                continue
+            cached = self.cache.get(("info", name)) if _SHA.match(name) else None
+            if cached is not None:
+                out[name] = cached
+            else:
+                pending.append(name)
+        if pending:
+            for name, obj in zip(pending, self._check.query(pending)):
+                out[name] = obj
+                if obj is not None:
+                    self.cache.put(("info", obj.sha), obj, 64)
+        return out
+
+    def read_many(self, names: Sequence[str]) -> Dict[str, Optional[GitObject]]:
+        """Return type, size and contents for each of ``names``."""
+        out: Dict[str, Optional[GitObject]] = {}
+        pending = []
+        for name in names:
+            if not self._valid(name):
+                out[name] = None
+                continue
+            cached = self.cache.get(("object", name)) if _SHA.match(name) else None
+            if cached is not None:
+                out[name] = cached
+            else:
+                pending.append(name)
+        if pending:
+            for name, obj in zip(pending, self._contents.query(pending)):
+                out[name] = obj
+                if obj is not None:
+                    self.cache.put(("object", obj.sha), obj, obj.size)
+        return out
+
+    def info(self, name: str) -> Optional[GitObject]:
+        return self.info_many([name])[name]
+
+    def read(self, name: str) -> Optional[GitObject]:
+        return self.read_many([name])[name]
+
+    def rev_parse(self, revs: Sequence[str]) -> Dict[str, Optional[str]]:
+        """Resolve revisions to object names, like ``git rev-parse``."""
+        return {rev: obj.sha if obj else None for rev, obj in self.info_many(revs).items()}
+
+    def show_files(self, rev: str, paths: Sequence[str]) -> Dict[str, Optional[bytes]]:
+        """Return the blob contents of ``paths`` at ``rev`` in one batch.
+
+        Paths that do not exist at ``rev`` or are not files map to ``None``.
+        """
+        objects = self.read_many([f"{rev}:{path}" for path in paths])
+        out: Dict[str, Optional[bytes]] = {}
+        for path in paths:
+            obj = objects[f"{rev}:{path}"]
+            out[path] = obj.data if obj is not None and obj.type == "blob" else None
+        return out
+
+    def close(self) -> None:
+        self._contents.close()
+        self._check.close()
+
+    def __enter__(self) -> "GitBatch":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
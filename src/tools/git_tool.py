@@ -5,44 +5,121 @@ repository. In this stub implementation, only a limited set of
 operations are provided (e.g., obtaining the current branch and status).
 Extend this class to support committing changes, creating branches or
 querying remote repositories.
+
+Commands are executed through :mod:`src.subprocess_runner`, so output is
+streamed and capped in memory even for very large diffs or logs.
+Read-only object queries (``rev-parse``, ``cat-file`` and ``show rev:path``)
+are answered by the persistent :class:`~src.tools.git_batch.GitBatch`
+backend instead of a new process; anything it cannot answer exactly
+falls back to running git.
 """
 
 from __future__ import annotations
 
-import subprocess
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
+
+from ..subprocess_runner import DEFAULT_MAX_OUTPUT_BYTES, LineCallback, run
+from .git_batch import GitBatch
 
 
 class GitTool:
     """Perform simple Git operations using subprocess."""
 
-    def __init__(self, repo_dir: Path | str) -> None:
+    def __init__(
+        self,
+        repo_dir: Path | str,
+        timeout: Optional[float] = 120.0,
+        max_output_bytes: int = DEFAULT_MAX_OUTPUT_BYTES,
+        use_batch: bool = True,
+    ) -> None:
         self.repo_dir = Path(repo_dir)
+        self.timeout = timeout
+        self.max_output_bytes = max_output_bytes
+        self.use_batch = use_batch
+        self._batch: Optional[GitBatch] = None
+
+    @property
+    def batch(self) -> GitBatch:
+        """The persistent ``cat-file`` backend, started on first use."""
+        if self._batch is None:
+            self._batch = GitBatch(self.repo_dir)
+        return self._batch
+
+    def _from_batch(self, command: List[str]) -> Optional[str]:
+        """Return the stdout git would print for ``command``, or ``None``.
 
-    def run(self, command: List[str]) -> Dict[str, Any]:
+        ``None`` means the command is not a supported read-only query or the
+        batch backend could not resolve it, so the caller should run git.
+        """
+        if len(command) < 2:
+            return None
+        verb, args = command[0], command[1:]
+        if verb == "rev-parse":
+            if args[0] == "--verify":
+                args = args[1:]
+                if len(args) != 1:
+                    return None
+            if any(a.startswith("-") for a in args):
+                return None
+            resolved = self.batch.rev_parse(args)
+            if any(resolved[a] is None for a in args):
+                return None
+            return "".join(f"{resolved[a]}\n" for a in args)
+        if verb == "cat-file" and len(args) == 2:
+            flag, name = args
+            if flag in ("-t", "-s"):
+                info = self.batch.info(name)
+                if info is None:
+                    return None
+                return f"{info.type if flag == '-t' else info.size}\n"
+            obj = self.batch.read(name)
+            if obj is None or obj.data is None or obj.type == "tree":
+                return None  # trees are pretty-printed or binary
+            if flag == "-p" or flag == obj.type:
+                return obj.data.decode("utf-8", errors="replace")
+            return None
+        if verb == "show" and len(args) == 1 and ":" in args[0] and not args[0].startswith("-"):
+            obj = self.batch.read(args[0])
+            if obj is None or obj.type != "blob" or obj.data is None:
+                return None
+            return obj.data.decode("utf-8", errors="replace")
+        return None
+
+    def run(self, command: List[str], on_output: Optional[LineCallback] = None) -> Dict[str, Any]:
         """Execute a git command and return its stdout/stderr.
 
         ``command`` should be a list of strings passed directly to the
         ``git`` executable. The return value includes the exit code and
-        captured output. If the command fails, an exception is raised.
+        captured output; failures are reported through a non-zero
+        ``exit_code`` rather than an exception. ``on_output`` receives each
+        stdout line as it is produced. Output beyond ``max_output_bytes``
+        is truncated in the middle and flagged with ``truncated``.
         """
-        try:
-            result = subprocess.run(
-                ["git", *command],
-                cwd=self.repo_dir,
-                capture_output=True,
-                text=True,
-                check=True,
-            )
-            return {
-                "exit_code": result.returncode,
-                "stdout": result.stdout,
-                "stderr": result.stderr,
-            }
-        except subprocess.CalledProcessError as exc:
-            return {
-                "exit_code": exc.returncode,
-                "stdout": exc.stdout,
-                "stderr": exc.stderr,
-            }
\ No newline at end of file
+        if self.use_batch and command:
+            stdout = self._from_batch(command)
+            if stdout is not None and len(stdout) <= self.max_output_bytes:
+                if on_output is not None:
+                    for line in stdout.splitlines(keepends=True):
+                        on_output(line)
+                return {"exit_code": 0, "stdout": stdout, "stderr": "", "truncated": False, "timed_out": False}
+        result = run(
+            ["git", *command],
+            cwd=self.repo_dir,
+            timeout=self.timeout,
+            on_stdout=on_output,
+            max_output_bytes=self.max_output_bytes,
+        )
+        return {
+            "exit_code": result.returncode,
+            "stdout": result.stdout,
+            "stderr": result.stderr,
+            "truncated": result.stdout_truncated or result.stderr_truncated,
+            "timed_out": result.timed_out,
+        }
+
+    def close(self) -> None:
+        """Stop the persistent batch processes, if any were started."""
+        if self._batch is not None:
+            self._batch.close()
+            self._batch = None
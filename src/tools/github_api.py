@@ -5,20 +5,218 @@ It uses the ``requests`` library to send authenticated requests to
 retrieve repository information. At present, the implementation only
 supports fetching repository metadata. To add more functionality, extend
 the :meth:`run` method to handle different actions and endpoints.
+``requests`` is imported on first use, so importing the tool is cheap.
+
+Requests share one pooled :class:`requests.Session`, so lookups reuse
+TLS connections. Responses are kept in an SQLite cache together with
+their ``ETag`` / ``Last-Modified`` validators, and later requests for the
+same URL are conditional: an unchanged resource comes back as ``304 Not
+Modified``, which GitHub does not count against the rate limit. The
+``X-RateLimit-*`` headers of every response are tracked; when few
+requests remain the tool spreads the rest over the time left until the
+reset, and when none remain (or GitHub asks to back off with
+``Retry-After``) it waits, up to ``max_wait`` seconds, before sending.
 """
 
 from __future__ import annotations
 
-from typing import Any, Dict
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+from ._walk import CACHE_DIR_NAME
+
+API_URL = "https://api.github.com"
+
+
+class GitHubRateLimitError(RuntimeError):
+    """The rate limit is exhausted for longer than the tool may wait."""
+
+
+class ResponseCache:
+    """SQLite store of response bodies and their validators, keyed by URL."""
 
-import requests
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body TEXT NOT NULL, stored REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[Tuple[Optional[str], Optional[str], Any]]:
+        with self._lock:
+            row = self.conn.execute("SELECT etag, last_modified, body FROM responses WHERE key = ?", (key,)).fetchone()
+        return (row[0], row[1], json.loads(row[2])) if row else None
+
+    def put(self, key: str, etag: Optional[str], last_modified: Optional[str], body: Any) -> None:
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, etag, last_modified, body, stored) VALUES (?, ?, ?, ?, ?)",
+                (key, etag, last_modified, json.dumps(body), time.time()),
+            )
+
+    def close(self) -> None:
+        self.conn.close()
 
 
 class GitHubAPITool:
     """Interact with the GitHub REST API."""
 
-    def __init__(self, token: str) -> None:
+    def __init__(
+        self,
+        token: str,
+        base_url: str = API_URL,
+        cache_dir: Optional[Union[str, Path]] = None,
+        max_workers: int = 8,
+        timeout: float = 10.0,
+        min_remaining: int = 50,
+        max_wait: float = 60.0,
+    ) -> None:
         self.token = token
+        self.base_url = base_url.rstrip("/")
+        self.cache_dir = Path(cache_dir) if cache_dir else Path(CACHE_DIR_NAME) / "github_api"
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.min_remaining = min_remaining
+        self.max_wait = max_wait
+        self.stats = {"requests": 0, "not_modified": 0, "throttled_seconds": 0.0}
+        # Rate limit as last reported by GitHub (minus requests sent since).
+        self._remaining: Optional[int] = None
+        self._reset = 0.0
+        self._backoff_until = 0.0
+        self._lock = threading.Lock()
+        self._session: Any = None
+        self._cache: Optional[ResponseCache] = None
+        # The cache is per credential: responses differ with what the token may see.
+        self._key_prefix = hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+    # -- plumbing ----------------------------------------------------------
+
+    @property
+    def session(self) -> Any:
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers["Accept"] = "application/vnd.github+json"
+                if self.token:
+                    session.headers["Authorization"] = f"token {self.token}"
+                self._session = session
+            return self._session
+
+    @property
+    def cache(self) -> ResponseCache:
+        with self._lock:
+            if self._cache is None:
+                self._cache = ResponseCache(self.cache_dir / "responses.sqlite")
+            return self._cache
+
+    def close(self) -> None:
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+            if self._cache is not None:
+                self._cache.close()
+                self._cache = None
+
+    # -- rate limiting -----------------------------------------------------
+
+    def _delay(self) -> float:
+        """Reserve one request against the rate limit; return how long to wait first."""
+        with self._lock:
+            now = time.time()
+            delay = max(0.0, self._backoff_until - now)
+            if self._remaining is not None and self._reset > now:
+                if self._remaining <= 0:
+                    delay = max(delay, self._reset - now)
+                elif self._remaining < self.min_remaining:
+                    # Spread what is left evenly over the rest of the window.
+                    delay = max(delay, (self._reset - now) / self._remaining)
+                self._remaining -= 1
+            return delay
+
+    def _wait(self) -> None:
+        delay = self._delay()
+        if delay <= 0:
+            return
+        if delay > self.max_wait:
+            raise GitHubRateLimitError(f"GitHub rate limit exhausted; resets in {delay:.0f}s")
+        with self._lock:
+            self.stats["throttled_seconds"] += delay
+        time.sleep(delay)
+
+    def _observe(self, response: Any) -> None:
+        headers = response.headers
+        with self._lock:
+            if "X-RateLimit-Remaining" in headers and "X-RateLimit-Reset" in headers:
+                try:
+                    self._remaining = int(headers["X-RateLimit-Remaining"])
+                    self._reset = float(headers["X-RateLimit-Reset"])
+                except ValueError:
+                    pass
+            if response.status_code in (403, 429) and headers.get("Retry-After", "").isdigit():
+                self._backoff_until = time.time() + int(headers["Retry-After"])
+
+    @staticmethod
+    def _rate_limited(response: Any) -> bool:
+        if response.status_code == 429:
+            return True
+        return response.status_code == 403 and (
+            response.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in response.headers
+        )
+
+    # -- requests ----------------------------------------------------------
+
+    def get(self, path: str) -> Any:
+        """Return the decoded JSON at ``path`` (relative to the API root).
+
+        Uses the cached copy when GitHub reports it unchanged; raises for
+        HTTP errors and :class:`GitHubRateLimitError` when throttled for
+        longer than ``max_wait``.
+        """
+        url = path if path.startswith(("http://", "https://")) else f"{self.base_url}/{path.lstrip('/')}"
+        key = f"{self._key_prefix} {url}"
+        cached = self.cache.get(key)
+        headers = {}
+        if cached is not None:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        for attempt in range(2):
+            self._wait()
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            self._observe(response)
+            with self._lock:
+                self.stats["requests"] += 1
+            if attempt == 0 and self._rate_limited(response):
+                continue  # _wait() now holds us back until the limit allows a retry
+            break
+        if response.status_code == 304 and cached is not None:
+            with self._lock:
+                self.stats["not_modified"] += 1
+            return cached[2]
+        response.raise_for_status()
+        body = response.json()
+        etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self.cache.put(key, etag, last_modified, body)
+        return body
 
     def run(self, repo: str) -> Dict[str, Any]:
         """Return basic information about a GitHub repository.
@@ -28,12 +226,8 @@ class GitHubAPITool:
         case of an error (e.g. network failure), a dictionary with an
         ``error`` key is returned instead.
         """
-        url = f"https://api.github.com/repos/{repo}"
-        headers = {"Authorization": f"token {self.token}"} if self.token else {}
         try:
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = self.get(f"/repos/{repo}")
             return {
                 "full_name": data.get("full_name"),
                 "description": data.get("description"),
@@ -41,4 +235,12 @@ class GitHubAPITool:
                 "forks_count": data.get("forks_count"),
             }
         except Exception as exc:
-            return {"error": str(exc)}
\ No newline at end of file
+            return {"error": str(exc)}
+
+    def run_many(self, repos: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Look up several repositories concurrently; results keyed by repo."""
+        repos = list(dict.fromkeys(repos))
+        if not repos:
+            return {}
+        with ThreadPoolExecutor(min(self.max_workers, len(repos)), thread_name_prefix="github-api") as pool:
+            return dict(zip(repos, pool.map(self.run, repos)))
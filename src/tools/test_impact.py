@@ -0,0 +1,246 @@
+"""Test impact analysis.
+
+Running the whole test suite after every agent edit dominates the
+edit→verify loop. This module works out which test files can be affected
+by a set of changed files so that :class:`~src.tools.testing_tool.TestingTool`
+only runs those. Two sources of truth are combined:
+
+* a static import graph of the project's Python files, built with
+  :mod:`ast` and cached on disk so unchanged files are never reparsed;
+* optional per-test coverage data imported from a ``coverage.py`` data
+  file recorded with ``--cov-context=test``, which also catches
+  dependencies the import graph cannot see (data files, dynamic imports).
+
+The last outcome and duration of every test file are also persisted so
+that previously failing tests are always re-run and shards can be
+balanced by expected duration.
+"""
+
+from __future__ import annotations
+
+import ast
+import json
+import os
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from ..subprocess_runner import run
+from ._walk import CACHE_DIR_NAME, WORKTREE_POOL_DIR, iter_files
+
+# Changes to these files can alter the behaviour of any test.
+GLOBAL_FILES = {"pytest.ini", "pyproject.toml", "setup.cfg", "tox.ini", "setup.py", "requirements.txt"}
+
+
+def is_test_file(rel_path: str) -> bool:
+    name = rel_path.rsplit("/", 1)[-1]
+    return name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
+
+
+def _load_json(path: Path) -> Dict:
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_json(path: Path, data: Dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _module_names(rel_path: str) -> List[str]:
+    """Return the dotted module names ``rel_path`` may be imported as."""
+    parts = rel_path[:-3].split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    names = [".".join(parts)] if parts else []
+    # ``src`` layout: modules are importable both as ``src.pkg`` and ``pkg``.
+    if len(parts) > 1 and parts[0] == "src":
+        names.append(".".join(parts[1:]))
+    return names
+
+
+def _parse_imports(path: Path, rel_path: str) -> List[str]:
+    try:
+        tree = ast.parse(path.read_bytes(), filename=str(path))
+    except (SyntaxError, ValueError, OSError):
+        return []
+    package = rel_path[:-3].split("/")[:-1]
+    imports: List[str] = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base_parts = package[: len(package) - node.level + 1] if node.level > 1 else package
+                base = ".".join(base_parts)
+                module = f"{base}.{node.module}" if node.module else base
+            else:
+                module = node.module or ""
+            if module:
+                imports.append(module)
+                imports.extend(f"{module}.{alias.name}" for alias in node.names)
+    return imports
+
+
+class ImportGraph:
+    """Cached map from project files to the project files they import."""
+
+    def __init__(self, root: Path | str, cache_dir: Optional[Path | str] = None) -> None:
+        self.root = Path(root)
+        self.cache_path = Path(cache_dir or self.root / CACHE_DIR_NAME / "test_impact") / "import_graph.json"
+        self.edges: Dict[str, Set[str]] = {}
+        self.files: Set[str] = set()
+
+    def build(self) -> "ImportGraph":
+        """(Re)build the graph, reparsing only files whose stamp changed."""
+        cached = _load_json(self.cache_path)
+        entries: Dict[str, Dict] = {}
+        for rel, dir_entry in iter_files(self.root, (".py",), skip_paths=(WORKTREE_POOL_DIR,)):
+            st = dir_entry.stat()
+            stamp = [st.st_mtime_ns, st.st_size]
+            entry = cached.get(rel)
+            if not entry or entry.get("stamp") != stamp:
+                entry = {"stamp": stamp, "imports": _parse_imports(self.root / rel, rel)}
+            entries[rel] = entry
+        if entries != cached:
+            _save_json(self.cache_path, entries)
+
+        modules: Dict[str, str] = {}
+        for rel in entries:
+            for name in _module_names(rel):
+                modules[name] = rel
+        self.files = set(entries)
+        self.edges = {}
+        for rel, entry in entries.items():
+            deps = {modules[name] for name in entry["imports"] if name in modules}
+            deps.discard(rel)
+            self.edges[rel] = deps
+        return self
+
+    def dependents(self, changed: Iterable[str]) -> Set[str]:
+        """Return every file that transitively imports one of ``changed``."""
+        reverse: Dict[str, Set[str]] = {}
+        for src, deps in self.edges.items():
+            for dep in deps:
+                reverse.setdefault(dep, set()).add(src)
+        seen = set(changed)
+        queue = deque(seen)
+        while queue:
+            for importer in reverse.get(queue.popleft(), ()):
+                if importer not in seen:
+                    seen.add(importer)
+                    queue.append(importer)
+        return seen
+
+
+def load_coverage_map(data_file: Path | str, root: Path | str) -> Dict[str, Set[str]]:
+    """Return ``{source file: {test files}}`` from a coverage.py data file.
+
+    The data must have been recorded with per-test contexts (e.g.
+    ``pytest --cov --cov-context=test``). ``coverage`` is an optional
+    dependency; an empty map is returned when it is not installed.
+    """
+    try:
+        from coverage import CoverageData  # type: ignore
+    except ImportError:
+        return {}
+    root = Path(root).resolve()
+    data = CoverageData(basename=str(data_file))
+    data.read()
+    mapping: Dict[str, Set[str]] = {}
+    for measured in data.measured_files():
+        try:
+            rel = Path(measured).resolve().relative_to(root).as_posix()
+        except ValueError:
+            continue
+        tests = mapping.setdefault(rel, set())
+        for contexts in data.contexts_by_lineno(measured).values():
+            for context in contexts:
+                test_file = context.split("::", 1)[0]
+                if is_test_file(test_file):
+                    tests.add(test_file)
+    return mapping
+
+
+class TestImpactAnalyzer:
+    """Select the test files affected by a change set."""
+
+    __test__ = False  # not a pytest test class despite the name
+
+    def __init__(self, root: Path | str, cache_dir: Optional[Path | str] = None) -> None:
+        self.root = Path(root)
+        self.cache_dir = Path(cache_dir or self.root / CACHE_DIR_NAME / "test_impact")
+        self.graph = ImportGraph(self.root, self.cache_dir)
+        self.results_path = self.cache_dir / "last_results.json"
+        self.coverage_path = self.cache_dir / "coverage_map.json"
+
+    def changed_files(self, base: str = "main") -> List[str]:
+        """Return files changed relative to the merge base with ``base``.
+
+        Committed, staged, unstaged and untracked changes are all included.
+        """
+        merge_base = run(["git", "merge-base", base, "HEAD"], cwd=self.root, timeout=60)
+        ref = merge_base.stdout.strip() if merge_base.returncode == 0 else base
+        diff = run(["git", "diff", "--name-only", ref], cwd=self.root, timeout=60, check=True)
+        untracked = run(["git", "ls-files", "--others", "--exclude-standard"], cwd=self.root, timeout=60)
+        names = set(diff.stdout.split("\n")) | set(untracked.stdout.split("\n"))
+        return sorted(n for n in names if n)
+
+    def import_coverage(self, data_file: Path | str) -> int:
+        """Persist a per-test coverage map from a coverage.py data file."""
+        mapping = load_coverage_map(data_file, self.root)
+        _save_json(self.coverage_path, {k: sorted(v) for k, v in mapping.items()})
+        return len(mapping)
+
+    def last_results(self) -> Dict[str, Dict]:
+        return _load_json(self.results_path)
+
+    def record_results(self, results: Dict[str, Dict]) -> None:
+        merged = self.last_results()
+        merged.update(results)
+        _save_json(self.results_path, merged)
+
+    def select(self, changed: Iterable[str]) -> Optional[List[str]]:
+        """Return the affected test files, or ``None`` to run everything.
+
+        ``None`` is returned when a change touches global test
+        configuration. Test files that failed last time are always
+        included. The result is ordered failures first, then slowest first.
+        """
+        changed = list(changed)
+        if any(c.rsplit("/", 1)[-1] in GLOBAL_FILES for c in changed):
+            return None
+        self.graph.build()
+        selected = {f for f in self.graph.dependents(c for c in changed if c.endswith(".py")) if is_test_file(f)}
+        for c in changed:
+            if c.rsplit("/", 1)[-1] == "conftest.py":
+                prefix = c[: -len("conftest.py")]
+                selected.update(f for f in self.graph.files if is_test_file(f) and f.startswith(prefix))
+        coverage = _load_json(self.coverage_path)
+        for c in changed:
+            selected.update(coverage.get(c, ()))
+        last = self.last_results()
+        selected.update(f for f, r in last.items() if r.get("status") == "failed")
+        existing = [f for f in selected if (self.root / f).is_file()]
+        return sorted(
+            existing,
+            key=lambda f: (last.get(f, {}).get("status") != "failed", -last.get(f, {}).get("duration", 0.0), f),
+        )
+
+
+def shard(test_files: List[str], workers: int, durations: Dict[str, float]) -> List[List[str]]:
+    """Split ``test_files`` into at most ``workers`` shards of similar duration."""
+    workers = max(1, min(workers, len(test_files)))
+    shards: List[List[str]] = [[] for _ in range(workers)]
+    loads = [0.0] * workers
+    for f in sorted(test_files, key=lambda f: -durations.get(f, 1.0)):
+        i = loads.index(min(loads))
+        shards[i].append(f)
+        loads[i] += durations.get(f, 1.0)
+    return [s for s in shards if s]
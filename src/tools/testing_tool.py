@@ -4,37 +4,151 @@ This tool runs a test suite using ``pytest``. It is a simple wrapper
 around the ``pytest`` command executed in a subprocess. The stub
 implementation runs ``pytest -q`` and returns the exit code and
 captured output.
+
+Output is streamed through :mod:`src.subprocess_runner`, so callers can
+follow progress live and a runaway test run cannot exhaust memory.
+
+:meth:`TestingTool.run_affected` offers a selective mode: it uses
+:mod:`src.tools.test_impact` to pick only the test files affected by the
+changes since the lane base and spreads them across parallel pytest
+processes.
 """
 
 from __future__ import annotations
 
-import subprocess
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict
+from typing import Any, Dict, List, Optional
+
+from ..subprocess_runner import DEFAULT_MAX_OUTPUT_BYTES, LineCallback, ProcessResult, run
+from .test_impact import TestImpactAnalyzer, shard
 
 
 class TestingTool:
     """Run the project's test suite using pytest."""
 
-    def __init__(self, project_root: Path | str = ".") -> None:
+    def __init__(
+        self,
+        project_root: Path | str = ".",
+        timeout: Optional[float] = 1800.0,
+        max_output_bytes: int = DEFAULT_MAX_OUTPUT_BYTES,
+    ) -> None:
         self.project_root = Path(project_root)
+        self.timeout = timeout
+        self.max_output_bytes = max_output_bytes
+        self.impact = TestImpactAnalyzer(self.project_root)
 
-    def run(self) -> Dict[str, str]:
-        """Execute ``pytest -q`` in the project root and return the results."""
-        try:
-            result = subprocess.run(
-                ["pytest", "-q"],
-                cwd=self.project_root,
-                capture_output=True,
-                text=True,
-                check=True,
-            )
+    def run(self, on_output: Optional[LineCallback] = None) -> Dict[str, str]:
+        """Execute ``pytest -q`` in the project root and return the results.
+
+        ``on_output`` receives each line of pytest output as it is printed.
+        A run exceeding ``timeout`` is killed (including any subprocesses
+        it started) and reported with status ``"timeout"``.
+        """
+        result = run(
+            ["pytest", "-q"],
+            cwd=self.project_root,
+            timeout=self.timeout,
+            on_stdout=on_output,
+            on_stderr=on_output,
+            max_output_bytes=self.max_output_bytes,
+        )
+        if result.timed_out:
+            return {
+                "status": "timeout",
+                "output": result.stdout + result.stderr,
+            }
+        if result.returncode == 0:
             return {
                 "status": "success",
                 "output": result.stdout,
             }
-        except subprocess.CalledProcessError as exc:
-            return {
-                "status": "failure",
-                "output": exc.stdout + exc.stderr,
-            }
\ No newline at end of file
+        return {
+            "status": "failure",
+            "output": result.stdout + result.stderr,
+        }
+
+    def run_affected(
+        self,
+        base: str = "main",
+        workers: Optional[int] = None,
+        on_output: Optional[LineCallback] = None,
+    ) -> Dict[str, Any]:
+        """Run only the tests affected by changes since ``base``.
+
+        Changed files are taken from ``git diff`` against the merge base
+        with ``base``. The selected test files are split into ``workers``
+        shards (default: CPU count) of similar expected duration, each run
+        by its own pytest process. Per-file outcomes are persisted so the
+        next run re-checks previous failures first. When the change set
+        touches global test configuration the whole suite is run instead.
+        """
+        changed = self.impact.changed_files(base)
+        selected = self.impact.select(changed)
+        if selected is None:
+            result = self.run(on_output=on_output)
+            return {**result, "changed": changed, "selected": None}
+        if not selected:
+            return {"status": "success", "output": "no affected tests", "changed": changed, "selected": []}
+
+        last = self.impact.last_results()
+        durations = {f: r.get("duration", 1.0) for f, r in last.items()}
+        shards = shard(selected, workers or os.cpu_count() or 1, durations)
+        with tempfile.TemporaryDirectory() as tmp, ThreadPoolExecutor(len(shards)) as pool:
+            reports = [Path(tmp) / f"shard-{i}.xml" for i in range(len(shards))]
+            runs = list(pool.map(
+                lambda args: self._run_shard(*args, on_output=on_output),
+                zip(shards, reports),
+            ))
+            outcomes: Dict[str, Dict[str, Any]] = {}
+            for files, report, result in zip(shards, reports, runs):
+                outcomes.update(self._file_outcomes(files, report, result))
+        self.impact.record_results(outcomes)
+
+        output = "".join(r.stdout + r.stderr for r in runs)
+        if any(r.timed_out for r in runs):
+            status = "timeout"
+        elif all(r.returncode in (0, 5) for r in runs):  # 5: the shard collected no tests
+            status = "success"
+        else:
+            status = "failure"
+        return {"status": status, "output": output, "changed": changed, "selected": selected, "results": outcomes}
+
+    def _run_shard(self, files: List[str], report: Path, on_output: Optional[LineCallback] = None) -> ProcessResult:
+        return run(
+            ["pytest", "-q", f"--junitxml={report}", *files],
+            cwd=self.project_root,
+            timeout=self.timeout,
+            on_stdout=on_output,
+            on_stderr=on_output,
+            max_output_bytes=self.max_output_bytes,
+        )
+
+    @staticmethod
+    def _file_outcomes(files: List[str], report: Path, result: ProcessResult) -> Dict[str, Dict[str, Any]]:
+        """Derive per-file status and duration from a shard's JUnit report."""
+        # pytest exit code 5 means "no tests collected", which is not a failure.
+        default = "passed" if result.returncode in (0, 5) else "failed"
+        outcomes = {f: {"status": default, "duration": 0.0} for f in files}
+        try:
+            cases = ET.parse(report).getroot().iter("testcase")
+        except (OSError, ET.ParseError):
+            return outcomes
+        modules = {f[:-3].replace("/", "."): f for f in files}
+        for outcome in outcomes.values():
+            outcome["status"] = "passed"
+        for case in cases:
+            # Collection errors are reported with the module as the name.
+            classname = case.get("classname") or case.get("name", "")
+            while classname and classname not in modules:
+                classname = classname.rpartition(".")[0]
+            if not classname:
+                continue
+            outcome = outcomes[modules[classname]]
+            outcome["duration"] += float(case.get("time", 0.0) or 0.0)
+            if case.find("failure") is not None or case.find("error") is not None:
+                outcome["status"] = "failed"
+        return outcomes
@@ -1,26 +1,331 @@
 """Web search tool.
 
-This tool performs a simple web search. In the current stub
-implementation, it returns an empty result list. Replace the body of
-``run`` with a call to your preferred search API (e.g., DuckDuckGo or
-Google Custom Search). Be mindful of rate limits and API keys when
-implementing a real search.
+Queries are sent to one or more search *backends* at once (subclasses
+of :class:`SearchBackend` with a ``name`` and a ``search(query, limit)``
+method returning :class:`SearchResult` objects; :class:`DuckDuckGoBackend`
+is the default). Backends answering within ``timeout`` seconds are merged with
+reciprocal rank fusion, so links several backends agree on rank first,
+and duplicates are removed by normalised URL (scheme and ``www.``
+ignored, tracking parameters and fragments dropped). A failing or slow
+backend only loses its own results. A call's timeout starts when it
+leaves the shared thread pool's queue, so concurrent searches do not
+time each other out; a backend with :data:`MAX_LATE_CALLS` calls still
+running past their timeout is treated as hung and skipped until they
+return, so it cannot tie up the pool.
+
+Agents send many overlapping queries, so results are cached by
+*normalised* query – case, Unicode form, punctuation and spacing do not
+matter, while word order does – in memory and in an SQLite file under ``.agentic_cache``,
+both expiring after ``ttl`` seconds. Identical queries issued while one
+is in flight wait for it instead of searching again. Only complete
+answers (every backend responded) are cached.
 """
 
 from __future__ import annotations
 
-from typing import List
+import json
+import re
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from ._walk import CACHE_DIR_NAME
+
+# Reciprocal rank fusion constant; 60 is the customary value.
+_RRF_K = 60
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|ref|ref_src)$")
+_WORD = re.compile(r"[\w+#.-]+")
+# Timed-out calls a backend may have outstanding before it is skipped.
+MAX_LATE_CALLS = 2
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    """One search hit."""
+
+    url: str
+    title: str = ""
+    snippet: str = ""
+    source: str = ""
+
+
+class SearchBackend(ABC):
+    """Interface of a search backend; subclasses implement :meth:`search`."""
+
+    name = "backend"
+
+    @abstractmethod
+    def search(self, query: str, limit: int) -> List[SearchResult]:
+        """Return up to ``limit`` results for ``query``, best first."""
+
+
+class DuckDuckGoBackend(SearchBackend):
+    """DuckDuckGo Instant Answer API (no API key needed)."""
+
+    name = "duckduckgo"
+    url = "https://api.duckduckgo.com/"
+
+    def __init__(self, timeout: float = 5.0) -> None:
+        self.timeout = timeout
+        self._session: Any = None
+        self._lock = threading.Lock()
+
+    def _get_session(self) -> Any:
+        with self._lock:
+            if self._session is None:
+                import requests
+
+                self._session = requests.Session()
+            return self._session
+
+    def search(self, query: str, limit: int) -> List[SearchResult]:
+        params = {"q": query, "format": "json", "no_html": "1", "skip_disambig": "1"}
+        response = self._get_session().get(self.url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        results: List[SearchResult] = []
+        if data.get("AbstractURL"):
+            results.append(SearchResult(data["AbstractURL"], data.get("Heading", ""), data.get("AbstractText", ""), self.name))
+        topics = list(data.get("RelatedTopics", []))
+        while topics and len(results) < limit:
+            topic = topics.pop(0)
+            if "Topics" in topic:  # a group of topics
+                topics[:0] = topic["Topics"]
+            elif topic.get("FirstURL"):
+                text = topic.get("Text", "")
+                results.append(SearchResult(topic["FirstURL"], text.split(" - ")[0], text, self.name))
+        return results[:limit]
+
+
+def normalize_query(query: str) -> str:
+    """Reduce ``query`` to a canonical form used as the cache key."""
+    text = unicodedata.normalize("NFKC", query).casefold()
+    words = (w.strip(".-") for w in _WORD.findall(text))
+    return " ".join(w for w in words if w)
+
+
+def normalize_url(url: str) -> str:
+    """Return the form of ``url`` used to spot duplicate results."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if not _TRACKING_PARAMS.match(k)))
+    return urlunsplit(("", host, parts.path.rstrip("/") or "/", query, ""))
+
+
+def merge_results(ranked: Sequence[List[SearchResult]], limit: int) -> List[SearchResult]:
+    """Fuse per-backend rankings and drop duplicate URLs."""
+    scores: Dict[str, float] = {}
+    first: Dict[str, SearchResult] = {}
+    for results in ranked:
+        seen = set()
+        for rank, result in enumerate(results):
+            key = normalize_url(result.url)
+            if key in seen:
+                continue
+            seen.add(key)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (_RRF_K + rank + 1)
+            first.setdefault(key, result)
+    # Ties keep first-seen order (backend order, then rank).
+    order = sorted(scores, key=lambda k: -scores[k])
+    return [first[key] for key in order[:limit]]
+
+
+class ResultCache:
+    """Search results by cache key: an LRU in memory over an SQLite file."""
+
+    def __init__(self, path: Optional[Path], ttl: float, max_entries: int = 1024) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, Tuple[float, List[SearchResult]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.conn: Optional[sqlite3.Connection] = None
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, results TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+
+    def _remember(self, key: str, expires: float, results: List[SearchResult]) -> None:
+        self._memory[key] = (expires, results)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[List[SearchResult]]:
+        now = time.time()
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None:
+                if hit[0] > now:
+                    self._memory.move_to_end(key)
+                    return hit[1]
+                del self._memory[key]
+            if self.conn is None:
+                return None
+            row = self.conn.execute("SELECT results, expires FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] <= now:
+                return None
+            results = [SearchResult(**item) for item in json.loads(row[0])]
+            self._remember(key, row[1], results)
+            return results
+
+    def put(self, key: str, results: List[SearchResult]) -> None:
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, expires, results)
+            if self.conn is not None:
+                with self.conn:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO results (key, results, expires) VALUES (?, ?, ?)",
+                        (key, json.dumps([asdict(r) for r in results]), expires),
+                    )
+                    self.conn.execute("DELETE FROM results WHERE expires <= ?", (time.time(),))
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
 
 
 class WebSearchTool:
     """Perform a web search for a given query string."""
 
+    def __init__(
+        self,
+        backends: Optional[Sequence[SearchBackend]] = None,
+        cache_dir: Optional[Union[str, Path]] = None,
+        ttl: float = 3600.0,
+        timeout: float = 5.0,
+        max_results: int = 10,
+        persist: bool = True,
+    ) -> None:
+        self.backends = list(backends) if backends is not None else [DuckDuckGoBackend(timeout)]
+        self.timeout = timeout
+        self.max_results = max_results
+        directory = Path(cache_dir) if cache_dir else Path(CACHE_DIR_NAME) / "web_search"
+        self.cache = ResultCache(directory / "results.sqlite" if persist else None, ttl)
+        self.stats = {
+            "searches": 0,
+            "cache_hits": 0,
+            "shared": 0,
+            "backend_errors": 0,
+            "backend_timeouts": 0,
+            "backend_skipped": 0,
+        }
+        # Room for every backend's late calls plus two rounds of fresh ones.
+        self._pool = ThreadPoolExecutor(
+            max(4, (MAX_LATE_CALLS + 2) * len(self.backends)), thread_name_prefix="web-search"
+        )
+        self._late: Dict[int, int] = {}
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, query: str, limit: int) -> str:
+        return f"{normalize_query(query)}|{limit}|{','.join(b.name for b in self.backends)}"
+
+    def _count(self, stat: str, n: int = 1) -> None:
+        with self._lock:
+            self.stats[stat] += n
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[SearchResult]:
+        """Return merged, de-duplicated results for ``query``."""
+        limit = limit or self.max_results
+        key = self._key(query, limit)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._count("cache_hits")
+            return cached
+        with self._lock:
+            pending = self._in_flight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._in_flight[key] = Future()
+        if not owner:
+            self._count("shared")
+            return pending.result()
+        try:
+            results = self._fan_out(query, limit, key)
+            pending.set_result(results)
+            return results
+        except BaseException as exc:
+            pending.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def _fan_out(self, query: str, limit: int, key: str) -> List[SearchResult]:
+        self._count("searches")
+        with self._lock:
+            hung = {i for i in range(len(self.backends)) if self._late.get(i, 0) >= MAX_LATE_CALLS}
+        started: Dict[int, float] = {}
+        running = {i: threading.Event() for i in range(len(self.backends)) if i not in hung}
+
+        def call(i: int) -> List[SearchResult]:
+            started[i] = time.monotonic()
+            running[i].set()
+            return self.backends[i].search(query, limit)
+
+        futures = {i: self._pool.submit(call, i) for i in running}
+        if hung:
+            self._count("backend_skipped", len(hung))
+        ranked: List[List[SearchResult]] = []
+        complete = not hung
+        for i, future in futures.items():
+            backend = self.backends[i]
+            # A call queued behind other searches is only timed once it runs.
+            running[i].wait()
+            done, _ = wait([future], timeout=max(0.0, started[i] + self.timeout - time.monotonic()))
+            if not done:
+                self._count("backend_timeouts")
+                self._track_late(i, future)
+                complete = False
+                continue
+            try:
+                found = future.result()
+            except Exception:  # one failing backend must not fail the search
+                self._count("backend_errors")
+                complete = False
+                continue
+            ranked.append([r if r.source else SearchResult(r.url, r.title, r.snippet, backend.name) for r in found])
+        results = merge_results(ranked, limit)
+        if complete:
+            self.cache.put(key, results)
+        return results
+
+    def _track_late(self, index: int, future: Future) -> None:
+        with self._lock:
+            self._late[index] = self._late.get(index, 0) + 1
+
+        def finished(_: Future) -> None:
+            with self._lock:
+                self._late[index] -= 1
+
+        future.add_done_callback(finished)
+
+    def search_many(self, queries: Iterable[str], limit: Optional[int] = None) -> Dict[str, List[SearchResult]]:
+        """Search several queries concurrently; results keyed by query."""
+        queries = list(dict.fromkeys(queries))
+        if not queries:
+            return {}
+        with ThreadPoolExecutor(min(8, len(queries)), thread_name_prefix="web-search-many") as pool:
+            return dict(zip(queries, pool.map(lambda q: self.search(q, limit), queries)))
+
     def run(self, query: str) -> List[str]:
-        """Execute a search for ``query`` and return a list of results.
-
-        This stub implementation returns an empty list. A real
-        implementation would call an external API and return a list of
-        relevant snippets or links.
-        """
-        # TODO: Implement web search using an external API.
-        return []
\ No newline at end of file
+        """Execute a search for ``query`` and return a list of result links."""
+        return [result.url for result in self.search(query)]
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
+        self.cache.close()
@@ -0,0 +1,230 @@
+"""Token-budgeted context assembly.
+
+Tasks reach the service clients with whatever prompt the caller built, and
+cost grows with every oversized context. This module provides the context
+stage used by :class:`~src.workflow.engine.LangGraphWorkflowEngine`:
+candidate chunks (whole files, document chunks from
+:class:`~src.tools.doc_reader.DocumentReaderTool` or symbols reported by
+:class:`~src.tools.code_analyzer.CodeAnalyzerTool`) are ranked against the
+task prompt and packed greedily into the token budget of the target
+service.
+
+Packing has to stay cheap on large repositories, so ranking relies on
+C-level substring counts rather than tokenisation, and token counts are
+cached by content hash. ``tiktoken`` is used for counting when it is
+installed; otherwise a characters-per-token estimate is used.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterable, List, Mapping, Optional
+
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+_CAMEL = re.compile(r"[A-Z]?[a-z0-9]+|[A-Z]+(?![a-z])")
+_STOPWORDS = {"the", "and", "for", "with", "that", "this", "from", "into", "are", "was", "use", "not", "you"}
+
+
+@dataclass
+class ContextChunk:
+    """A candidate piece of context."""
+
+    source: str
+    text: str
+    start_line: Optional[int] = None
+    end_line: Optional[int] = None
+    prior: float = 0.0
+    score: float = 0.0
+    tokens: int = 0
+
+
+@dataclass
+class PackedContext:
+    """Chunks selected for a prompt and the budget they consumed."""
+
+    chunks: List[ContextChunk] = field(default_factory=list)
+    tokens: int = 0
+    budget: int = 0
+    dropped: int = 0
+
+    def render(self) -> str:
+        parts = []
+        for chunk in self.chunks:
+            where = chunk.source
+            if chunk.start_line is not None:
+                where += f" (lines {chunk.start_line}-{chunk.end_line})"
+            parts.append(f"### {where}\n```\n{chunk.text.rstrip()}\n```")
+        return "\n\n".join(parts)
+
+
+class TokenCounter:
+    """Count tokens, caching results by content hash."""
+
+    def __init__(self, max_entries: int = 100_000, chars_per_token: float = 4.0) -> None:
+        self.max_entries = max_entries
+        self.chars_per_token = chars_per_token
+        self._cache: "OrderedDict[bytes, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._encode: Optional[Callable[[str], List[int]]] = None
+        try:
+            import tiktoken  # type: ignore
+
+            self._encode = tiktoken.get_encoding("cl100k_base").encode
+        except Exception:  # optional dependency, or encoding download failure
+            self._encode = None
+
+    def _count(self, text: str) -> int:
+        if self._encode is not None:
+            return len(self._encode(text))
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def count(self, text: str) -> int:
+        key = hashlib.blake2b(text.encode("utf-8", errors="replace"), digest_size=16).digest()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+        tokens = self._count(text)
+        with self._lock:
+            self._cache[key] = tokens
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return tokens
+
+
+def query_terms(text: str) -> List[str]:
+    """Split ``text`` into lower-case search terms, including identifier parts."""
+    terms = set()
+    for word in _WORD.findall(text):
+        lower = word.lower()
+        if lower not in _STOPWORDS:
+            terms.add(lower)
+        for part in _CAMEL.findall(word.replace("_", " ")):
+            if len(part) > 2 and part.lower() not in _STOPWORDS:
+                terms.add(part.lower())
+    return sorted(terms)
+
+
+class ContextPacker:
+    """Rank candidate chunks and pack them into a per-service token budget."""
+
+    def __init__(
+        self,
+        budgets: Optional[Mapping[str, int]] = None,
+        default_budget: int = 8000,
+        counter: Optional[TokenCounter] = None,
+    ) -> None:
+        self.budgets = dict(budgets or {})
+        self.default_budget = default_budget
+        self.counter = counter or TokenCounter()
+
+    def budget_for(self, service: str) -> int:
+        return self.budgets.get(service, self.default_budget)
+
+    def rank(self, query: str, chunks: List[ContextChunk]) -> List[ContextChunk]:
+        """Score ``chunks`` by BM25-style term overlap with ``query``."""
+        terms = query_terms(query)
+        lowered = [c.text.lower() for c in chunks]
+        n = len(chunks) or 1
+        idf = {}
+        for term in terms:
+            df = sum(1 for text in lowered if term in text)
+            idf[term] = math.log(1 + (n - df + 0.5) / (df + 0.5)) if df else 0.0
+        avg_len = sum(len(t) for t in lowered) / n or 1.0
+        for chunk, text in zip(chunks, lowered):
+            norm = 1.2 * (0.25 + 0.75 * len(text) / avg_len)
+            score = chunk.prior
+            source = chunk.source.lower()
+            for term, weight in idf.items():
+                if not weight:
+                    continue
+                tf = text.count(term)
+                if tf:
+                    score += weight * tf * 2.2 / (tf + norm)
+                if term in source:
+                    score += weight
+            chunk.score = score
+        return sorted(chunks, key=lambda c: c.score, reverse=True)
+
+    def pack(self, query: str, chunks: Iterable[ContextChunk], budget: int) -> PackedContext:
+        """Greedily fill ``budget`` tokens with the highest-scoring chunks.
+
+        Chunks with no relevance to ``query`` (score of zero) are never
+        included. A chunk that does not fit is skipped so that smaller,
+        lower-ranked chunks can still use the remaining budget.
+        """
+        ranked = self.rank(query, list(chunks))
+        packed = PackedContext(budget=budget)
+        for chunk in ranked:
+            if chunk.score <= 0:
+                packed.dropped += 1
+                continue
+            chunk.tokens = self.counter.count(chunk.text)
+            if packed.tokens + chunk.tokens > budget:
+                packed.dropped += 1
+                continue
+            packed.chunks.append(chunk)
+            packed.tokens += chunk.tokens
+        return packed
+
+
+def chunks_from_files(
+    paths: Iterable[str],
+    reader: Any = None,
+    chunk_size: int = 8 * 1024,
+) -> List[ContextChunk]:
+    """Split documents into paragraph-aware chunks via ``DocumentReaderTool``."""
+    if reader is None:
+        from ..tools.doc_reader import DocumentReaderTool
+
+        reader = DocumentReaderTool()
+    chunks = []
+    for path in paths:
+        try:
+            for piece in reader.iter_chunks(path, chunk_size=chunk_size, paragraphs=True):
+                chunks.append(ContextChunk(source=str(path), text=piece["text"]))
+        except OSError:
+            continue
+    return chunks
+
+
+def chunks_from_analysis(
+    analysis: Mapping[str, Any],
+    root: Path | str,
+    reader: Any = None,
+) -> List[ContextChunk]:
+    """Turn ``CodeAnalyzerTool.analyze_repository`` output into symbol chunks.
+
+    Each top-level function or class becomes one chunk. Nested symbols are
+    covered by their enclosing chunk and are not emitted separately.
+    """
+    if reader is None:
+        from ..tools.doc_reader import DocumentReaderTool
+
+        reader = DocumentReaderTool()
+    chunks = []
+    for rel, info in analysis.get("files", {}).items():
+        path = Path(root) / rel
+        for symbol in info.get("symbols", []):
+            if "." in symbol["name"]:
+                continue
+            try:
+                text = reader.read_lines(path, symbol["line"] - 1, symbol["end_line"])
+            except OSError:
+                continue
+            chunks.append(
+                ContextChunk(
+                    source=rel,
+                    text=text,
+                    start_line=symbol["line"],
+                    end_line=symbol["end_line"],
+                )
+            )
+    return chunks
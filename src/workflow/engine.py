@@ -6,15 +6,22 @@ LangGraph but does not implement a full state machine. Instead, it
 provides a simple interface to execute a task in a single step. When
 integrating a real workflow engine, extend this class with proper
 state transitions and error handling.
+
+Before dispatch, tasks that carry candidate context (``context_files``,
+``context_chunks`` or ``context_analysis``) go through a context stage:
+the candidates are ranked against the prompt and packed into the token
+budget of the target service by :class:`~src.workflow.context.ContextPacker`,
+and the packed context is prepended to the prompt.
 """
 
 from __future__ import annotations
 
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
 from ..quota import QuotaManager, QuotaExceededError
 from ..service_router import CostOptimizedServiceRouter
 from ..db.manager import DatabaseManager
+from .context import ContextChunk, ContextPacker, chunks_from_analysis, chunks_from_files
 
 
 class LangGraphWorkflowEngine:
@@ -25,10 +32,56 @@ class LangGraphWorkflowEngine:
         service_router: CostOptimizedServiceRouter,
         quota_manager: QuotaManager,
         db_manager: DatabaseManager,
+        context_packer: Optional[ContextPacker] = None,
     ) -> None:
         self.service_router = service_router
         self.quota_manager = quota_manager
         self.db_manager = db_manager
+        if context_packer is None:
+            settings = service_router.settings
+            context_packer = ContextPacker(settings.context_token_budgets, settings.context_default_budget)
+        self.context_packer = context_packer
+
+    def _assemble_context(self, task_context: Dict[str, Any]) -> Dict[str, Any]:
+        """Return ``task_context`` with packed candidate context in the prompt.
+
+        Candidates are taken from ``context_chunks`` (``ContextChunk``
+        objects or ``{"source", "text"}`` dicts), ``context_files`` (paths
+        split into chunks) and ``context_analysis`` (the output of
+        ``CodeAnalyzerTool.analyze_repository`` with ``context_root``). The
+        budget for the service is reduced by the prompt's own tokens unless
+        ``context_budget`` is given explicitly. Tasks without candidates are
+        returned unchanged.
+        """
+        candidates: List[ContextChunk] = []
+        for chunk in task_context.get("context_chunks") or []:
+            candidates.append(chunk if isinstance(chunk, ContextChunk) else ContextChunk(**chunk))
+        if task_context.get("context_files"):
+            candidates.extend(chunks_from_files(task_context["context_files"]))
+        if task_context.get("context_analysis"):
+            root = task_context.get("context_root", ".")
+            candidates.extend(chunks_from_analysis(task_context["context_analysis"], root))
+        if not candidates:
+            return task_context
+
+        prompt = task_context.get("prompt", "")
+        budget = task_context.get("context_budget")
+        if budget is None:
+            service = task_context.get("service", "anthropic")
+            budget = self.context_packer.budget_for(service) - self.context_packer.counter.count(prompt)
+        packed = self.context_packer.pack(prompt, candidates, max(0, budget))
+        if not packed.chunks:
+            return task_context
+        return {
+            **task_context,
+            "prompt": f"{packed.render()}\n\n{prompt}",
+            "context_tokens": packed.tokens,
+            "context_sources": [c.source for c in packed.chunks],
+        }
+
+    def execute(self, task_context: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute one task; safe to call from several threads at once."""
+        return self._execute_task(task_context)
 
     def _execute_task(self, task_context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a single task and return the result.
@@ -38,6 +91,10 @@ class LangGraphWorkflowEngine:
         and returns the client’s result. Errors are propagated so that
         callers can implement retry logic or surface errors to users.
         """
+        # Resolve the service once (explicit, or from the routing config)
+        if not task_context.get("service"):
+            task_context = {**task_context, "service": self.service_router.service_for(task_context)}
+
         # Persist the execution as pending
         exec_id = self.db_manager.create_execution(
             task_id=task_context.get("task_id", "unknown"),
@@ -49,6 +106,9 @@ class LangGraphWorkflowEngine:
             estimated_cost = task_context.get("estimated_cost", 0.0)
             self.quota_manager.check_quota(estimated_cost)
 
+            # Pack candidate context into the service's token budget
+            task_context = self._assemble_context(task_context)
+
             # Select the client and execute the task
             client = self.service_router.select_client(task_context)
             result = client.execute_task(task_context)
@@ -0,0 +1,269 @@
+"""Priority- and deadline-aware task scheduling in front of the engine.
+
+Without a scheduler, tasks reach :class:`~src.workflow.engine.LangGraphWorkflowEngine`
+in whatever order callers send them, so an interactive request waits
+behind a bulk backfill. :class:`TaskScheduler` queues tasks and runs them
+on a fixed pool of workers:
+
+* every task belongs to a *priority class* (``interactive``, ``normal``
+  or ``batch``): an explicit ``priority`` in the task context, else the
+  ``priority`` of its lane in the framework config, else ``normal``.
+  Higher classes are always dequeued first;
+* inside a class, tasks run earliest deadline first (``deadline`` as an
+  epoch timestamp or ``deadline_in`` seconds from submission), and tasks
+  without a deadline after those with one, in arrival order;
+* the lowest class may occupy at most ``workers - 1`` workers by default,
+  so a long batch backlog never leaves an interactive task without a free
+  worker;
+* each class has a bounded queue. :meth:`TaskScheduler.submit` blocks
+  for space (backpressure) or, with ``block=False`` or after ``timeout``,
+  raises :class:`QueueFullError`;
+* a task that can no longer finish before its deadline – judged by its
+  ``estimated_seconds`` or the class's recent average run time – is shed
+  with :class:`DeadlineExceededError`, both on submission and again when
+  it is dequeued, before it reaches the engine or spends quota.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Mapping, Optional, Sequence, Tuple
+
+Executor = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+PRIORITY_CLASSES: Tuple[str, ...] = ("interactive", "normal", "batch")
+DEFAULT_QUEUE_LIMITS: Dict[str, int] = {"interactive": 64, "normal": 256, "batch": 1024}
+# Weight of the latest run in each class's average run time.
+_EWMA_ALPHA = 0.2
+
+
+class SchedulerError(RuntimeError):
+    """The scheduler cannot accept or run a task."""
+
+
+class QueueFullError(SchedulerError):
+    """The task's priority class has no queue space left."""
+
+
+class DeadlineExceededError(SchedulerError):
+    """The task cannot finish before its deadline and was not run."""
+
+
+@dataclass(order=True)
+class _Entry:
+    due: float  # monotonic deadline, ``inf`` for none
+    seq: int
+    task: Dict[str, Any] = field(compare=False)
+    future: Future = field(compare=False)
+    submitted: float = field(compare=False)
+
+
+class TaskScheduler:
+    """Run tasks through ``execute`` by priority class and deadline."""
+
+    def __init__(
+        self,
+        execute: Executor,
+        workers: int = 4,
+        classes: Sequence[str] = PRIORITY_CLASSES,
+        queue_limits: Optional[Mapping[str, int]] = None,
+        max_running: Optional[Mapping[str, int]] = None,
+        default_class: str = "normal",
+        config: Any = None,
+    ) -> None:
+        self.execute_task = execute
+        self.workers = max(1, workers)
+        self.classes = tuple(classes)
+        if default_class not in self.classes:
+            raise ValueError(f"default class {default_class!r} is not one of {self.classes}")
+        self.default_class = default_class
+        self.config = config
+        limits = {**DEFAULT_QUEUE_LIMITS, **(queue_limits or {})}
+        self.queue_limits = {c: max(1, int(limits.get(c, 256))) for c in self.classes}
+        caps = dict(max_running or {})
+        if len(self.classes) > 1 and self.workers > 1:
+            caps.setdefault(self.classes[-1], self.workers - 1)
+        self.max_running = {c: max(1, min(self.workers, caps.get(c, self.workers))) for c in self.classes}
+        self.stats = {c: {"submitted": 0, "completed": 0, "failed": 0, "shed": 0, "rejected": 0} for c in self.classes}
+        self._queues: Dict[str, List[_Entry]] = {c: [] for c in self.classes}
+        self._running = {c: 0 for c in self.classes}
+        self._avg_seconds: Dict[str, float] = {}
+        self._latencies: Dict[str, Deque[float]] = {c: deque(maxlen=1024) for c in self.classes}
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+
+    # -- classification ----------------------------------------------------
+
+    def priority_of(self, task: Mapping[str, Any]) -> str:
+        """Return the priority class of ``task``."""
+        priority = task.get("priority")
+        if priority is None and self.config is not None:
+            priority = self.config.current.priority_for(task.get("task_label"), task.get("lane"), task.get("branch"))
+        if priority is None:
+            return self.default_class
+        if priority not in self.stats:
+            raise ValueError(f"unknown priority class {priority!r}")
+        return priority
+
+    @staticmethod
+    def _due(task: Mapping[str, Any], deadline: Optional[float], now: float) -> float:
+        if deadline is None:
+            deadline = task.get("deadline")
+        if deadline is not None:
+            return now + (float(deadline) - time.time())
+        if task.get("deadline_in") is not None:
+            return now + float(task["deadline_in"])
+        return math.inf
+
+    def _estimate(self, cls: str, task: Mapping[str, Any]) -> float:
+        if task.get("estimated_seconds") is not None:
+            return float(task["estimated_seconds"])
+        return self._avg_seconds.get(cls, 0.0)
+
+    # -- submission --------------------------------------------------------
+
+    def submit(
+        self,
+        task: Dict[str, Any],
+        priority: Optional[str] = None,
+        deadline: Optional[float] = None,
+        block: bool = True,
+        timeout: Optional[float] = None,
+    ) -> Future:
+        """Queue ``task``; return a future for the engine's result.
+
+        ``deadline`` (an epoch timestamp) overrides the task's own. Raises
+        :class:`DeadlineExceededError` if the task cannot make its deadline
+        and :class:`QueueFullError` if its class has no space (at once
+        with ``block=False``, else after ``timeout`` seconds).
+        """
+        cls = priority or self.priority_of(task)
+        if cls not in self.stats:
+            raise ValueError(f"unknown priority class {cls!r}")
+        now = time.monotonic()
+        due = self._due(task, deadline, now)
+        future: Future = Future()
+        with self._cond:
+            if now + self._estimate(cls, task) > due:
+                self.stats[cls]["shed"] += 1
+                raise DeadlineExceededError(f"task {task.get('task_id')!r} cannot finish before its deadline")
+            queue = self._queues[cls]
+            give_up = None if timeout is None else now + timeout
+            while len(queue) >= self.queue_limits[cls] and not self._closed:
+                remaining = None if give_up is None else give_up - time.monotonic()
+                if not block or (remaining is not None and remaining <= 0):
+                    self.stats[cls]["rejected"] += 1
+                    raise QueueFullError(f"{cls} queue is full ({self.queue_limits[cls]} tasks)")
+                self._cond.wait(remaining)
+            if self._closed:
+                raise SchedulerError("scheduler is shut down")
+            heapq.heappush(queue, _Entry(due, next(self._seq), task, future, now))
+            self.stats[cls]["submitted"] += 1
+            self._start_workers()
+            self._cond.notify_all()
+        return future
+
+    def execute(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Submit ``task`` and wait for its result (an engine-style executor)."""
+        return self.submit(task).result()
+
+    # -- workers -----------------------------------------------------------
+
+    def _start_workers(self) -> None:
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"scheduler-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _next(self) -> Tuple[Optional[str], Optional[_Entry]]:
+        for cls in self.classes:
+            queue = self._queues[cls]
+            if queue and self._running[cls] < self.max_running[cls]:
+                return cls, heapq.heappop(queue)
+        return None, None
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                cls, entry = self._next()
+                while entry is None:
+                    if self._closed and not any(self._queues.values()):
+                        return
+                    self._cond.wait()
+                    cls, entry = self._next()
+                assert cls is not None
+                shed = time.monotonic() + self._estimate(cls, entry.task) > entry.due
+                if shed:
+                    self.stats[cls]["shed"] += 1
+                else:
+                    self._running[cls] += 1
+                self._cond.notify_all()  # queue space was freed
+            if not entry.future.set_running_or_notify_cancel():
+                if not shed:
+                    self._finish(cls, entry, None, ok=None)
+                continue
+            if shed:
+                entry.future.set_exception(
+                    DeadlineExceededError(f"task {entry.task.get('task_id')!r} missed its deadline while queued")
+                )
+                continue
+            start = time.monotonic()
+            try:
+                result = self.execute_task(entry.task)
+            except BaseException as exc:
+                self._finish(cls, entry, time.monotonic() - start, ok=False)
+                entry.future.set_exception(exc)
+            else:
+                self._finish(cls, entry, time.monotonic() - start, ok=True)
+                entry.future.set_result(result)
+
+    def _finish(self, cls: str, entry: _Entry, seconds: Optional[float], ok: Optional[bool]) -> None:
+        with self._cond:
+            self._running[cls] -= 1
+            if seconds is not None:
+                avg = self._avg_seconds.get(cls)
+                self._avg_seconds[cls] = seconds if avg is None else avg + _EWMA_ALPHA * (seconds - avg)
+                self._latencies[cls].append(time.monotonic() - entry.submitted)
+            if ok is not None:
+                self.stats[cls]["completed" if ok else "failed"] += 1
+            self._cond.notify_all()
+
+    # -- introspection and shutdown -----------------------------------------
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Per-class counters, queue depth, running tasks and latency p50/p95."""
+        with self._cond:
+            out = {}
+            for cls in self.classes:
+                latencies = sorted(self._latencies[cls])
+                out[cls] = {
+                    **self.stats[cls],
+                    "queued": len(self._queues[cls]),
+                    "running": self._running[cls],
+                    "p50": latencies[len(latencies) // 2] if latencies else None,
+                    "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None,
+                }
+            return out
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False) -> None:
+        """Stop accepting tasks; queued tasks still run unless cancelled."""
+        with self._cond:
+            self._closed = True
+            if cancel_pending:
+                for queue in self._queues.values():
+                    for entry in queue:
+                        entry.future.cancel()
+                    queue.clear()
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Load test for the drop server under gunicorn.
+
+Starts ``gunicorn server:app`` with 1, 2, 4 ... worker processes against a
+throwaway repository (a bare origin and a clone), fires ``/save`` requests
+from client threads spread over several branches, and prints requests per
+second for each worker count. After each run it waits for the mirror jobs
+and checks that every branch's history on the origin holds every file that
+was saved to it, i.e. that concurrent workers never lost or interleaved a
+same-branch commit.
+
+Usage::
+
+    python tests/load/drop_load.py --workers 1 2 4 --requests 400 --branches 8
+
+Request handling scales with processes only as far as there are cores;
+run it on a machine with at least as many CPUs as the largest worker count.
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def _git(cwd: Path, *args: str) -> str:
+    cmd = ["git", "-c", "user.name=load", "-c", "user.email=load@test", *args]
+    return subprocess.run(cmd, cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _make_repo(base: Path) -> Path:
+    origin = base / "origin.git"
+    _git(base, "init", "-q", "--bare", "-b", "main", str(origin))
+    repo = base / "repo"
+    _git(base, "clone", "-q", str(origin), str(repo))
+    (repo / "README.md").write_text("load\n", encoding="utf-8")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-qm", "init")
+    _git(repo, "push", "-q", "origin", "HEAD:main")
+    _git(repo, "config", "user.name", "load")
+    _git(repo, "config", "user.email", "load@test")
+    return repo
+
+
+def _start(base: Path, repo: Path, port: int, workers: int, threads: int, worktrees: bool) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        SAVE_BASE_DIR=str(base / "out"),
+        REPO_DIR=str(repo),
+        ALLOW_LOCALHOST_NO_TOKEN="1",
+        BRANCH_WORKTREES="1" if worktrees else "0",
+        MIRROR_DEBOUNCE="0.1",
+        PYTHONPATH=str(ROOT),
+    )
+    cmd = [
+        sys.executable, "-m", "gunicorn", "server:app",
+        "-b", f"127.0.0.1:{port}", "-w", str(workers), "--threads", str(threads),
+        "-k", "gthread", "--log-level", "warning",
+    ]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).ok:
+                return proc
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("gunicorn did not start")
+
+
+def _run_once(args: argparse.Namespace, workers: int) -> float:
+    base = Path(tempfile.mkdtemp(prefix="drop-load-"))
+    port = _free_port()
+    repo = _make_repo(base)
+    proc = _start(base, repo, port, workers, args.threads, not args.shared_tree)
+    url = f"http://127.0.0.1:{port}"
+    session = requests.Session()
+    payload = base64.b64encode(os.urandom(args.size)).decode("ascii")
+
+    def save(i: int) -> str:
+        body = {
+            "path": f"src/load/f{i}.bin",
+            "content_b64": payload,
+            "branch": f"lane/load-{i % args.branches}",
+            "message": f"load {i}",
+        }
+        resp = session.post(f"{url}/save", json=body, timeout=60)
+        resp.raise_for_status()
+        return resp.json()["job"]
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.clients) as pool:
+            jobs = list(pool.map(save, range(args.requests)))
+        elapsed = time.perf_counter() - start
+        deadline = time.monotonic() + 120
+        pending = set(jobs)
+        while pending and time.monotonic() < deadline:
+            for job in list(pending):
+                status = session.get(f"{url}/jobs/{job}", timeout=10).json()
+                if status.get("status") == "failed":
+                    raise AssertionError(f"job {job} failed: {status.get('error')}")
+                if status.get("status") == "done":
+                    pending.discard(job)
+            time.sleep(0.2)
+        if pending:
+            raise AssertionError(f"{len(pending)} jobs did not finish")
+        origin = base / "origin.git"
+        for b in range(args.branches):
+            listed = _git(origin, "ls-tree", "-r", "--name-only", f"lane/load-{b}", "src/load").split()
+            expected = {f"src/load/f{i}.bin" for i in range(b, args.requests, args.branches)}
+            if set(listed) != expected:
+                raise AssertionError(f"branch lane/load-{b} is missing {len(expected - set(listed))} files")
+        return args.requests / elapsed
+    finally:
+        session.close()
+        proc.terminate()
+        try:
+            proc.wait(30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+        shutil.rmtree(base, ignore_errors=True)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, default=4, help="gunicorn threads per worker")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent client threads")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--branches", type=int, default=8)
+    parser.add_argument("--size", type=int, default=16 * 1024, help="bytes per saved file")
+    parser.add_argument("--shared-tree", action="store_true", help="one checkout under a repo lock instead of worktrees")
+    args = parser.parse_args()
+
+    print(f"cpus={os.cpu_count()} requests={args.requests} branches={args.branches} size={args.size}")
+    baseline = None
+    for workers in args.workers:
+        rate = _run_once(args, workers)
+        baseline = baseline or rate
+        print(f"workers={workers:<3} {rate:8.1f} req/s  x{rate / baseline:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
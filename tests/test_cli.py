@@ -10,10 +10,17 @@ dispatch.
 from __future__ import annotations
 
 import io
+import json
 import os
+import socket
 import sys
+import tempfile
+import threading
+import time
 import unittest
-from contextlib import redirect_stdout
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from unittest import mock
 
 # Ensure the src package is importable when running the tests directly via
 # ``python -m unittest``. When running under pytest this is not strictly
@@ -26,6 +33,15 @@ if SRC_DIR not in sys.path:
     sys.path.insert(0, SRC_DIR)
 
 from cli_multi_rapid.cli import CLIArgs, greet, main, parse_args, sum_numbers
+from cli_multi_rapid.daemon import (
+    DaemonClient,
+    DaemonError,
+    DaemonExecutor,
+    DaemonServer,
+    DaemonUnavailable,
+    connect,
+)
+from cli_multi_rapid.runner import BatchRunner, Checkpoint, LatencyHistogram
 
 
 class TestGreet(unittest.TestCase):
@@ -76,5 +92,317 @@ class TestMain(unittest.TestCase):
         self.assertEqual(output, "12\n")
 
 
+def _tasks(n: int) -> str:
+    return "".join(json.dumps({"task_id": f"t{i}", "prompt": f"p{i}", "cost": 0.5}) + "\n" for i in range(n))
+
+
+def _echo(task: dict) -> dict:
+    return {"status": "success", "result": task["prompt"], "cost": task["cost"]}
+
+
+class TestRun(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def test_parse_args_run(self) -> None:
+        args = parse_args(["run", "tasks.jsonl", "-o", "out.jsonl", "-j", "8", "--resume"])
+        self.assertEqual((args.command, args.input, args.output, args.concurrency, args.resume), ("run", "tasks.jsonl", "out.jsonl", 8, True))
+
+    def test_runner_streams_results_and_stats(self) -> None:
+        def execute(task: dict) -> dict:
+            if task["task_id"] == "t3":
+                raise RuntimeError("boom")
+            return _echo(task)
+
+        tasks = io.StringIO(_tasks(10) + "\nnot json\n")
+        out = io.StringIO()
+        ckpt = BatchRunner(execute, concurrency=4, window=3).run(tasks, out)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(sorted(r["line"] for r in records), [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 12])
+        failed = {r["line"]: r["error"] for r in records if r["status"] == "error"}
+        self.assertEqual(failed[4], "RuntimeError: boom")
+        self.assertIn("invalid JSON", failed[12])
+        self.assertEqual((ckpt.stats.ok, ckpt.stats.failed, ckpt.stats.cost), (9, 2, 4.5))
+        self.assertEqual((ckpt.watermark, ckpt.done), (13, set()))
+
+    def test_resume_writes_every_task_exactly_once(self) -> None:
+        source = self.tmp / "tasks.jsonl"
+        source.write_text(_tasks(20), encoding="utf-8")
+        output = self.tmp / "out.jsonl"
+        checkpoint = self.tmp / "out.ckpt"
+
+        calls = []
+        runner = BatchRunner(lambda t: calls.append(1) or _echo(t), concurrency=2, checkpoint_path=checkpoint)
+        original = runner.execute
+
+        def stop_after_seven(task: dict) -> dict:
+            result = original(task)
+            if len(calls) >= 7:
+                runner.stop.set()
+            return result
+
+        runner.execute = stop_after_seven
+        with source.open() as tasks, output.open("w") as out:
+            runner.run(tasks, out)
+        saved = Checkpoint.load(checkpoint)
+        self.assertGreaterEqual(saved.stats.done, 7)
+        # Results written after the last checkpoint are dropped on resume.
+        with output.open("a") as out:
+            out.write('{"line": 999, "partial": tr')
+
+        resumed = BatchRunner(_echo, concurrency=3, checkpoint_path=checkpoint)
+        with source.open() as tasks, output.open("a+") as out:
+            ckpt = resumed.run(tasks, out, resume=True)
+        lines = [json.loads(line)["line"] for line in output.read_text().splitlines()]
+        self.assertEqual(sorted(lines), list(range(1, 21)))
+        self.assertEqual(ckpt.stats.done, 20)
+        self.assertAlmostEqual(ckpt.stats.cost, 10.0)
+
+    def test_window_bounds_out_of_order_completions(self) -> None:
+        release = threading.Event()
+        biggest = []
+
+        def execute(task: dict) -> dict:
+            if task["task_id"] == "t0":
+                release.wait(5)
+            return _echo(task)
+
+        runner = BatchRunner(execute, concurrency=3, window=5)
+        original = Checkpoint.mark
+
+        def mark(ckpt: Checkpoint, line: int) -> None:
+            original(ckpt, line)
+            biggest.append(len(ckpt.done))
+            if len(ckpt.done) >= 4:
+                release.set()
+
+        Checkpoint.mark = mark  # type: ignore[method-assign]
+        try:
+            ckpt = runner.run(io.StringIO(_tasks(30)), io.StringIO())
+        finally:
+            Checkpoint.mark = original  # type: ignore[method-assign]
+        self.assertEqual(ckpt.stats.done, 30)
+        self.assertLessEqual(max(biggest), 5)
+
+    def test_long_runs_of_blank_lines_do_not_end_the_run(self) -> None:
+        tasks = _tasks(1) + "\n" * 80 + _tasks(2)
+        out = io.StringIO()
+        ckpt = BatchRunner(_echo, concurrency=1).run(io.StringIO(tasks), out)
+        lines = sorted(json.loads(line)["line"] for line in out.getvalue().splitlines())
+        self.assertEqual(lines, [1, 82, 83])
+        self.assertEqual((ckpt.stats.done, ckpt.watermark), (3, 84))
+
+    def test_latency_percentiles(self) -> None:
+        hist = LatencyHistogram()
+        for ms in range(1, 101):
+            hist.add(ms / 1000)
+        self.assertAlmostEqual(hist.percentile(50), 0.050, delta=0.002)
+        self.assertAlmostEqual(hist.percentile(99), 0.099, delta=0.004)
+
+    def test_main_run_through_engine(self) -> None:
+        source = self.tmp / "tasks.jsonl"
+        source.write_text(json.dumps({"request_id": "r1", "title": "T", "body": "B"}) + "\n", encoding="utf-8")
+        output = self.tmp / "out.jsonl"
+        os.environ["AGENTIC_DB"] = str(self.tmp / "agentic.db")
+        try:
+            with redirect_stderr(io.StringIO()) as err:
+                code = main(["run", str(source), "-o", str(output)])
+        finally:
+            del os.environ["AGENTIC_DB"]
+        self.assertEqual(code, 0)
+        record = json.loads(output.read_text())
+        self.assertEqual((record["task_id"], record["status"]), ("r1", "ok"))
+        self.assertIn("T\n\nB", record["result"]["result"])
+        self.assertIn("done=1 ok=1", err.getvalue())
+        self.assertTrue((self.tmp / "out.jsonl.ckpt").exists())
+
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = Path(tempfile.mkdtemp())
+        self.path = str(self.tmp / "d.sock")
+
+    def _serve(self, execute=_echo, **kwargs) -> DaemonServer:
+        server = DaemonServer(self.path, execute, **kwargs)
+        thread = threading.Thread(target=server.serve, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(server.stop)
+        return server
+
+    def test_batch_runs_through_daemon(self) -> None:
+        def execute(task: dict) -> dict:
+            if task["task_id"] == "t2":
+                raise ValueError("bad task")
+            return _echo(task)
+
+        server = self._serve(execute)
+        executor = DaemonExecutor(self.path, autostart=False)
+        out = io.StringIO()
+        ckpt = BatchRunner(executor, concurrency=3).run(io.StringIO(_tasks(12)), out)
+        executor.close()
+        self.assertEqual((ckpt.stats.ok, ckpt.stats.failed), (11, 1))
+        failed = [json.loads(line) for line in out.getvalue().splitlines() if '"error"' in line]
+        self.assertEqual(failed[0]["error"], "RemoteTaskError: ValueError: bad task")
+        stats = server.stats()
+        self.assertEqual((stats["served"], stats["failed"], stats["in_flight"]), (12, 1, 0))
+
+    def test_kept_connection_survives_daemon_restart(self) -> None:
+        first = DaemonServer(self.path, _echo)
+        thread = threading.Thread(target=first.serve, daemon=True)
+        thread.start()
+        client = DaemonClient(self.path)
+        self.assertEqual(client.execute({"prompt": "a", "cost": 0})["result"], "a")
+        first.stop()
+        thread.join(5)
+        self._serve()
+        self.assertEqual(client.execute({"prompt": "b", "cost": 0})["result"], "b")
+        client.close()
+
+    def _fake_daemon(self, hang_up_after_reading: bool) -> list:
+        """Answer one request per connection, then hang up (optionally reading one more first)."""
+        received: list = []
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.path)
+        listener.listen()
+        self.addCleanup(listener.close)
+
+        def serve() -> None:
+            while True:
+                try:
+                    conn, _ = listener.accept()
+                except OSError:
+                    return
+                with conn, conn.makefile("rwb") as f:
+                    received.append(f.readline())
+                    f.write(b'{"ok": true, "result": {"result": "r"}}\n')
+                    f.flush()
+                    if hang_up_after_reading:
+                        received.append(f.readline())
+
+        threading.Thread(target=serve, daemon=True).start()
+        return received
+
+    def test_closed_connection_is_replaced_before_sending(self) -> None:
+        received = self._fake_daemon(hang_up_after_reading=False)
+        client = DaemonClient(self.path)
+        self.assertEqual(client.execute({"prompt": "a"})["result"], "r")
+        time.sleep(0.05)  # the fake daemon hangs up
+        self.assertEqual(client.execute({"prompt": "b"})["result"], "r")
+        client.close()
+        self.assertEqual(len(received), 2)
+
+    def test_lost_reply_is_not_resent(self) -> None:
+        received = self._fake_daemon(hang_up_after_reading=True)
+        executor = DaemonExecutor(self.path, autostart=False, fallback=lambda: _echo)
+        executor._local.client = DaemonClient(self.path)
+        self.assertEqual(executor({"prompt": "a", "cost": 0})["result"], "r")
+        with self.assertRaises(DaemonError):
+            executor({"prompt": "once", "cost": 0})
+        self.assertEqual(len(received), 2)  # the lost request was not sent again
+        self.assertIsNone(executor.fallback_reason)
+
+    def test_falls_back_in_process(self) -> None:
+        notice = io.StringIO()
+        executor = DaemonExecutor(self.path, autostart=False, fallback=lambda: _echo, notice=notice)
+        self.assertEqual(executor({"prompt": "p", "cost": 1.0})["result"], "p")
+        self.assertIn("no daemon listening", executor.fallback_reason or "")
+        self.assertIn("running in-process", notice.getvalue())
+        with self.assertRaises(DaemonUnavailable):
+            DaemonExecutor(self.path, autostart=False)({"prompt": "p"})
+
+    def test_refuses_daemon_with_other_environment(self) -> None:
+        os.environ["CMR_TEST_SETTING"] = "a"
+        self.addCleanup(os.environ.pop, "CMR_TEST_SETTING", None)
+        self._serve(env_keys=["cmr_test_setting"])
+        connect(self.path, autostart=False).close()
+        os.environ["CMR_TEST_SETTING"] = "b"
+        with self.assertRaises(DaemonUnavailable):
+            connect(self.path, autostart=False)
+
+    def test_refuses_daemon_with_other_env_file(self) -> None:
+        cwd = os.getcwd()
+        os.chdir(self.tmp)
+        self.addCleanup(os.chdir, cwd)
+        env_file = self.tmp / ".env"
+        env_file.write_text("AGENTIC_DB=a.db\n", encoding="utf-8")
+        self._serve()
+        connect(self.path, autostart=False).close()
+        env_file.write_text("AGENTIC_DB=b.db\n", encoding="utf-8")
+        with self.assertRaises(DaemonUnavailable):
+            connect(self.path, autostart=False)
+
+    def test_busy_daemon_is_not_replaced(self) -> None:
+        release = threading.Event()
+
+        def slow(task: dict) -> dict:
+            release.wait(5)
+            return _echo(task)
+
+        os.environ["CMR_TEST_SETTING"] = "a"
+        self.addCleanup(os.environ.pop, "CMR_TEST_SETTING", None)
+        server = self._serve(slow, env_keys=["cmr_test_setting"])
+        client = connect(self.path, autostart=False)
+        results = []
+        worker = threading.Thread(target=lambda: results.append(client.execute({"prompt": "p", "cost": 0})))
+        worker.start()
+        while not server.stats()["in_flight"]:
+            time.sleep(0.01)
+        os.environ["CMR_TEST_SETTING"] = "b"
+        with self.assertRaisesRegex(DaemonUnavailable, "not replacing"):
+            connect(self.path, autostart=True)
+        release.set()
+        worker.join(5)
+        self.assertEqual(results[0]["result"], "p")
+
+        # A stopping daemon refuses new tasks instead of dropping them.
+        server.stop()
+        while os.path.exists(self.path):
+            time.sleep(0.01)
+        with self.assertRaises(DaemonUnavailable):
+            client.execute({"prompt": "late"})
+
+    def test_refuses_sockets_and_directories_other_users_control(self) -> None:
+        self._serve()
+        with mock.patch("cli_multi_rapid.daemon._uid", return_value=os.getuid() + 1):
+            with self.assertRaisesRegex(DaemonUnavailable, "another user"):
+                DaemonClient(self.path).connect()
+
+        run_dir = self.tmp / "run"
+        with mock.patch.dict(os.environ, {"XDG_RUNTIME_DIR": str(run_dir)}):
+            with self.assertRaisesRegex(DaemonUnavailable, "no daemon"):
+                connect(str(run_dir / "d.sock"), autostart=False)
+            self.assertEqual(run_dir.stat().st_mode & 0o777, 0o700)
+            run_dir.chmod(0o755)  # e.g. pre-created by someone else
+            with self.assertRaisesRegex(DaemonUnavailable, "private"):
+                connect(str(run_dir / "d.sock"), autostart=False)
+
+    def test_exits_when_idle(self) -> None:
+        server = DaemonServer(self.path, _echo, idle_timeout=0.2)
+        thread = threading.Thread(target=server.serve, daemon=True)
+        thread.start()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_main_starts_daemon_on_demand(self) -> None:
+        source = self.tmp / "tasks.jsonl"
+        source.write_text(json.dumps({"request_id": "r1", "title": "T", "body": "B"}) + "\n", encoding="utf-8")
+        output = self.tmp / "out.jsonl"
+        os.environ["AGENTIC_DB"] = str(self.tmp / "agentic.db")
+        try:
+            with redirect_stderr(io.StringIO()), redirect_stdout(io.StringIO()):
+                code = main(["run", str(source), "-o", str(output), "--daemon", "--socket", self.path])
+                status = main(["daemon", "status", "--socket", self.path])
+        finally:
+            with redirect_stdout(io.StringIO()):
+                main(["daemon", "stop", "--socket", self.path])
+            del os.environ["AGENTIC_DB"]
+        self.assertEqual((code, status), (0, 0))
+        record = json.loads(output.read_text())
+        self.assertEqual((record["task_id"], record["status"]), ("r1", "ok"))
+        self.assertIn("listening on", (self.tmp / "d.sock.log").read_text())
+
+
 if __name__ == "__main__":  # pragma: no cover - only executed when run directly
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""Unit tests for the persistent aider worker pool."""
+
+import signal
+import sys
+import threading
+
+import pytest
+
+from src.config import Settings
+from src.services.aider_client import AiderClient
+from src.services.aider_pool import AiderWorkerError, AiderWorkerPool
+
+
+def test_worker_is_reused_across_tasks() -> None:
+    pool = AiderWorkerPool(max_workers=2)
+    try:
+        first = pool.execute("lane-a", {"message": "one"})
+        second = pool.execute("lane-a", {"message": "two"})
+        assert first["result"] == "[Aider stub] one"
+        assert second["result"] == "[Aider stub] two"
+        assert pool.stats()["live_workers"] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_worker_recycled_after_max_tasks() -> None:
+    pool = AiderWorkerPool(max_workers=1, max_tasks_per_worker=2)
+    try:
+        pool.execute("lane-a", {"message": "one"})
+        (worker,) = pool._idle["lane-a"]
+        pool.execute("lane-a", {"message": "two"})
+        assert not worker.is_alive()
+        assert pool.stats()["live_workers"] == 0
+    finally:
+        pool.shutdown()
+
+
+def test_live_workers_capped_across_lanes() -> None:
+    pool = AiderWorkerPool(max_workers=2)
+    try:
+        threads = [
+            threading.Thread(target=pool.execute, args=(f"lane-{i}", {"message": str(i)}))
+            for i in range(5)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert pool.stats()["live_workers"] <= 2
+    finally:
+        pool.shutdown()
+
+
+def test_evicted_worker_is_closed_without_holding_the_pool_lock() -> None:
+    pool = AiderWorkerPool(max_workers=2)
+    try:
+        pool.execute("lane-a", {"message": "one"})
+        pool.execute("lane-b", {"message": "two"})
+        (oldest,) = pool._idle["lane-a"]
+        closing, release = threading.Event(), threading.Event()
+        close = oldest.close
+
+        def slow_close(timeout: float = 2.0) -> None:
+            closing.set()
+            release.wait(5)
+            close(timeout)
+
+        oldest.close = slow_close
+        evicting = threading.Thread(target=pool.execute, args=("lane-c", {"message": "three"}))
+        evicting.start()
+        assert closing.wait(5)
+        # Another lane is served while the evicted worker is still closing.
+        served = threading.Thread(target=pool.execute, args=("lane-b", {"message": "four"}))
+        served.start()
+        served.join(2)
+        assert not served.is_alive()
+        release.set()
+        evicting.join(5)
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_health_check_drops_dead_workers() -> None:
+    pool = AiderWorkerPool(max_workers=2)
+    try:
+        pool.execute("lane-a", {"message": "one"})
+        pool._idle["lane-a"][0].process.kill()
+        stats = pool.health_check(timeout=1.0)
+        assert stats["removed"] == 1
+        assert stats["live_workers"] == 0
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="needs SIGSTOP")
+def test_hung_idle_worker_is_replaced_on_checkout() -> None:
+    pool = AiderWorkerPool(max_workers=1, ping_idle_after=0, ping_timeout=0.5)
+    try:
+        pool.execute("lane-a", {"message": "one"})
+        (hung,) = pool._idle["lane-a"]
+        hung.process.send_signal(signal.SIGSTOP)  # alive, but never answers
+        assert pool.execute("lane-a", {"message": "two"}, timeout=5.0)["result"] == "[Aider stub] two"
+        assert not hung.is_alive()
+        assert pool.stats()["live_workers"] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_broken_worker_command_raises() -> None:
+    pool = AiderWorkerPool(max_workers=1, command=[sys.executable, "-c", "pass"])
+    with pytest.raises(AiderWorkerError):
+        pool.execute("lane-a", {"message": "one"}, timeout=5.0)
+    assert pool.stats()["live_workers"] == 0
+
+
+def test_client_executes_through_pool() -> None:
+    client = AiderClient(Settings())
+    try:
+        result = client.execute_task({"command": "refactor", "lane": "lane/x"})
+        assert result == {"status": "success", "result": "[Aider stub] refactor", "cost": 0.0}
+    finally:
+        client.pool.shutdown()
@@ -0,0 +1,93 @@
+"""Unit tests for repository-wide code analysis."""
+
+from pathlib import Path
+
+import pytest
+
+from src.tools import code_analyzer
+from src.tools.code_analyzer import CodeAnalyzerTool, analyze_source
+
+SOURCE = b'''
+import os
+from .sibling import thing
+
+
+class Widget:
+    def method(self, x):
+        if x and x > 1:
+            return [i for i in range(x) if i % 2]
+        return None
+
+
+def helper():
+    # comment
+    return os.getcwd()
+'''
+
+
+def test_analyze_source_reports_symbols_and_complexity() -> None:
+    result = analyze_source(SOURCE)
+    symbols = {s["name"]: s for s in result["symbols"]}
+    assert set(symbols) == {"Widget", "Widget.method", "helper"}
+    assert symbols["Widget.method"]["kind"] == "method"
+    # if + and + comprehension + comprehension-if
+    assert symbols["Widget.method"]["complexity"] == 5
+    assert symbols["helper"]["complexity"] == 1
+    assert result["imports"] == [".sibling", "os"]
+    assert result["comment_lines"] == 1
+
+
+def test_syntax_error_is_reported_not_raised() -> None:
+    result = analyze_source(b"def broken(:\n")
+    assert "error" in result
+    assert result["line_count"] == 1
+
+
+def test_repository_analysis_uses_cache(tmp_path: Path) -> None:
+    (tmp_path / "a.py").write_bytes(SOURCE)
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "b.py").write_bytes(b"x = 1\n")
+    (tmp_path / "pkg" / "copy.py").write_bytes(b"x = 1\n")
+    tool = CodeAnalyzerTool()
+
+    first = tool.analyze_repository(tmp_path)
+    assert sorted(first["files"]) == ["a.py", "pkg/b.py", "pkg/copy.py"]
+    # Identical content is parsed once.
+    assert first["stats"]["parsed"] == 2
+
+    second = tool.analyze_repository(tmp_path)
+    assert second["stats"] == {"parsed": 0, "cached": 3}
+    assert second["files"] == first["files"]
+
+    (tmp_path / "pkg" / "b.py").write_bytes(b"def f():\n    pass\n")
+    third = tool.analyze_repository(tmp_path)
+    assert third["stats"]["parsed"] == 1
+    assert third["files"]["pkg/b.py"]["symbols"][0]["name"] == "f"
+
+
+def test_only_the_root_worktree_pool_is_skipped(tmp_path: Path) -> None:
+    for rel in ("worktrees/pool-0/a.py", "src/worktrees/b.py"):
+        (tmp_path / rel).parent.mkdir(parents=True)
+        (tmp_path / rel).write_bytes(b"x = 1\n")
+    assert sorted(CodeAnalyzerTool().analyze_repository(tmp_path)["files"]) == ["src/worktrees/b.py"]
+
+
+def test_file_changed_after_hashing_is_not_cached_under_old_hash(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    (tmp_path / "a.py").write_bytes(b"def f():\n    pass\n")
+    real = code_analyzer._sha256_file
+    # Report a stale hash, as if a.py was edited between hashing and parsing.
+    monkeypatch.setattr(code_analyzer, "_sha256_file", lambda path: "0" * 64)
+    first = CodeAnalyzerTool().analyze_repository(tmp_path)
+    assert first["files"]["a.py"]["symbols"][0]["name"] == "f"
+    monkeypatch.setattr(code_analyzer, "_sha256_file", real)
+    second = CodeAnalyzerTool().analyze_repository(tmp_path)
+    assert second["stats"] == {"parsed": 0, "cached": 1}
+    assert second["files"] == first["files"]
+
+
+def test_large_repository_uses_process_pool(tmp_path: Path) -> None:
+    for i in range(80):
+        (tmp_path / f"m{i}.py").write_text(f"def f{i}():\n    return {i}\n")
+    result = CodeAnalyzerTool(workers=2).analyze_repository(tmp_path)
+    assert result["summary"]["files"] == 80
+    assert result["summary"]["symbols"] == 80
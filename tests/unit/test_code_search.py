@@ -0,0 +1,52 @@
+"""Unit tests for the trigram code search tool."""
+
+from pathlib import Path
+
+from src.tools import CodeSearchTool
+from src.tools.code_search import required_trigrams, trigrams
+
+
+def _repo(root: Path) -> None:
+    (root / "pkg").mkdir()
+    (root / "pkg" / "alpha.py").write_text("def compute_total(x):\n    return x + 1\n")
+    (root / "pkg" / "beta.py").write_text("class TotalRecorder:\n    pass\n")
+    (root / "notes.md").write_text("nothing to see\n")
+    (root / "blob.bin").write_bytes(b"\0compute_total")
+
+
+def test_substring_search_returns_file_and_line(tmp_path: Path) -> None:
+    _repo(tmp_path)
+    tool = CodeSearchTool(tmp_path)
+    result = tool.run("compute_total")
+    assert result["hits"] == [{"path": "pkg/alpha.py", "line": 1, "text": "def compute_total(x):"}]
+    assert result["index"]["indexed"] == 3  # binary file skipped
+
+
+def test_case_insensitive_and_regex_queries(tmp_path: Path) -> None:
+    _repo(tmp_path)
+    tool = CodeSearchTool(tmp_path)
+    tool.update()
+    paths = {h["path"] for h in tool.search("total", case_sensitive=False)}
+    assert paths == {"pkg/alpha.py", "pkg/beta.py"}
+    hits = tool.search(r"class \w+Recorder", regex=True)
+    assert [h["path"] for h in hits] == ["pkg/beta.py"]
+    assert tool.search(r"ret(urn|ry) x", regex=True)[0]["line"] == 2
+
+
+def test_incremental_update(tmp_path: Path) -> None:
+    _repo(tmp_path)
+    tool = CodeSearchTool(tmp_path)
+    tool.update()
+    assert tool.update() == {"indexed": 0, "removed": 0, "unchanged": 3}
+    (tmp_path / "pkg" / "beta.py").write_text("class Renamed:\n    pass\n")
+    (tmp_path / "notes.md").unlink()
+    assert tool.update() == {"indexed": 1, "removed": 1, "unchanged": 1}
+    assert tool.search("TotalRecorder") == []
+    assert tool.search("Renamed")[0]["path"] == "pkg/beta.py"
+
+
+def test_regex_literal_extraction() -> None:
+    assert required_trigrams(r"foo\d+bar", regex=True) == trigrams(b"foo") | trigrams(b"bar")
+    # Alternations guarantee nothing specific.
+    assert required_trigrams(r"abc|xyz", regex=True) == set()
+    assert required_trigrams(r"(?:hello)+", regex=True) == trigrams(b"hello")
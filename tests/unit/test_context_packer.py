@@ -0,0 +1,132 @@
+"""Unit tests for token-budgeted context packing."""
+
+from pathlib import Path
+from typing import Any, Dict
+
+from src.tools.code_analyzer import CodeAnalyzerTool
+from src.tools.doc_reader import ChunkCache, DocumentReaderTool
+from src.workflow.context import (
+    ContextChunk,
+    ContextPacker,
+    TokenCounter,
+    chunks_from_analysis,
+    chunks_from_files,
+    query_terms,
+)
+from src.workflow.engine import LangGraphWorkflowEngine
+
+
+class _Counter(TokenCounter):
+    """Deterministic counter (one token per four characters) that counts calls."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._encode = None
+        self.calls = 0
+
+    def _count(self, text: str) -> int:
+        self.calls += 1
+        return super()._count(text)
+
+
+def test_query_terms_split_identifiers() -> None:
+    terms = query_terms("Fix the QuotaManager check_quota bug")
+    assert {"quotamanager", "quota", "manager", "check_quota", "check", "fix", "bug"} <= set(terms)
+    assert "the" not in terms
+
+
+def test_token_counts_are_cached_by_content() -> None:
+    counter = _Counter()
+    assert counter.count("x" * 40) == 10
+    assert counter.count("x" * 40) == 10
+    assert counter.calls == 1
+
+
+def test_pack_prefers_relevant_chunks_within_budget() -> None:
+    packer = ContextPacker(counter=_Counter())
+    chunks = [
+        ContextChunk("quota.py", "def check_quota(cost):\n    return cost < limit\n" * 5),
+        ContextChunk("router.py", "def select_client(ctx):\n    return client\n"),
+        ContextChunk("quota_big.py", "check_quota " * 400),
+        ContextChunk("readme.md", "unrelated text about installation\n"),
+    ]
+    packed = packer.pack("why does check_quota fail", chunks, budget=100)
+    sources = [c.source for c in packed.chunks]
+    assert sources[0] == "quota.py"
+    assert "quota_big.py" not in sources  # too large for the budget
+    assert "readme.md" not in sources  # irrelevant
+    assert packed.tokens <= 100
+    assert "### quota.py" in packed.render()
+
+
+def test_chunk_sources(tmp_path: Path) -> None:
+    (tmp_path / "mod.py").write_text(
+        "import os\n\n\ndef alpha():\n    return 1\n\n\nclass Beta:\n    def gamma(self):\n        return 2\n",
+        encoding="utf-8",
+    )
+    (tmp_path / "notes.txt").write_text("first para\n\nsecond para\n", encoding="utf-8")
+    reader = DocumentReaderTool(cache=ChunkCache())
+
+    analysis = CodeAnalyzerTool(cache_dir=tmp_path / "cache").analyze_repository(tmp_path)
+    symbols = chunks_from_analysis(analysis, tmp_path, reader)
+    assert sorted((c.source, c.start_line) for c in symbols) == [("mod.py", 4), ("mod.py", 8)]
+    beta = next(c for c in symbols if c.start_line == 8)
+    assert "def gamma" in beta.text
+
+    docs = chunks_from_files([str(tmp_path / "notes.txt"), str(tmp_path / "missing.txt")], reader, chunk_size=14)
+    assert [c.text for c in docs] == ["first para\n\n", "second para\n"]
+
+
+class _Client:
+    def __init__(self) -> None:
+        self.seen: Dict[str, Any] = {}
+
+    def execute_task(self, task_context: Dict[str, Any]) -> Dict[str, Any]:
+        self.seen = task_context
+        return {"status": "success", "result": "ok", "cost": 0.0}
+
+
+class _Router:
+    def __init__(self, client: _Client) -> None:
+        self.client = client
+
+    def service_for(self, task_context: Dict[str, Any]) -> str:
+        return task_context.get("service") or "anthropic"
+
+    def select_client(self, task_context: Dict[str, Any]) -> _Client:
+        return self.client
+
+
+class _Quota:
+    def check_quota(self, cost: float) -> None:
+        pass
+
+
+class _Db:
+    def create_execution(self, **kwargs: Any) -> int:
+        return 1
+
+    def update_execution(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+
+def test_engine_prepends_packed_context() -> None:
+    client = _Client()
+    packer = ContextPacker(budgets={"ollama": 50}, counter=_Counter())
+    engine = LangGraphWorkflowEngine(_Router(client), _Quota(), _Db(), context_packer=packer)  # type: ignore[arg-type]
+    engine._execute_task(
+        {
+            "service": "ollama",
+            "prompt": "rename select_client",
+            "context_chunks": [
+                {"source": "router.py", "text": "def select_client(ctx):\n    pass\n"},
+                {"source": "other.py", "text": "nothing relevant\n"},
+            ],
+        }
+    )
+    assert client.seen["prompt"].startswith("### router.py")
+    assert client.seen["prompt"].endswith("rename select_client")
+    assert client.seen["context_sources"] == ["router.py"]
+
+    engine._execute_task({"service": "ollama", "prompt": "plain"})
+    assert client.seen["prompt"] == "plain"
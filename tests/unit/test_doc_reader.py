@@ -0,0 +1,80 @@
+"""Unit tests for chunked, cached document reading."""
+
+import os
+from pathlib import Path
+
+from src.tools import doc_reader
+from src.tools.doc_reader import ChunkCache, DocumentReaderTool
+
+
+def _doc(tmp_path: Path) -> Path:
+    path = tmp_path / "doc.txt"
+    paragraphs = [f"para {i} line a\npara {i} line b\n" for i in range(50)]
+    path.write_text("\n".join(paragraphs), encoding="utf-8")
+    return path
+
+
+def test_line_and_byte_ranges(tmp_path: Path) -> None:
+    path = tmp_path / "lines.txt"
+    path.write_text("".join(f"line {i}\n" for i in range(3000)), encoding="utf-8")
+    reader = DocumentReaderTool(cache=ChunkCache())
+    assert reader.read_lines(path, 2048, 2050) == "line 2048\nline 2049\n"
+    assert reader.read_lines(path, 2999) == "line 2999\n"
+    assert reader.read_lines(path, 5000) == ""
+    assert reader.read_bytes(path, 0, 6) == b"line 0"
+    assert reader.read_range(path, 7, 13) == "line 1"
+
+
+def test_range_does_not_split_multibyte_characters(tmp_path: Path) -> None:
+    path = tmp_path / "utf8.txt"
+    path.write_text("aé b", encoding="utf-8")  # 'é' is two bytes at offsets 1-2
+    reader = DocumentReaderTool(cache=ChunkCache())
+    assert reader.read_range(path, 2, 5) == " b"
+    assert reader.read_range(path, 0, 2) == "a"
+    # A chunk smaller than a character is cut inside it; its cached text
+    # must not be served for the same byte range.
+    path.write_text("éa", encoding="utf-8")
+    assert [c["text"] for c in reader.iter_chunks(path, chunk_size=1)][0] == "\ufffd"
+    assert reader.read_range(path, 0, 1) == DocumentReaderTool(cache=ChunkCache()).read_range(path, 0, 1)
+
+
+def test_chunks_cover_file_and_respect_paragraphs(tmp_path: Path) -> None:
+    path = _doc(tmp_path)
+    reader = DocumentReaderTool(cache=ChunkCache())
+    chunks = list(reader.iter_chunks(path, chunk_size=100, paragraphs=True))
+    assert "".join(c["text"] for c in chunks) == path.read_text(encoding="utf-8")
+    assert all(c["end"] - c["start"] <= 100 for c in chunks)
+    assert all(c["text"].endswith("\n\n") for c in chunks[:-1])
+
+
+def test_cache_hits_and_invalidation(tmp_path: Path) -> None:
+    path = _doc(tmp_path)
+    cache = ChunkCache()
+    reader = DocumentReaderTool(cache=cache)
+    first = list(reader.iter_chunks(path, chunk_size=200))
+    hits = cache.hits
+    assert list(DocumentReaderTool(cache=cache).iter_chunks(path, chunk_size=200)) == first
+    assert cache.hits > hits
+
+    path.write_text("new content\n", encoding="utf-8")
+    os.utime(path, ns=(1, 1))
+    assert reader.run(path) == "new content\n"
+
+
+def test_cache_evicts_to_memory_cap() -> None:
+    cache = ChunkCache(max_chars=10)
+    cache.put("a", "12345", 5)
+    cache.put("b", "12345", 5)
+    cache.get("a")
+    cache.put("c", "12345", 5)
+    assert cache.get("b") is None
+    assert cache.get("a") == "12345"
+    assert cache.size == 10
+
+
+def test_large_files_use_mmap(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(doc_reader, "MMAP_THRESHOLD", 16)
+    path = _doc(tmp_path)
+    reader = DocumentReaderTool(cache=ChunkCache())
+    assert reader.read_lines(path, 1, 2) == "para 0 line b\n"
+    assert reader.read_bytes(path, 0, 4) == b"para"
@@ -0,0 +1,128 @@
+"""Unit tests for the drop server's cross-process locks and branch worktrees."""
+
+import multiprocessing
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src.drop.locking import BranchWorkspaces, branch_slug, file_lock
+from src.drop.uploads import UploadError, UploadStore
+
+
+def _git(*args, cwd=None, check=True):
+    return subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@t", *args], cwd=cwd, check=check, capture_output=True, text=True)
+
+
+def _increment(lock_path: str, counter_path: str, times: int) -> None:
+    for _ in range(times):
+        with file_lock(Path(lock_path)):
+            counter = Path(counter_path)
+            value = int(counter.read_text())
+            time.sleep(0.001)
+            counter.write_text(str(value + 1))
+
+
+def test_file_lock_excludes_other_processes(tmp_path: Path) -> None:
+    counter = tmp_path / "counter"
+    counter.write_text("0")
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_increment, args=(str(tmp_path / "c.lock"), str(counter), 25)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+    assert counter.read_text() == "100"
+
+
+def test_branch_slug_is_safe_and_distinct() -> None:
+    assert "/" not in branch_slug("lane/a")
+    assert branch_slug("lane/a") != branch_slug("lane_a")
+
+
+def test_same_branch_serialises_and_different_branches_overlap(tmp_path: Path) -> None:
+    repo = tmp_path / "repo"
+    _git("init", "-q", "-b", "main", str(repo))
+    (repo / "README.md").write_text("r\n")
+    _git("add", ".", cwd=repo)
+    _git("commit", "-qm", "init", cwd=repo)
+    workspaces = BranchWorkspaces(repo, _git)
+    for branch in ("lane/a", "lane/b"):
+        with workspaces.checkout(branch) as path:
+            assert _git("rev-parse", "--abbrev-ref", "HEAD", cwd=path).stdout.strip() == branch
+
+    held = threading.Event()
+    entered = []
+
+    def hold(branch: str) -> None:
+        with workspaces.checkout(branch):
+            held.set()
+            time.sleep(0.3)
+
+    def enter(branch: str) -> None:
+        start = time.monotonic()
+        with workspaces.checkout(branch):
+            entered.append((branch, time.monotonic() - start))
+
+    holder = threading.Thread(target=hold, args=("lane/a",))
+    holder.start()
+    held.wait(5)
+    threads = [threading.Thread(target=enter, args=(b,)) for b in ("lane/a", "lane/b")]
+    for t in threads:
+        t.start()
+    for t in threads + [holder]:
+        t.join(10)
+    waits = dict(entered)
+    assert waits["lane/b"] < 0.2 <= waits["lane/a"]
+    assert _git("rev-parse", "--abbrev-ref", "HEAD", cwd=repo).stdout.strip() == "main"
+
+
+class _SlowStream:
+    """A request body that, with ``block``, blocks until ``release`` is set."""
+
+    def __init__(self, data: bytes, block: bool = False) -> None:
+        self.data = data
+        self.reading = threading.Event()
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+
+    def read(self, n: int) -> bytes:
+        self.reading.set()
+        self.release.wait(5)
+        data, self.data = self.data, b""
+        return data
+
+
+def test_upload_chunks_are_serialized_across_stores(tmp_path: Path) -> None:
+    # Two stores on one state directory stand in for two server processes.
+    first, second = UploadStore(tmp_path / "state"), UploadStore(tmp_path / "state")
+    session = first.create("a.txt", tmp_path / "out" / "a.txt", size=4)
+    slow = _SlowStream(b"ab", block=True)
+    holder = threading.Thread(target=first.append, args=(session["id"], 0, slow))
+    holder.start()
+    slow.reading.wait(5)
+    errors = []
+
+    def racer() -> None:
+        try:
+            second.append(session["id"], 0, _SlowStream(b"xy"))
+        except UploadError as exc:
+            errors.append(exc)
+
+    racing = threading.Thread(target=racer)
+    racing.start()
+    time.sleep(0.1)
+    assert racing.is_alive()  # waits for the first chunk instead of overwriting it
+    slow.release.set()
+    holder.join(5)
+    racing.join(5)
+    assert errors[0].status == 409 and errors[0].extra["offset"] == 2
+
+    done = second.append(session["id"], 2, _SlowStream(b"cd"))
+    assert done["complete"] and (tmp_path / "out" / "a.txt").read_bytes() == b"abcd"
+    assert not list((tmp_path / "state").glob("*.lock"))
+    with pytest.raises(UploadError):
+        first.append("../escape", 0, _SlowStream(b""))
@@ -0,0 +1,51 @@
+"""Unit tests for the drop server's Prometheus metrics registry."""
+
+import json
+import os
+from pathlib import Path
+
+from src.drop.metrics import Metrics
+
+
+def test_render_counters_histograms_and_gauges() -> None:
+    m = Metrics(buckets=(0.1, 1.0))
+    m.describe("req_total", "counter", "Requests.")
+    m.describe("lat_seconds", "histogram", "Latency.")
+    m.gauge("depth", lambda: 3, "Queue depth.")
+    m.inc("req_total", status="200")
+    m.inc("req_total", 2, status="200")
+    m.inc("req_total", status='5"0\n0')
+    for value in (0.05, 0.5, 5.0):
+        m.observe("lat_seconds", value, phase="push")
+
+    text = m.render()
+    assert "# TYPE req_total counter" in text
+    assert 'req_total{status="200"} 3' in text
+    assert 'req_total{status="5\\"0\\n0"} 1' in text
+    assert 'lat_seconds_bucket{phase="push",le="0.1"} 1' in text
+    assert 'lat_seconds_bucket{phase="push",le="1"} 2' in text
+    assert 'lat_seconds_bucket{phase="push",le="+Inf"} 3' in text
+    assert 'lat_seconds_sum{phase="push"} 5.55' in text
+    assert "depth 3" in text
+
+
+def test_render_sums_live_worker_snapshots(tmp_path: Path) -> None:
+    m = Metrics(buckets=(1.0,), shared_dir=tmp_path)
+    m.inc("req_total", status="200")
+    m.observe("lat_seconds", 0.5)
+    peer = {
+        "buckets": [1.0],
+        "counters": [["req_total", [["status", "200"]], 4]],
+        "hists": [["lat_seconds", [], [0, 2.0, 1]]],
+        "gauges": [],
+    }
+    (tmp_path / f"{os.getppid()}.json").write_text(json.dumps(peer))
+    dead = tmp_path / "999999999.json"
+    dead.write_text(json.dumps(peer))
+
+    text = m.render()
+    assert 'req_total{status="200"} 5' in text
+    assert 'lat_seconds_bucket{le="1"} 1' in text
+    assert 'lat_seconds_count 2' in text
+    assert not dead.exists()
+    assert (tmp_path / f"{os.getpid()}.json").exists()
@@ -0,0 +1,345 @@
+"""Unit tests for the local drop server."""
+
+import base64
+import hashlib
+import subprocess
+import time
+from pathlib import Path
+
+import pytest
+
+import server
+
+
+def _git(cwd: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout
+
+
+def _b64(text: str) -> str:
+    return base64.b64encode(text.encode("utf-8")).decode("ascii")
+
+
+@pytest.fixture
+def client(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    origin = tmp_path / "origin.git"
+    _git(tmp_path, "init", "-q", "--bare", "-b", "main", str(origin))
+    repo = tmp_path / "repo"
+    _git(tmp_path, "clone", "-q", str(origin), str(repo))
+    (repo / "README.md").write_text("repo\n", encoding="utf-8")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-qm", "init")
+    _git(repo, "push", "-q", "origin", "HEAD:main")
+    _git(repo, "config", "user.name", "t")
+    _git(repo, "config", "user.email", "t@t")
+
+    out = tmp_path / "out"
+    out.mkdir()
+    monkeypatch.setattr(server, "SAVE_BASE_DIR", out.resolve())
+    monkeypatch.setattr(server, "REPO_DIR", repo)
+    monkeypatch.setattr(server, "ALLOW_LOCALHOST_NO_TOKEN", True)
+    monkeypatch.setattr(server, "DISABLE_GIT", False)
+    monkeypatch.setattr(server, "MIRROR_DEBOUNCE", 0.2)
+    monkeypatch.setattr(server, "PUSH_RETRY_BACKOFF", 0.05)
+    monkeypatch.setattr(server, "PUSH_MAX_RETRIES", 20)
+    monkeypatch.setattr(server, "_MIRROR", None)
+    monkeypatch.setattr(server, "UPLOAD_STATE_DIR", (tmp_path / "upload_state").resolve())
+    monkeypatch.setattr(server, "CONTENT_INDEX_PATH", (tmp_path / "index.sqlite").resolve())
+    monkeypatch.setattr(server, "JOB_STORE_PATH", (tmp_path / "jobs.sqlite").resolve())
+    monkeypatch.setattr(server, "BRANCH_WORKTREES", False)
+    monkeypatch.setattr(server, "METRICS_DIR", (tmp_path / "metrics").resolve())
+    monkeypatch.setattr(server, "FRAMEWORK_CONFIG", (tmp_path / "agentic.config.json").resolve())
+    test_client = server.app.test_client()
+    test_client.out, test_client.repo, test_client.origin = out, repo, origin
+    yield test_client
+    if server._MIRROR is not None:
+        server._MIRROR.stop()
+
+
+def _wait(client, job_id: str) -> dict:
+    server._MIRROR.wait(job_id, timeout=30)
+    return client.get(f"/jobs/{job_id}").get_json()
+
+
+def test_save_batch_makes_one_commit_and_push(client) -> None:
+    files = [{"path": f"src/mod_{i}.py", "content_b64": _b64(f"x = {i}\n")} for i in range(20)]
+    resp = client.post("/save-batch", json={"files": files, "branch": "lane/batch", "message": "batch"})
+    assert resp.status_code == 202, resp.get_json()
+    job = _wait(client, resp.get_json()["job"])
+    assert job["status"] == "done" and len(job["paths"]) == 20
+    assert (client.out / "src" / "mod_7.py").read_text(encoding="utf-8") == "x = 7\n"
+    assert _git(client.origin, "rev-list", "--count", "lane/batch").strip() == "2"
+    assert len(_git(client.origin, "show", "--name-only", "--format=", "lane/batch").split()) == 20
+
+
+@pytest.mark.parametrize(
+    "bad, status",
+    [
+        ({"path": "../escape.py", "content_b64": _b64("x")}, 400),
+        ({"path": "secrets/key.txt", "content_b64": _b64("x")}, 403),
+        ({"path": "src/bad.py", "content_b64": "not base64!"}, 400),
+        ({"path": "src/ok.py", "content_b64": _b64("dup")}, 400),
+    ],
+)
+def test_save_batch_rejects_whole_batch(client, bad, status) -> None:
+    files = [{"path": "src/ok.py", "content_b64": _b64("fine")}, bad]
+    resp = client.post("/save-batch", json={"files": files, "branch": "lane/batch"})
+    assert resp.status_code == status
+    assert resp.get_json()["index"] == 1
+    assert not (client.out / "src" / "ok.py").exists()
+    assert "lane/batch" not in _git(client.origin, "branch", "--list")
+
+
+def test_save_batch_refuses_protected_branch(client) -> None:
+    files = [{"path": "src/ok.py", "content_b64": _b64("fine")}]
+    resp = client.post("/save-batch", json={"files": files, "branch": "main"})
+    assert resp.status_code == 403
+    assert not (client.out / "src" / "ok.py").exists()
+
+
+def test_saves_within_debounce_window_share_a_commit(client) -> None:
+    jobs = []
+    for i in range(5):
+        resp = client.post("/save", json={"path": f"src/f{i}.py", "content_b64": _b64(str(i)), "branch": "lane/q", "message": f"save {i}"})
+        assert resp.status_code == 202
+        jobs.append(resp.get_json()["job"])
+    results = [_wait(client, job) for job in jobs]
+    assert {r["status"] for r in results} == {"done"}
+    assert len({r["commit"] for r in results}) == 1
+    assert _git(client.origin, "rev-list", "--count", "lane/q").strip() == "2"
+    assert client.get("/jobs/unknown").status_code == 404
+
+
+def test_failed_push_is_retried_without_blocking_saves(client) -> None:
+    _git(client.repo, "remote", "set-url", "origin", str(client.out / "missing.git"))
+    first = client.post("/save", json={"path": "src/a.py", "content_b64": _b64("a"), "branch": "lane/r"}).get_json()["job"]
+    deadline = time.monotonic() + 30
+    while client.get(f"/jobs/{first}").get_json()["push_attempts"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    status = client.get(f"/jobs/{first}").get_json()
+    assert status["status"] in ("retrying", "pushing") and status["commit"]
+
+    # Saves keep being committed while the push is failing.
+    second = client.post("/save", json={"path": "src/b.py", "content_b64": _b64("b"), "branch": "lane/r"}).get_json()["job"]
+    _git(client.repo, "remote", "set-url", "origin", str(client.origin))
+    assert _wait(client, first)["status"] == "done"
+    assert _wait(client, second)["status"] == "done"
+    assert _git(client.origin, "show", "lane/r:src/b.py") == "b"
+
+
+def test_resave_after_exhausted_push_still_reaches_remote(client, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(server, "PUSH_MAX_RETRIES", 1)
+    _git(client.repo, "remote", "set-url", "origin", str(client.out / "missing.git"))
+    body = {"path": "src/a.py", "content_b64": _b64("a"), "branch": "lane/x"}
+    assert _wait(client, client.post("/save", json=body).get_json()["job"])["status"] == "failed"
+
+    # Same content again: the commit is a no-op, but the branch is still ahead.
+    _git(client.repo, "remote", "set-url", "origin", str(client.origin))
+    assert _wait(client, client.post("/save", json=body).get_json()["job"])["status"] == "done"
+    assert _git(client.origin, "show", "lane/x:src/a.py") == "a"
+
+
+def test_raw_upload_streams_to_disk(client) -> None:
+    payload = bytes(range(256)) * 8192  # 2 MiB of binary data
+    sha = hashlib.sha256(payload).hexdigest()
+    resp = client.put("/upload/src/blob.bin?branch=lane/up", data=payload, headers={"X-Content-SHA256": sha})
+    assert resp.status_code == 202, resp.get_json()
+    assert resp.get_json()["sha256"] == sha
+    assert (client.out / "src" / "blob.bin").read_bytes() == payload
+    assert _wait(client, resp.get_json()["job"])["status"] == "done"
+    assert not [p for p in (client.out / "src").iterdir() if p.name.endswith(".tmp")]
+
+    bad = client.put("/upload/src/other.bin", data=b"abc", headers={"X-Content-SHA256": "0" * 64})
+    assert bad.status_code == 422
+    assert not (client.out / "src" / "other.bin").exists()
+    assert client.put("/upload/etc/passwd", data=b"x").status_code == 403
+
+
+def test_upload_mirrors_the_bytes_it_was_saved_with(client) -> None:
+    first = client.put("/upload/src/f.txt?branch=lane/x", data=b"AAA")
+    second = client.put("/upload/src/f.txt?branch=lane/y", data=b"BBB")
+    assert (first.status_code, second.status_code) == (202, 202)
+    assert _wait(client, first.get_json()["job"])["status"] == "done"
+    assert _wait(client, second.get_json()["job"])["status"] == "done"
+    assert _git(client.origin, "show", "lane/x:src/f.txt") == "AAA"
+    assert _git(client.origin, "show", "lane/y:src/f.txt") == "BBB"
+    assert not list(server._MIRROR.spool_dir.iterdir())
+
+
+def test_mirror_job_fails_if_snapshot_changed(client) -> None:
+    mirror = server._mirror()
+    source = client.out / "live.txt"
+    source.write_bytes(b"AAA")
+    job = mirror.submit("lane/z", [("live.txt", source)], "m", shas={"live.txt": hashlib.sha256(b"XXX").hexdigest()})
+    job = _wait(client, job.id)
+    assert job["status"] == "failed" and "changed before it was committed" in job["error"]
+    assert "lane/z" not in _git(client.origin, "branch", "--list")
+
+
+def test_resumable_upload_with_offsets_and_checksums(client) -> None:
+    payload = b"0123456789" * 1000
+    start = client.post(
+        "/uploads",
+        json={"path": "src/big.txt", "size": len(payload), "sha256": hashlib.sha256(payload).hexdigest(), "branch": "lane/up"},
+    )
+    assert start.status_code == 201
+    url = start.get_json()["upload_url"]
+
+    first = client.patch(url, data=payload[:4000], headers={"Upload-Offset": "0"})
+    assert first.get_json()["offset"] == 4000 and not first.get_json()["complete"]
+
+    # A retried chunk at a stale offset is rejected with the current offset.
+    stale = client.patch(url, data=payload[:4000], headers={"Upload-Offset": "0"})
+    assert stale.status_code == 409 and stale.get_json()["offset"] == 4000
+
+    corrupt = client.patch(url, data=b"x" * 1000, headers={"Upload-Offset": "4000", "X-Chunk-SHA256": hashlib.sha256(payload[4000:5000]).hexdigest()})
+    assert corrupt.status_code == 422
+    assert client.head(url).headers["Upload-Offset"] == "4000"
+
+    done = client.patch(url, data=payload[4000:], headers={"Upload-Offset": "4000"})
+    assert done.status_code == 202 and done.get_json()["complete"]
+    assert (client.out / "src" / "big.txt").read_bytes() == payload
+    assert _wait(client, done.get_json()["job"])["status"] == "done"
+    assert _git(client.origin, "show", "lane/up:src/big.txt") == payload.decode()
+    assert client.get("/uploads/doesnotexist").status_code == 404
+
+
+def test_abandoned_uploads_are_swept(client, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(server, "UPLOAD_TTL", 0.05)
+    monkeypatch.setattr(server, "UPLOAD_SWEEP_INTERVAL", 0)
+    old = client.post("/uploads", json={"path": "src/old.txt", "size": 10, "branch": "lane/up"}).get_json()
+    client.patch(old["upload_url"], data=b"12345", headers={"Upload-Offset": "0"})
+    assert list((client.out / "src").glob(".old.txt.*.part"))
+    time.sleep(0.1)
+    new = client.post("/uploads", json={"path": "src/new.txt", "size": 1, "branch": "lane/up"}).get_json()
+    assert client.get(old["upload_url"]).status_code == 404
+    assert not list((client.out / "src").glob(".old.txt.*.part"))
+    assert client.get(new["upload_url"]).status_code == 200
+
+
+def test_unchanged_saves_skip_disk_and_git(client, monkeypatch: pytest.MonkeyPatch) -> None:
+    body = {"path": "src/same.py", "content_b64": _b64("same\n"), "branch": "lane/d"}
+    first = client.post("/save", json=body)
+    assert first.status_code == 202
+    sha = hashlib.sha256(b"same\n").hexdigest()
+    assert first.headers["ETag"] == f'"{sha}"'
+    _wait(client, first.get_json()["job"])
+
+    target = client.out / "src" / "same.py"
+    mtime = target.stat().st_mtime_ns
+    calls = []
+    monkeypatch.setattr(server, "_git", lambda *a, **k: calls.append(a))
+    again = client.post("/save", json=body)
+    assert again.status_code == 200 and again.get_json()["unchanged"]
+    assert target.stat().st_mtime_ns == mtime and calls == []
+
+    # The hash alone is enough when the content is current ...
+    assert client.post("/save", json={"path": "src/same.py", "branch": "lane/d"}, headers={"If-None-Match": f'"{sha}"'}).status_code == 304
+    # ... but a different branch still needs its own commit, so content is required.
+    other = client.post("/save", json={"path": "src/same.py", "branch": "lane/e"}, headers={"If-None-Match": f'"{sha}"'})
+    assert other.status_code == 412
+
+    # Edits made behind the server's back invalidate the index entry.
+    target.write_text("edited\n", encoding="utf-8")
+    assert client.post("/save", json={"path": "src/same.py", "branch": "lane/d"}, headers={"If-None-Match": sha}).status_code == 412
+
+
+def test_batch_only_writes_and_commits_changed_files(client) -> None:
+    files = [{"path": f"src/b{i}.py", "content_b64": _b64(f"{i}")} for i in range(3)]
+    first = client.post("/save-batch", json={"files": files, "branch": "lane/d"})
+    _wait(client, first.get_json()["job"])
+    files[1]["content_b64"] = _b64("changed")
+    second = client.post("/save-batch", json={"files": files, "branch": "lane/d"})
+    assert second.status_code == 202
+    assert second.get_json()["unchanged"] == ["src/b0.py", "src/b2.py"]
+    job = _wait(client, second.get_json()["job"])
+    assert job["paths"] == ["src/b1.py"]
+    assert client.post("/save-batch", json={"files": files, "branch": "lane/d"}).status_code == 200
+
+
+def test_branch_worktrees_commit_in_parallel_without_touching_repo(client, monkeypatch) -> None:
+    monkeypatch.setattr(server, "BRANCH_WORKTREES", True)
+    jobs = {}
+    for branch in ("lane/w1", "lane/w2", "lane/w3"):
+        resp = client.post("/save", json={"path": "src/w.py", "content_b64": _b64(branch), "branch": branch})
+        jobs[branch] = resp.get_json()["job"]
+    for branch, job in jobs.items():
+        assert _wait(client, job)["status"] == "done"
+        assert _git(client.origin, "show", f"{branch}:src/w.py") == branch
+    assert _git(client.repo, "rev-parse", "--abbrev-ref", "HEAD").strip() == "main"
+    assert not (client.repo / "src").exists()
+
+
+def test_job_status_survives_the_owning_process(client) -> None:
+    job = client.post("/save", json={"path": "src/s.py", "content_b64": _b64("s"), "branch": "lane/s"}).get_json()["job"]
+    _wait(client, job)
+    # A fresh queue stands in for another worker process sharing the job store.
+    server._MIRROR.stop()
+    server._MIRROR = None
+    status = client.get(f"/jobs/{job}").get_json()
+    assert status["status"] == "done" and status["paths"] == ["src/s.py"]
+
+
+def test_old_jobs_are_pruned_from_the_store(client, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(server, "JOB_MAX_AGE", 0.3)
+    old = client.post("/save", json={"path": "src/o.py", "content_b64": _b64("o"), "branch": "lane/o"}).get_json()["job"]
+    _wait(client, old)
+    time.sleep(0.4)
+    new = client.post("/save", json={"path": "src/n.py", "content_b64": _b64("n"), "branch": "lane/o"}).get_json()["job"]
+    _wait(client, new)
+    server._MIRROR.stop()
+    server._MIRROR = None
+    assert client.get(f"/jobs/{old}").status_code == 404
+    assert client.get(f"/jobs/{new}").get_json()["status"] == "done"
+
+
+def test_metrics_report_phases_requests_and_git_failures(client) -> None:
+    job = client.post("/save", json={"path": "src/m.py", "content_b64": _b64("m"), "branch": "lane/m"}).get_json()["job"]
+    _wait(client, job)
+    client.post("/save", json={"path": "../bad.py", "content_b64": _b64("m")})
+    server._git("rev-parse", "--verify", "-q", "no-such-ref", cwd=client.repo, check=False)  # a probe, not a failure
+    with pytest.raises(subprocess.CalledProcessError):
+        server._git("rev-parse", "--verify", "-q", "no-such-ref", cwd=client.repo)
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200 and resp.mimetype == "text/plain"
+    text = resp.get_data(as_text=True)
+    for phase in ("decode", "write", "workspace", "checkout", "add", "commit", "push"):
+        assert f'drop_phase_seconds_count{{phase="{phase}"}}' in text
+    assert 'drop_requests_total{endpoint="/save",method="POST",status="202"} 1' in text
+    assert 'drop_requests_total{endpoint="/save",method="POST",status="400"} 1' in text
+    assert 'drop_request_bytes_total{endpoint="/save",status="202"}' in text
+    assert 'drop_git_failures_total{command="rev-parse",reason="exit"} 1' in text
+    assert "drop_mirror_queue_depth 0" in text
+
+
+def test_lane_config_is_enforced_and_hot_reloaded(client) -> None:
+    config = server.FRAMEWORK_CONFIG
+    config.write_text('{"lanes": [{"name": "docs", "branchPrefix": "lane/docs/", "allowedPaths": ["src/docs/"]}]}')
+    store = server.shared_store(config)
+    store.reload()
+    version = client.get("/health").get_json()["config_version"]
+    assert version
+
+    payload = {"content_b64": _b64("x\n"), "branch": "lane/docs/a"}
+    assert client.post("/save", json={**payload, "path": "src/docs/a.md"}).status_code == 202
+    denied = client.post("/save", json={**payload, "path": "src/app.py"})
+    assert denied.status_code == 403 and denied.get_json()["allowed"] == ["src/docs/"]
+    other = client.post("/save", json={**payload, "path": "src/docs/a.md", "branch": "lane/other"})
+    assert other.status_code == 403
+    batch = client.post("/save-batch", json={"files": [{"path": "src/app.py", "content_b64": _b64("y")}], "branch": "lane/docs/a"})
+    assert batch.status_code == 403 and batch.get_json()["index"] == 0
+
+    # An edit to the file takes effect without restarting the server.
+    config.write_text('{"lanes": [{"name": "code", "branchPrefix": "lane/", "allowedPaths": ["src/"]}]}')
+    assert store.reload()
+    assert client.get("/health").get_json()["config_version"] != version
+    assert client.post("/save", json={**payload, "path": "src/app.py", "branch": "lane/other"}).status_code == 202
+
+    # allowedPaths are sparse-checkout patterns, not just directory prefixes.
+    config.write_text('{"lanes": [{"name": "code", "branchPrefix": "lane/", "allowedPaths": ["src/pkg/**", "src/*.md"]}]}')
+    assert store.reload()
+    assert client.post("/save", json={**payload, "path": "src/pkg/app.py"}).status_code == 202
+    assert client.post("/save", json={**payload, "path": "src/NOTES.md"}).status_code == 202
+    assert client.post("/save", json={**payload, "path": "src/other/NOTES.md"}).status_code == 403
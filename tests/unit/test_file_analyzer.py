@@ -0,0 +1,59 @@
+"""Unit tests for bulk file scanning."""
+
+import hashlib
+from pathlib import Path
+
+from src.tools._walk import IgnoreRules
+from src.tools.file_analyzer import FileAnalyzerTool, hash_file
+
+
+def test_hash_file_reports_lines_type_and_digest(tmp_path: Path) -> None:
+    path = tmp_path / "a.py"
+    path.write_bytes(b"one\ntwo\nthree")
+    info = hash_file(path)
+    assert info["size_bytes"] == 13
+    assert info["line_count"] == 3
+    assert info["type"] == "text/x-python"
+    assert info["sha256"] == hashlib.sha256(b"one\ntwo\nthree").hexdigest()
+
+    blob = tmp_path / "blob"
+    blob.write_bytes(b"\0\1\2" * 1000)
+    assert hash_file(blob)["line_count"] is None
+    assert hash_file(blob)["type"] == "application/octet-stream"
+
+
+def test_scan_respects_gitignore_and_caches(tmp_path: Path) -> None:
+    (tmp_path / ".gitignore").write_text("*.log\nbuild/\n")
+    (tmp_path / "keep.txt").write_text("hello\n")
+    (tmp_path / "debug.log").write_text("noise\n")
+    (tmp_path / "build").mkdir()
+    (tmp_path / "build" / "out.txt").write_text("artifact\n")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / ".gitignore").write_text("secret.txt\n")
+    (tmp_path / "sub" / "secret.txt").write_text("x\n")
+    (tmp_path / "sub" / "public.txt").write_text("y\n")
+
+    tool = FileAnalyzerTool()
+    first = tool.scan(tmp_path)
+    assert sorted(first["files"]) == [".gitignore", "keep.txt", "sub/.gitignore", "sub/public.txt"]
+    assert first["stats"]["hashed"] == 4
+
+    second = tool.scan(tmp_path)
+    assert second["stats"] == {"hashed": 0, "cached": 4}
+    assert second["changed"] == []
+
+    (tmp_path / "keep.txt").write_text("changed content\n")
+    (tmp_path / "sub" / "public.txt").unlink()
+    third = tool.scan(tmp_path)
+    assert third["changed"] == ["keep.txt"]
+    assert third["removed"] == ["sub/public.txt"]
+
+
+def test_ignore_rules_negation_and_anchoring() -> None:
+    rules = IgnoreRules().extend("", ["*.tmp", "!keep.tmp", "/top.txt", "docs/**/draft.md"])
+    assert rules.ignored("a/b.tmp", False)
+    assert not rules.ignored("keep.tmp", False)
+    assert rules.ignored("top.txt", False)
+    assert not rules.ignored("nested/top.txt", False)
+    assert rules.ignored("docs/x/y/draft.md", False)
+    assert rules.ignored("docs/draft.md", False)
@@ -0,0 +1,69 @@
+"""Unit tests for the persistent file index behind FileSystemTool."""
+
+from pathlib import Path
+
+from src.tools.file_index import FileIndex
+from src.tools.fs import FileSystemTool
+
+
+def _tree(root: Path) -> None:
+    for rel in ["a.py", "b.txt", "src/pkg/mod.py", "src/pkg/data.json", "build/out.py", "docs/x.md"]:
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x")
+    (root / ".gitignore").write_text("build/\n*.json\n")
+
+
+def test_glob_matches_path_glob_semantics(tmp_path: Path) -> None:
+    _tree(tmp_path)
+    index = FileIndex(tmp_path, use_inotify=False)
+    assert index.glob("*.py") == ["a.py"]
+    assert index.glob("**/*.py") == ["a.py", "src/pkg/mod.py"]
+    assert index.glob("src/*/*.py") == ["src/pkg/mod.py"]
+    assert index.prefix("src/") == ["src/pkg/mod.py"]
+    # Ignored paths never reach the index.
+    assert "build/out.py" not in index.files()
+    assert "src/pkg/data.json" not in index.files()
+
+
+def test_index_sees_additions_and_removals(tmp_path: Path) -> None:
+    _tree(tmp_path)
+    for use_inotify in (False, True):
+        index = FileIndex(tmp_path, cache_path=tmp_path / f"idx-{use_inotify}.json", use_inotify=use_inotify)
+        assert "docs/new.md" not in index.files()
+        (tmp_path / "docs" / "new.md").write_text("y")
+        assert "docs/new.md" in index.files()
+        (tmp_path / "docs" / "new.md").unlink()
+        assert "docs/new.md" not in index.files()
+        index.close()
+
+
+def test_index_persists_between_instances(tmp_path: Path) -> None:
+    _tree(tmp_path)
+    cache = tmp_path / "index.json"
+    FileIndex(tmp_path, cache_path=cache, use_inotify=False).files()
+    assert cache.is_file()
+    second = FileIndex(tmp_path, cache_path=cache, use_inotify=False)
+    second._load()
+    assert "src/pkg" in second._dirs
+
+
+def test_gitignore_edits_are_picked_up(tmp_path: Path) -> None:
+    _tree(tmp_path)
+    index = FileIndex(tmp_path, use_inotify=False)
+    assert "b.txt" in index.files()
+    (tmp_path / ".gitignore").write_text("build/\n*.json\n*.txt\n")
+    assert "b.txt" not in index.files()
+
+
+def test_filesystem_tool_lists_through_index(tmp_path: Path) -> None:
+    _tree(tmp_path)
+    tool = FileSystemTool(tmp_path, use_index=True)
+    assert tool.list_files("**/*.py") == [str(tmp_path / "a.py"), str(tmp_path / "src/pkg/mod.py")]
+    # Unfiltered listings stay the default, ignored files included.
+    plain = FileSystemTool(tmp_path)
+    assert sorted(plain.list_files("**/*.py")) == [str(tmp_path / p) for p in ("a.py", "build/out.py", "src/pkg/mod.py")]
+    assert plain.list_files("**/*.py", use_index=True) == tool.list_files("**/*.py")
+    assert plain.list_prefix("b") == [str(tmp_path / "b.txt"), str(tmp_path / "build/out.py")]
+    assert tool.list_prefix("b") == [str(tmp_path / "b.txt")]
+    assert plain.list_prefix("src/pkg/m", use_index=True) == [str(tmp_path / "src/pkg/mod.py")]
@@ -0,0 +1,125 @@
+"""Unit tests for the routing and lane config subsystem."""
+
+import json
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from src.config import Settings
+from src.framework_config import (
+    ConfigError,
+    ConfigStore,
+    LaneConfig,
+    compile_schema,
+    load_config,
+    sparse_patterns,
+    validator_for,
+)
+from src.git_integration import load_lanes
+from src.service_router import CostOptimizedServiceRouter
+
+CONFIG = {
+    "routing": {"defaultAgent": "claude", "maxTaskCost": 2.5},
+    "lanes": [
+        {"name": "docs", "branchPrefix": "lane/docs/", "defaultAgent": "gemini", "allowedPaths": ["docs/"]},
+        {"name": "ui", "branchPrefix": "lane/", "defaultAgent": "aider"},
+        {"name": "local", "branchPrefix": "local/", "defaultAgent": "ollama"},
+    ],
+    "tasks": [
+        {"label": "write-docs", "command": "run", "lane": "docs"},
+        {"label": "misc", "command": "run"},
+    ],
+    "integrations": {"github": {"defaultBranch": "main"}},
+}
+
+
+def _write(path: Path, data: dict) -> None:
+    # Bump the mtime explicitly: coarse timestamps could hide a rewrite.
+    old = path.stat().st_mtime_ns if path.exists() else 0
+    path.write_text(json.dumps(data), encoding="utf-8")
+    os.utime(path, ns=(old + 10**9, old + 10**9))
+
+
+def test_load_config_builds_immutable_indexes(tmp_path: Path) -> None:
+    path = tmp_path / "agentic.config.json"
+    _write(path, CONFIG)
+    config = load_config(path)
+
+    assert config.lane_for("lane/docs/intro").name == "docs"  # longest prefix
+    assert config.lane_for("lane/x").name == "ui"
+    assert config.lane_for("docs").name == "docs"  # exact name
+    assert config.lane_for("feature/x") is None
+    assert config.service_for("write-docs") == "gemini"
+    assert config.service_for("misc") == "anthropic"
+    assert config.service_for(branch="local/one") == "ollama"
+    assert config.service_for(lane="gone", branch="local/one") == "ollama"  # unknown lane name
+    assert config.tasks_by_label["write-docs"].lane == "docs"
+    assert config.integrations["github"]["defaultBranch"] == "main"
+    with pytest.raises(TypeError):
+        config.integrations["github"]["defaultBranch"] = "dev"  # type: ignore[index]
+    with pytest.raises(AttributeError):
+        config.routing.default_agent = "gemini"  # type: ignore[misc]
+    assert [lane.name for lane in load_lanes(path)] == ["docs", "ui", "local"]
+
+
+def test_schema_errors_are_reported(tmp_path: Path) -> None:
+    path = tmp_path / "agentic.config.json"
+    _write(path, {"routing": {"defaultAgent": "gpt", "quotaWarn": 2}, "lanes": [{"name": "x"}]})
+    with pytest.raises(ConfigError) as info:
+        load_config(path)
+    errors = " | ".join(info.value.errors)
+    assert "routing.defaultAgent" in errors and "routing.quotaWarn" in errors
+    assert "branchPrefix" in errors
+    assert validator_for() is validator_for()  # compiled once
+    assert compile_schema({"type": "number"})(True)  # bools are not numbers
+
+
+@pytest.mark.parametrize(
+    "allowed, path, expected",
+    [
+        (["src/"], "src/pkg/a.py", True),
+        (["src/"], "srcx/a.py", False),
+        (["src/**"], "src/pkg/a.py", True),
+        (["*.md"], "README.md", True),
+        (["*.md"], "docs/a.md", False),  # anchored, as in the sparse checkout
+        (["**/*.md"], "docs/a.md", True),
+        (["docs/**/index.md"], "docs/index.md", True),
+        (["./src", "!src/secret.py"], "src/secret.py", False),
+        ([], "anything.txt", True),
+    ],
+)
+def test_lane_paths_match_the_sparse_checkout(allowed, path, expected) -> None:
+    lane = LaneConfig("l", "lane/", allowed_paths=tuple(allowed))
+    assert lane.allows(path) is expected
+    assert sparse_patterns(["./src/", "!docs/x"]) == ("/src/", "!/docs/x")
+
+
+def test_store_swaps_new_versions_and_keeps_last_good(tmp_path: Path) -> None:
+    path = tmp_path / "agentic.config.json"
+    _write(path, CONFIG)
+    store = ConfigStore(path, poll_interval=0.05)
+    swapped = threading.Event()
+    store.subscribe(lambda config: swapped.set())
+    router = CostOptimizedServiceRouter(Settings(), config=store)
+    assert router.service_for({"task_label": "write-docs"}) == "gemini"
+
+    first = store.current
+    path.touch()
+    assert not store.reload()  # same content: no new version
+    assert store.current is first
+
+    store.start()
+    try:
+        _write(path, {**CONFIG, "routing": {"defaultAgent": "ollama"}})
+        assert swapped.wait(5)
+        assert router.service_for({"task_label": "misc"}) == "ollama"
+        assert router.service_for({"task_label": "misc", "service": "gemini"}) == "gemini"
+
+        current = store.current
+        _write(path, {"routing": {}})  # invalid: defaultAgent is required
+        assert not store.reload()
+        assert store.current is current and store.last_error is not None
+    finally:
+        store.stop()
@@ -0,0 +1,70 @@
+"""Unit tests for the persistent git cat-file backend."""
+
+import subprocess
+from pathlib import Path
+
+from src.tools.git_batch import GitBatch
+from src.tools.git_tool import GitTool
+
+
+def _git(root: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+        cwd=root,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+
+def _make_repo(root: Path) -> None:
+    (root / "a.txt").write_text("alpha\n", encoding="utf-8")
+    (root / "dir").mkdir()
+    (root / "dir" / "b.txt").write_text("beta\n", encoding="utf-8")
+    _git(root, "init", "-q", "-b", "main")
+    _git(root, "add", ".")
+    _git(root, "commit", "-qm", "init")
+
+
+def test_batch_queries_and_cache(tmp_path: Path) -> None:
+    _make_repo(tmp_path)
+    head = _git(tmp_path, "rev-parse", "HEAD").strip()
+    with GitBatch(tmp_path) as batch:
+        assert batch.rev_parse(["HEAD", "nope"]) == {"HEAD": head, "nope": None}
+        files = batch.show_files("HEAD", ["a.txt", "dir/b.txt", "dir", "missing"])
+        assert files == {"a.txt": b"alpha\n", "dir/b.txt": b"beta\n", "dir": None, "missing": None}
+
+        commit = batch.read(head)
+        assert commit is not None and commit.type == "commit"
+        assert batch.read(head) is commit  # served from the SHA cache
+        assert batch.read("-p") is None
+
+        # Refs are resolved by git on every call, so new commits are visible.
+        (tmp_path / "a.txt").write_text("changed\n", encoding="utf-8")
+        _git(tmp_path, "commit", "-qam", "second")
+        assert batch.rev_parse(["HEAD"])["HEAD"] != head
+        assert batch.show_files("HEAD", ["a.txt"]) == {"a.txt": b"changed\n"}
+
+
+def test_git_tool_matches_subprocess_output(tmp_path: Path) -> None:
+    _make_repo(tmp_path)
+    fast = GitTool(tmp_path)
+    slow = GitTool(tmp_path, use_batch=False)
+    try:
+        for command in (
+            ["rev-parse", "HEAD", "main"],
+            ["rev-parse", "--verify", "HEAD"],
+            ["cat-file", "-t", "HEAD"],
+            ["cat-file", "-s", "HEAD:a.txt"],
+            ["cat-file", "-p", "HEAD"],
+            ["cat-file", "blob", "HEAD:a.txt"],
+            ["show", "HEAD:dir/b.txt"],
+            ["rev-parse", "--abbrev-ref", "HEAD"],
+            ["rev-parse", "does-not-exist"],
+            ["show", "HEAD:dir"],
+        ):
+            expected, actual = slow.run(command), fast.run(command)
+            assert (actual["exit_code"], actual["stdout"]) == (expected["exit_code"], expected["stdout"]), command
+        assert fast._batch is not None
+    finally:
+        fast.close()
@@ -0,0 +1,171 @@
+"""Unit tests for the pooled lane worktree manager."""
+
+import subprocess
+import threading
+from pathlib import Path
+
+import pytest
+
+from src.framework_config import ConfigStore
+from src.git_integration import GitLaneManager, WorktreePoolExhausted
+
+
+def _git(root: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+        cwd=root,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+
+def _make_repo(root: Path) -> None:
+    (root / "a.txt").write_text("alpha\n", encoding="utf-8")
+    (root / ".gitignore").write_text("worktrees/\n", encoding="utf-8")
+    _git(root, "init", "-q", "-b", "main")
+    _git(root, "add", ".")
+    _git(root, "commit", "-qm", "init")
+    _git(root, "branch", "lane/existing")
+
+
+def test_lanes_reuse_pooled_worktrees(tmp_path: Path) -> None:
+    _make_repo(tmp_path)
+    manager = GitLaneManager(tmp_path, pool_size=2, warm=0)
+    first = Path(manager.create_lane_worktree("lane/existing")["path"])
+    assert _git(first, "branch", "--show-current").strip() == "lane/existing"
+    assert manager.create_lane_worktree("lane/existing")["path"] == str(first)
+
+    (first / "scratch.txt").write_text("junk", encoding="utf-8")
+    (first / "a.txt").write_text("dirty", encoding="utf-8")
+    assert manager.release_lane("lane/existing")
+    assert not manager.release_lane("lane/existing")
+
+    # The released worktree is recycled, reset and switched to a new branch.
+    second = Path(manager.create_lane_worktree("lane/new")["path"])
+    assert second == first
+    assert _git(second, "branch", "--show-current").strip() == "lane/new"
+    assert not (second / "scratch.txt").exists()
+    assert (second / "a.txt").read_text(encoding="utf-8") == "alpha\n"
+
+    manager.create_lane_worktree("lane/existing")
+    with pytest.raises(WorktreePoolExhausted):
+        manager.create_lane_worktree("lane/third")
+    manager.close()
+    assert manager.stats() == {"total": 2, "idle": 0, "lanes": 2}
+
+    # State survives a restart of the manager.
+    restarted = GitLaneManager(tmp_path, pool_size=2, warm=0)
+    assert restarted.create_lane_worktree("lane/new")["path"] == str(second)
+
+
+def test_concurrent_callers_share_one_worktree(tmp_path: Path) -> None:
+    _make_repo(tmp_path)
+    manager = GitLaneManager(tmp_path, pool_size=4, warm=0)
+    paths = []
+    threads = [threading.Thread(target=lambda: paths.append(manager.create_lane_worktree("lane/x")["path"])) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(set(paths)) == 1
+    assert manager.stats()["total"] == 1
+
+
+def test_warming_eviction_and_pruning(tmp_path: Path) -> None:
+    _make_repo(tmp_path)
+    manager = GitLaneManager(tmp_path, pool_size=4, warm=2, idle_timeout=0)
+    assert manager.warm_pool() == 2
+    assert manager.stats() == {"total": 2, "idle": 2, "lanes": 0}
+
+    manager.create_lane_worktree("lane/a")
+    manager.close()  # background warming refills the idle set
+    assert manager.stats() == {"total": 3, "idle": 2, "lanes": 1}
+
+    manager.release_lane("lane/a")
+    assert manager.stats() == {"total": 2, "idle": 2, "lanes": 0}
+
+    manager.warm = 0
+    assert len(manager.evict_idle()) == 2
+    assert not any(p.name.startswith("pool-") for p in (tmp_path / "worktrees").iterdir())
+    assert _git(tmp_path, "worktree", "list").count("\n") == 1
+
+
+def _make_scoped_repo(root: Path) -> None:
+    for rel in ("src/app.py", "src/lib/util.py", "docs/guide.md", "README.md"):
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).write_text(rel, encoding="utf-8")
+    (root / ".gitignore").write_text("worktrees/\n", encoding="utf-8")
+    _git(root, "init", "-q", "-b", "main")
+    _git(root, "add", ".")
+    _git(root, "commit", "-qm", "init")
+    (root / "lanes.json").write_text(
+        '{"lanes": [{"name": "code", "branchPrefix": "lane/code/", "allowedPaths": ["src/"]},'
+        ' {"name": "all", "branchPrefix": "lane/"}]}',
+        encoding="utf-8",
+    )
+
+
+def _checked_out(path: Path) -> set:
+    return {p.relative_to(path).as_posix() for p in path.rglob("*") if p.is_file() and ".git" not in p.parts}
+
+
+def test_lane_worktrees_are_sparse(tmp_path: Path) -> None:
+    _make_scoped_repo(tmp_path)
+    manager = GitLaneManager(tmp_path, pool_size=2, warm=0, lanes_config_path=tmp_path / "lanes.json")
+    assert manager.lane_for("lane/code/fix").name == "code"
+    assert manager.lane_for("lane/docs").name == "all"
+    assert manager.lane_for("other") is None
+
+    code = Path(manager.create_lane_worktree("lane/code/fix")["path"])
+    assert _checked_out(code) == {"src/app.py", "src/lib/util.py"}
+    manager.release_lane("lane/code/fix")
+
+    # Reusing the worktree for an unscoped lane restores the full tree.
+    full = Path(manager.create_lane_worktree("lane/docs")["path"])
+    assert full == code
+    assert "docs/guide.md" in _checked_out(full)
+    manager.close()
+    # The main worktree is unaffected by the per-worktree sparse config.
+    assert (tmp_path / "docs" / "guide.md").exists()
+
+
+def test_lanes_follow_config_store_reloads(tmp_path: Path) -> None:
+    _make_scoped_repo(tmp_path)
+    store = ConfigStore(tmp_path / "lanes.json")
+    manager = GitLaneManager(tmp_path, pool_size=1, warm=0, config=store)
+    assert manager.lane_for("lane/code/fix").name == "code"
+
+    (tmp_path / "lanes.json").write_text('{"lanes": [{"name": "docs", "branchPrefix": "lane/code/", "allowedPaths": ["docs/"]}]}')
+    assert store.reload(force=True)
+    assert manager.lane_for("lane/code/fix").name == "docs"
+    assert manager.lane_for("lane/other") is None
+    docs = Path(manager.create_lane_worktree("lane/code/fix")["path"])
+    assert _checked_out(docs) == {"docs/guide.md"}
+    manager.close()
+
+
+def test_partial_clone_with_sparse_paths(tmp_path: Path) -> None:
+    origin = tmp_path / "origin"
+    origin.mkdir()
+    _make_scoped_repo(origin)
+    _git(origin, "config", "uploadpack.allowFilter", "true")
+
+    manager = GitLaneManager.clone(f"file://{origin}", tmp_path / "clone", sparse_paths=["src/"], warm=0)
+    assert _checked_out(manager.repo_dir) == {"src/app.py", "src/lib/util.py"}
+    assert _git(manager.repo_dir, "config", "remote.origin.partialclonefilter").strip() == "blob:none"
+    assert manager.fetch("origin")
+    assert not manager.fetch("missing")
+
+
+def test_startup_outside_a_repository(tmp_path: Path) -> None:
+    manager = GitLaneManager(tmp_path, warm=0)  # the start-up prune is best effort
+    assert manager.stats()["total"] == 0
+
+
+def test_lane_named_like_a_file(tmp_path: Path) -> None:
+    _make_repo(tmp_path)
+    manager = GitLaneManager(tmp_path, pool_size=1, warm=0)
+    path = Path(manager.create_lane_worktree("a.txt")["path"])
+    assert _git(path, "branch", "--show-current").strip() == "a.txt"
+    manager.close()
@@ -0,0 +1,152 @@
+"""Unit tests for GitHubAPITool against a local stand-in for the GitHub API."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import pytest
+
+from src.tools.github_api import GitHubAPITool
+
+
+class FakeGitHub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.lock = threading.Lock()
+        self.log: List[Dict[str, Any]] = []
+        self.connections: set = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.delay = 0.0
+        self.rate: Dict[str, str] = {}
+        self.status: Dict[str, int] = {}
+        self.validator = "etag"
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is visible
+    server: FakeGitHub
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        srv = self.server
+        with srv.lock:
+            srv.connections.add(self.client_address)
+            srv.log.append({"path": self.path, "headers": dict(self.headers)})
+            srv.in_flight += 1
+            srv.max_in_flight = max(srv.max_in_flight, srv.in_flight)
+        time.sleep(srv.delay)
+        with srv.lock:
+            srv.in_flight -= 1
+        name = self.path[len("/repos/"):]
+        status = srv.status.get(name, 200)
+        etag, modified = f'"v-{name}"', "Mon, 05 Oct 2026 10:00:00 GMT"
+        if status == 200 and (
+            self.headers.get("If-None-Match") == etag or self.headers.get("If-Modified-Since") == modified
+        ):
+            status = 304
+        body = b"" if status == 304 else json.dumps({"full_name": name, "stargazers_count": 7}).encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        if srv.validator == "etag":
+            self.send_header("ETag", etag)
+        else:
+            self.send_header("Last-Modified", modified)
+        for header, value in srv.rate.items():
+            self.send_header(header, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def github() -> Iterator[FakeGitHub]:
+    server = FakeGitHub()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _tool(server: FakeGitHub, tmp_path: Path, **kwargs: Any) -> GitHubAPITool:
+    return GitHubAPITool("secret", base_url=server.url, cache_dir=tmp_path, **kwargs)
+
+
+def test_conditional_requests_reuse_persistent_cache(github: FakeGitHub, tmp_path: Path) -> None:
+    tool = _tool(github, tmp_path)
+    first = tool.run("octo/cat")
+    assert first == {"full_name": "octo/cat", "description": None, "stargazers_count": 7, "forks_count": None}
+    assert tool.run("octo/cat") == first
+    assert tool.stats["not_modified"] == 1
+    assert github.log[1]["headers"]["If-None-Match"] == '"v-octo/cat"'
+    assert github.log[0]["headers"]["Authorization"] == "token secret"
+    tool.close()
+
+    # A new tool (another process) revalidates from the on-disk cache.
+    again = _tool(github, tmp_path)
+    assert again.run("octo/cat") == first
+    assert again.stats == {"requests": 1, "not_modified": 1, "throttled_seconds": 0.0}
+    # Another token does not see this token's cached responses.
+    other = GitHubAPITool("other", base_url=github.url, cache_dir=tmp_path)
+    other.run("octo/cat")
+    assert "If-None-Match" not in github.log[-1]["headers"]
+
+
+def test_last_modified_validator(github: FakeGitHub, tmp_path: Path) -> None:
+    github.validator = "last-modified"
+    tool = _tool(github, tmp_path)
+    tool.run("octo/dog")
+    tool.run("octo/dog")
+    assert github.log[1]["headers"]["If-Modified-Since"] == "Mon, 05 Oct 2026 10:00:00 GMT"
+    assert tool.stats["not_modified"] == 1
+
+
+def test_session_reuses_connections(github: FakeGitHub, tmp_path: Path) -> None:
+    tool = _tool(github, tmp_path)
+    for i in range(5):
+        tool.run(f"octo/r{i}")
+    assert len(github.log) == 5
+    assert len(github.connections) == 1
+
+
+def test_run_many_is_concurrent_and_keyed(github: FakeGitHub, tmp_path: Path) -> None:
+    github.delay = 0.05
+    github.status["octo/missing"] = 404
+    tool = _tool(github, tmp_path, max_workers=4)
+    repos = [f"octo/r{i}" for i in range(12)] + ["octo/missing", "octo/r0"]
+    results = tool.run_many(repos)
+    assert list(results) == repos[:-1]
+    assert results["octo/r3"]["full_name"] == "octo/r3"
+    assert "404" in results["octo/missing"]["error"]
+    assert github.max_in_flight > 1
+    assert len(github.connections) <= 4
+
+
+def test_paces_requests_when_rate_limit_is_low(github: FakeGitHub, tmp_path: Path) -> None:
+    github.rate = {"X-RateLimit-Remaining": "2", "X-RateLimit-Reset": str(int(time.time()) + 2)}
+    tool = _tool(github, tmp_path, min_remaining=10)
+    tool.run("octo/a")
+    start = time.monotonic()
+    tool.run("octo/b")
+    assert time.monotonic() - start >= 0.2
+    assert tool.stats["throttled_seconds"] > 0
+
+
+def test_exhausted_rate_limit_is_reported(github: FakeGitHub, tmp_path: Path) -> None:
+    github.status["octo/a"] = 403
+    github.rate = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(int(time.time()) + 3600)}
+    tool = _tool(github, tmp_path, max_wait=1.0)
+    result = tool.run("octo/a")
+    assert "rate limit exhausted" in result["error"]
+    assert len(github.log) == 1
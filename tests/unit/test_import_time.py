@@ -0,0 +1,58 @@
+"""Startup-time budget for the CLI and the ``src`` package.
+
+Each module is imported in a fresh interpreter under ``python -X
+importtime``. Heavy dependencies must stay out of the import graph.
+Wall-clock time depends on the machine, so the module's cumulative
+import time is only checked when ``IMPORT_BUDGET_MS`` sets a budget.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+BUDGET_US = float(os.environ["IMPORT_BUDGET_MS"]) * 1000 if os.getenv("IMPORT_BUDGET_MS") else None
+HEAVY = {"requests", "urllib3", "pydantic", "asyncio", "sqlite3"}
+
+
+def _importtime(module: str) -> dict:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(ROOT), str(ROOT / "src")]))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize(
+    "module",
+    ["cli_multi_rapid", "cli_multi_rapid.cli", "cli_multi_rapid.daemon", "src", "src.config", "src.tools", "src.service_router"],
+)
+def test_import_stays_within_budget(module: str) -> None:
+    times = _importtime(module)
+    assert not HEAVY & set(times), f"{module} imports {sorted(HEAVY & set(times))}"
+    if BUDGET_US is not None:
+        assert times[module] <= BUDGET_US, f"{module} took {times[module] / 1000:.1f} ms"
+
+
+def test_lazy_attributes_still_resolve() -> None:
+    import src.config
+    import src.service_router
+    import src.tools
+
+    assert src.tools.FileSystemTool.__name__ == "FileSystemTool"
+    assert "GitHubAPITool" in dir(src.tools)
+    assert src.service_router.GeminiClient.__name__ == "GeminiClient"
+    assert src.config.Settings().db_url
+    with pytest.raises(AttributeError):
+        src.tools.NoSuchTool  # noqa: B018
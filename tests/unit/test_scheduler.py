@@ -0,0 +1,136 @@
+"""Unit tests for the priority- and deadline-aware task scheduler."""
+
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+
+from src.framework_config import FrameworkConfig
+from src.workflow.scheduler import DeadlineExceededError, QueueFullError, TaskScheduler
+
+
+class Recorder:
+    """Executor recording the order tasks reach the engine."""
+
+    def __init__(self, seconds: float = 0.0) -> None:
+        self.seconds = seconds
+        self.ran: List[str] = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.lock = threading.Lock()
+
+    def __call__(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        self.gate.wait(5)
+        time.sleep(self.seconds)
+        with self.lock:
+            self.ran.append(task["task_id"])
+        return {"status": "success", "result": task["task_id"]}
+
+
+def _blocked(scheduler: TaskScheduler, engine: Recorder) -> None:
+    """Occupy the only worker until ``engine.gate`` is set."""
+    engine.gate.clear()
+    scheduler.submit({"task_id": "gate", "priority": "interactive"})
+    while not scheduler.snapshot()["interactive"]["running"]:
+        time.sleep(0.005)
+
+
+def test_priority_classes_then_earliest_deadline_first() -> None:
+    engine = Recorder()
+    scheduler = TaskScheduler(engine, workers=1)
+    _blocked(scheduler, engine)
+    futures = [
+        scheduler.submit({"task_id": "batch", "priority": "batch"}),
+        scheduler.submit({"task_id": "no-deadline"}),
+        scheduler.submit({"task_id": "late", "deadline_in": 60}),
+        scheduler.submit({"task_id": "soon", "deadline": time.time() + 30}),
+        scheduler.submit({"task_id": "urgent", "priority": "interactive"}),
+    ]
+    engine.gate.set()
+    for future in futures:
+        future.result(5)
+    assert engine.ran == ["gate", "urgent", "soon", "late", "no-deadline", "batch"]
+    scheduler.shutdown()
+
+
+def test_lane_priority_from_config() -> None:
+    config = FrameworkConfig.from_dict(
+        {
+            "lanes": [
+                {"name": "hooks", "branchPrefix": "hook/", "priority": "interactive"},
+                {"name": "backfill", "branchPrefix": "bulk/", "priority": "batch"},
+            ],
+            "tasks": [{"label": "reindex", "command": "run", "lane": "backfill"}],
+        }
+    )
+    scheduler = TaskScheduler(Recorder(), config=SimpleNamespace(current=config))
+    assert scheduler.priority_of({"branch": "hook/pre-commit"}) == "interactive"
+    assert scheduler.priority_of({"task_label": "reindex"}) == "batch"
+    assert scheduler.priority_of({"lane": "unknown"}) == "normal"
+    assert scheduler.priority_of({"branch": "bulk/x", "priority": "interactive"}) == "interactive"
+    with pytest.raises(ValueError):
+        scheduler.priority_of({"priority": "urgent"})
+
+
+def test_bounded_queue_rejects_or_applies_backpressure() -> None:
+    engine = Recorder()
+    scheduler = TaskScheduler(engine, workers=1, queue_limits={"normal": 2})
+    _blocked(scheduler, engine)
+    scheduler.submit({"task_id": "a"})
+    scheduler.submit({"task_id": "b"})
+    with pytest.raises(QueueFullError):
+        scheduler.submit({"task_id": "c"}, block=False)
+    start = time.monotonic()
+    with pytest.raises(QueueFullError):
+        scheduler.submit({"task_id": "c"}, timeout=0.1)
+    assert time.monotonic() - start >= 0.1
+
+    # A blocked submitter proceeds as soon as space frees up.
+    threading.Timer(0.1, engine.gate.set).start()
+    scheduler.submit({"task_id": "c"}).result(5)
+    assert scheduler.snapshot()["normal"]["rejected"] == 2
+    scheduler.shutdown()
+
+
+def test_sheds_tasks_that_cannot_meet_their_deadline() -> None:
+    engine = Recorder()
+    scheduler = TaskScheduler(engine, workers=1)
+    with pytest.raises(DeadlineExceededError):
+        scheduler.submit({"task_id": "too-slow", "deadline_in": 1, "estimated_seconds": 5})
+
+    _blocked(scheduler, engine)
+    expiring = scheduler.submit({"task_id": "expiring", "deadline_in": 0.05})
+    time.sleep(0.1)
+    engine.gate.set()
+    with pytest.raises(DeadlineExceededError):
+        expiring.result(5)
+    scheduler.shutdown()
+    assert engine.ran == ["gate"]  # shed tasks never reach the engine
+    assert scheduler.snapshot()["normal"]["shed"] == 2
+
+
+def test_interactive_latency_stays_flat_under_batch_load() -> None:
+    service = 0.01
+    scheduler = TaskScheduler(Recorder(service), workers=2, queue_limits={"batch": 50})
+
+    def flood() -> None:
+        for i in range(150):
+            scheduler.submit({"task_id": f"b{i}", "priority": "batch"})
+
+    flooder = threading.Thread(target=flood)
+    flooder.start()
+    time.sleep(0.05)  # let the batch backlog build up
+    latencies = []
+    for i in range(30):
+        start = time.monotonic()
+        scheduler.execute({"task_id": f"i{i}", "priority": "interactive"})
+        latencies.append(time.monotonic() - start)
+    flooder.join()
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    # FIFO would put each interactive task behind up to 50 batch tasks (~0.25 s).
+    assert p95 < 5 * service
+    assert scheduler.snapshot()["batch"]["queued"] > 0
+    scheduler.shutdown(cancel_pending=True)
@@ -0,0 +1,91 @@
+"""Unit tests for the streaming subprocess runner."""
+
+import asyncio
+import subprocess
+import sys
+
+import pytest
+
+from src import subprocess_runner
+from src.subprocess_runner import METRICS, BoundedBuffer, run, stream
+
+
+def test_run_streams_lines_to_callback() -> None:
+    seen = []
+    result = run(
+        [sys.executable, "-c", "print('a'); print('b')"],
+        on_stdout=seen.append,
+    )
+    assert result.returncode == 0
+    assert seen == ["a\n", "b\n"]
+    assert result.stdout == "a\nb\n"
+
+
+def test_output_is_bounded_to_head_and_tail() -> None:
+    script = "for i in range(10000): print(f'line {i}')"
+    result = run([sys.executable, "-c", script], max_output_bytes=200)
+    assert result.stdout_truncated
+    assert result.stdout.startswith("line 0\n")
+    assert result.stdout.endswith("line 9999\n")
+    assert len(result.stdout) < 300
+
+
+def test_timeout_kills_process_group() -> None:
+    script = "import subprocess, sys, time; subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)']); time.sleep(30)"
+    result = run([sys.executable, "-c", script], timeout=0.5)
+    assert result.timed_out
+    assert result.duration < 10
+    with pytest.raises(subprocess.TimeoutExpired):
+        result.check_returncode()
+
+
+def test_escaped_grandchild_does_not_hang_run(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(subprocess_runner, "PUMP_JOIN_TIMEOUT", 0.3)
+    # The grandchild starts its own session, so killing the group misses it
+    # and it keeps stdout open after the child exits.
+    script = (
+        "import subprocess, sys; print('started', flush=True); "
+        "subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(5)'], start_new_session=True)"
+    )
+    result = run([sys.executable, "-c", script])
+    assert result.returncode == 0
+    assert result.stdout == "started\n"
+    assert result.duration < 2
+
+
+def test_long_lines_are_split_and_crlf_translated() -> None:
+    script = "import sys; sys.stdout.write('x' * 100000 + '\\r\\nend')"
+    seen = []
+    run([sys.executable, "-c", script], on_stdout=seen.append)
+    assert [len(line) for line in seen] == [65536, 100000 - 65536 + 1, 3]
+    assert seen[-1] == "end"
+
+
+def test_check_raises_called_process_error() -> None:
+    with pytest.raises(subprocess.CalledProcessError) as info:
+        run([sys.executable, "-c", "import sys; sys.stderr.write('boom'); sys.exit(3)"], check=True)
+    assert info.value.returncode == 3
+    assert info.value.stderr == "boom"
+
+
+def test_metrics_recorded_per_command() -> None:
+    METRICS.reset()
+    run(["git", "--version"])
+    stats = METRICS.snapshot()
+    assert stats["git"]["count"] == 1
+
+
+def test_bounded_buffer_keeps_small_output_intact() -> None:
+    buf = BoundedBuffer(max_bytes=100)
+    buf.append("hello\n")
+    assert buf.getvalue() == "hello\n"
+    assert not buf.truncated
+
+
+def test_async_stream_yields_lines_and_exit() -> None:
+    async def collect():
+        return [item async for item in stream([sys.executable, "-c", "print('x')"])]
+
+    items = asyncio.run(collect())
+    assert ("stdout", "x\n") in items
+    assert items[-1] == ("exit", "0")
@@ -0,0 +1,78 @@
+"""Unit tests for test impact analysis and selective test runs."""
+
+import json
+import subprocess
+from pathlib import Path
+
+from src.tools import testing_tool
+from src.tools.test_impact import ImportGraph, TestImpactAnalyzer, shard
+
+
+def _write(root: Path, rel: str, text: str) -> None:
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def _make_project(root: Path) -> None:
+    _write(root, "conftest.py", "")
+    _write(root, "pkg/__init__.py", "")
+    _write(root, "pkg/core.py", "def value():\n    return 1\n")
+    _write(root, "pkg/api.py", "from .core import value\n\ndef api():\n    return value()\n")
+    _write(root, "pkg/other.py", "def other():\n    return 2\n")
+    _write(root, "tests/test_api.py", "from pkg.api import api\n\ndef test_api():\n    assert api() == 1\n")
+    _write(root, "tests/test_other.py", "from pkg.other import other\n\ndef test_other():\n    assert other() == 2\n")
+    for args in (["init", "-q", "-b", "main"], ["add", "."], ["-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "init"]):
+        subprocess.run(["git", *args], cwd=root, check=True)
+
+
+def test_transitive_dependents_are_selected(tmp_path: Path) -> None:
+    _make_project(tmp_path)
+    analyzer = TestImpactAnalyzer(tmp_path)
+    assert analyzer.select(["pkg/core.py"]) == ["tests/test_api.py"]
+    assert analyzer.select(["pkg/other.py"]) == ["tests/test_other.py"]
+    assert analyzer.select(["pyproject.toml"]) is None
+
+
+def test_import_graph_cache_skips_unchanged_files(tmp_path: Path) -> None:
+    _make_project(tmp_path)
+    graph = ImportGraph(tmp_path).build()
+    assert graph.edges["pkg/api.py"] == {"pkg/core.py"}
+    # Unchanged files are served from the cache rather than reparsed.
+    cache = json.loads(graph.cache_path.read_text())
+    cache["pkg/api.py"]["imports"] = ["pkg.other"]
+    graph.cache_path.write_text(json.dumps(cache))
+    assert ImportGraph(tmp_path).build().edges["pkg/api.py"] == {"pkg/other.py"}
+
+
+def test_run_affected_runs_only_changed_tests(tmp_path: Path) -> None:
+    _make_project(tmp_path)
+    _write(tmp_path, "pkg/other.py", "def other():\n    return 3\n")
+    tool = testing_tool.TestingTool(tmp_path)
+    result = tool.run_affected(base="main", workers=2)
+    assert result["changed"] == ["pkg/other.py"]
+    assert result["selected"] == ["tests/test_other.py"]
+    assert result["status"] == "failure"
+    assert tool.impact.last_results()["tests/test_other.py"]["status"] == "failed"
+
+    # The previous failure is re-run even when unrelated files change.
+    _write(tmp_path, "pkg/other.py", "def other():\n    return 2\n")
+    _write(tmp_path, "pkg/core.py", "def value():\n    return 1\n\n")
+    result = tool.run_affected(base="main", workers=2)
+    assert result["selected"] == ["tests/test_other.py", "tests/test_api.py"]
+    assert result["status"] == "success"
+    assert tool.run_affected(base="main")["selected"] == ["tests/test_api.py"]
+
+
+def test_shard_without_tests_does_not_fail_the_run(tmp_path: Path) -> None:
+    _make_project(tmp_path)
+    _write(tmp_path, "tests/test_helpers.py", "from pkg.other import other\n\nEXPECTED = other()\n")
+    _write(tmp_path, "pkg/other.py", "def other():\n    return 2\n\n")
+    result = testing_tool.TestingTool(tmp_path).run_affected(base="main", workers=2)
+    assert result["selected"] == ["tests/test_helpers.py", "tests/test_other.py"]
+    assert result["status"] == "success"
+
+
+def test_shard_balances_by_duration() -> None:
+    shards = shard(["a", "b", "c"], 2, {"a": 10.0, "b": 5.0, "c": 5.0})
+    assert sorted(map(sorted, shards)) == [["a"], ["b", "c"]]
@@ -0,0 +1,130 @@
+"""Unit tests for WebSearchTool with local fake backends."""
+
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from src.tools.web_search import (
+    MAX_LATE_CALLS,
+    SearchBackend,
+    SearchResult,
+    WebSearchTool,
+    merge_results,
+    normalize_query,
+    normalize_url,
+)
+
+
+class FakeBackend(SearchBackend):
+    def __init__(self, name: str, urls: List[str], delay: float = 0.0, fail: bool = False) -> None:
+        self.name = name
+        self.urls = urls
+        self.delay = delay
+        self.fail = fail
+        self.queries: List[str] = []
+        self._lock = threading.Lock()
+
+    def search(self, query: str, limit: int) -> List[SearchResult]:
+        with self._lock:
+            self.queries.append(query)
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("offline")
+        return [SearchResult(url, title=f"{self.name} {i}") for i, url in enumerate(self.urls[:limit])]
+
+
+def test_backends_must_implement_search() -> None:
+    class Incomplete(SearchBackend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()  # type: ignore[abstract]
+
+
+def test_normalization() -> None:
+    assert normalize_query("  Python  AsyncIO tutorial?") == normalize_query("python, ＡsyncIO... TUTORIAL")
+    assert normalize_query("C++ vs C#") == "c++ vs c#"
+    # Word order changes meaning ("python vs java" is not "java vs python").
+    assert normalize_query("python vs java") != normalize_query("java vs python")
+    assert normalize_url("HTTPS://www.Example.com/a/?utm_source=x&b=2#top") == normalize_url("http://example.com/a?b=2")
+
+
+def test_merge_ranks_agreement_first_and_dedupes() -> None:
+    a = [SearchResult("https://a.io/1"), SearchResult("https://shared.io/"), SearchResult("https://a.io/1#x")]
+    b = [SearchResult("https://www.shared.io"), SearchResult("https://b.io/1")]
+    merged = merge_results([a, b], limit=10)
+    assert [r.url for r in merged] == ["https://shared.io/", "https://a.io/1", "https://b.io/1"]
+
+
+def test_fan_out_merges_and_caches_near_duplicates(tmp_path: Path) -> None:
+    one = FakeBackend("one", ["https://x.io/a", "https://x.io/b"])
+    two = FakeBackend("two", ["https://x.io/b", "https://y.io/c"])
+    tool = WebSearchTool([one, two], cache_dir=tmp_path)
+    links = tool.run("Rust borrow checker")
+    assert links == ["https://x.io/b", "https://x.io/a", "https://y.io/c"]
+    assert tool.search("rust, BORROW checker!")[0].source == "one"
+    assert (len(one.queries), len(two.queries), tool.stats["cache_hits"]) == (1, 1, 1)
+    tool.close()
+
+    # The on-disk cache answers a new tool (another process) too.
+    again = WebSearchTool([one, two], cache_dir=tmp_path)
+    assert again.run("rust BORROW checker") == links
+    assert len(one.queries) == 1
+
+
+def test_slow_and_failing_backends_are_bounded(tmp_path: Path) -> None:
+    fast = FakeBackend("fast", ["https://fast.io"])
+    slow = FakeBackend("slow", ["https://slow.io"], delay=2.0)
+    broken = FakeBackend("broken", [], fail=True)
+    tool = WebSearchTool([fast, slow, broken], cache_dir=tmp_path, timeout=0.2)
+    start = time.monotonic()
+    assert tool.run("q") == ["https://fast.io"]
+    assert time.monotonic() - start < 1.0
+    assert (tool.stats["backend_timeouts"], tool.stats["backend_errors"]) == (1, 1)
+    # Partial answers are not cached.
+    tool.run("q")
+    assert len(fast.queries) == 2
+    tool.close()
+
+
+def test_hung_backend_cannot_fill_the_pool(tmp_path: Path) -> None:
+    fast = FakeBackend("fast", ["https://fast.io"])
+    hung = FakeBackend("hung", ["https://hung.io"], delay=1.0)
+    tool = WebSearchTool([fast, hung], persist=False, timeout=0.05)
+    for i in range(6):
+        assert tool.run(f"q{i}") == ["https://fast.io"]
+    assert len(hung.queries) == MAX_LATE_CALLS
+    assert tool.stats["backend_skipped"] == 6 - MAX_LATE_CALLS
+    assert len(fast.queries) == 6
+    tool.close()
+
+
+def test_queued_searches_are_timed_from_when_they_run(tmp_path: Path) -> None:
+    backend = FakeBackend("one", ["https://x.io"], delay=0.3)
+    tool = WebSearchTool([backend], persist=False, timeout=0.5)
+    results = tool.search_many([f"q{i}" for i in range(8)])
+    assert all(r and r[0].url == "https://x.io" for r in results.values())
+    assert tool.stats["backend_timeouts"] == 0 and tool.stats["backend_skipped"] == 0
+    tool.close()
+
+
+def test_concurrent_identical_queries_search_once(tmp_path: Path) -> None:
+    backend = FakeBackend("one", ["https://x.io"], delay=0.2)
+    tool = WebSearchTool([backend], persist=False)
+    results = tool.search_many(["Query one", "query ONE", "query  one?"])
+    assert len(backend.queries) == 1
+    assert all(r[0].url == "https://x.io" for r in results.values())
+    assert tool.stats["shared"] + tool.stats["cache_hits"] == 2
+    assert not (tmp_path / "results.sqlite").exists()
+
+
+def test_cache_expires(tmp_path: Path) -> None:
+    backend = FakeBackend("one", ["https://x.io"])
+    tool = WebSearchTool([backend], cache_dir=tmp_path, ttl=0.05)
+    tool.run("q")
+    time.sleep(0.1)
+    tool.run("q")
+    assert len(backend.queries) == 2